@@ -0,0 +1,73 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import argparse
+import glob
+import json
+import time
+from config.settings import settings
+from src.utils.html_text import html_to_text, clean_html_batch, get_parser
+
+
+def load_cooked_posts():
+    """Collect cooked HTML of every post in the recorded discourse corpus"""
+    posts = []
+    for file_path in sorted(glob.glob(os.path.join(settings.RAW_DATA_PATH, 'discourse_topic_*.json'))):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            topic_data = json.load(f)
+        posts.extend(post.get('cooked_content', '') for post in topic_data.get('posts', []))
+    return posts
+
+
+def run_case(name, func, posts, repeat):
+    best = None
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func(posts)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    rate = len(posts) / best if best else 0.0
+    print(f"{name:<28} {best:8.3f}s  {rate:10.1f} posts/s")
+    return {'name': name, 'seconds': best, 'posts_per_second': rate}, output
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark HTML-to-text cleaning over the discourse corpus")
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    arg_parser.add_argument('--output', help="Optional JSON file for the results")
+    args = arg_parser.parse_args()
+
+    posts = load_cooked_posts()
+    print(f"Loaded {len(posts)} posts ({sum(len(p) for p in posts):,} HTML characters)")
+    print(f"Preferred parser backend: {get_parser()}")
+
+    results = []
+    baseline_result, baseline = run_case(
+        'serial html.parser',
+        lambda items: [html_to_text(html, 'html.parser') for html in items],
+        posts, args.repeat
+    )
+    results.append(baseline_result)
+
+    cases = [
+        (f'serial {get_parser()}', lambda items: [html_to_text(html) for html in items]),
+        (f'pool x{args.workers} {get_parser()}', lambda items: clean_html_batch(items, workers=args.workers)),
+    ]
+    for name, func in cases:
+        result, output = run_case(name, func, posts, args.repeat)
+        result['mismatches'] = sum(1 for a, b in zip(baseline, output) if a != b)
+        if result['mismatches']:
+            print(f"  WARNING: {result['mismatches']} posts differ from html.parser output")
+        results.append(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'posts': len(posts), 'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import argparse
+import json
+import statistics
+import subprocess
+
+
+def parse_importtime(stderr):
+    """Parse `python -X importtime` lines into (module, self_us, cumulative_us, depth)"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def subtree(rows, module):
+    """Rows imported while importing `module` (importtime prints children before parents)"""
+    pending = []
+    for row in rows:
+        if row[3] == 0:
+            if row[0] == module:
+                return pending + [row]
+            pending = []
+        else:
+            pending.append(row)
+    return []
+
+
+def measure(module, runs):
+    """Import `module` in fresh interpreters; returns per-(module, depth) cumulative times in ms"""
+    samples = {}
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+            cwd=project_root, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        for name, _, cumulative_us, depth in subtree(parse_importtime(result.stderr), module):
+            samples.setdefault((name, depth), []).append(cumulative_us / 1000)
+    return {key: statistics.median(values) for key, values in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time of the API server and its lazily imported SDKs")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--modules', default='src.api.main,google.generativeai,PIL.Image',
+                        help="Comma-separated modules, each imported in its own fresh interpreter")
+    parser.add_argument('--output', help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    results = []
+    for module in args.modules.split(','):
+        try:
+            timings = measure(module, args.runs)
+        except RuntimeError as e:
+            print(f"{module}: not importable ({e})")
+            continue
+
+        total = timings.get((module, 0), 0.0)
+        # Direct dependencies are the depth-1 entries; they explain most of the total
+        children = sorted(
+            ((name, ms) for (name, depth), ms in timings.items() if depth == 1),
+            key=lambda item: item[1], reverse=True
+        )[:args.top]
+        print(f"\n{module}: {total:.1f} ms (median of {args.runs})")
+        for name, ms in children:
+            print(f"  {name:<45} {ms:8.1f} ms")
+        results.append({'module': module, 'total_ms': round(total, 2),
+                        'dependencies_ms': {name: round(ms, 2) for name, ms in children}})
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
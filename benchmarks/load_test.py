@@ -0,0 +1,415 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import random
+import re
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import requests
+
+QUESTIONS = [
+    "How do I install Docker for the TDS project?",
+    "What is the deadline for GA5?",
+    "Should I use gpt-4o-mini or gpt-3.5-turbo for the assignment?",
+    "How are the graded assignments scored?",
+    "How do I deploy a FastAPI app to Vercel?",
+    "Why does my uv run command fail with a missing module?",
+    "What is the difference between pandas merge and join?",
+    "How do I scrape a page that needs JavaScript rendering?",
+    "Can I use Podman instead of Docker?",
+    "How do I set environment variables for the AI proxy token?",
+]
+
+
+def embed_text(text, dimension=768):
+    """Deterministic unit vector per text, so repeated questions embed identically"""
+    seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+    vector = np.random.default_rng(seed).standard_normal(dimension)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class BacklogHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer with a listen backlog for hundreds of concurrent clients"""
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class StubGeminiServer:
+    """Offline stand-in for the Gemini REST API with injected latency and errors.
+
+    Serves embedContent and generateContent as the SDK's REST transport calls
+    them; point the app at it with GEMINI_API_ENDPOINT. Requests carrying
+    inline image data count as vision calls and use their own latency.
+    429 is the default injected error because the SDK retries 503s for up
+    to a minute, which would measure the retry policy instead of the app.
+    """
+
+    def __init__(self, embed_latency_ms=40, generate_latency_ms=800, vision_latency_ms=1500,
+                 jitter=0.25, error_rate=0.0, error_status=429, dimension=768, seed=0):
+        self.latency_ms = {'embed': embed_latency_ms, 'generate': generate_latency_ms, 'vision': vision_latency_ms}
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.dimension = dimension
+        self.calls = {'embed': 0, 'generate': 0, 'vision': 0, 'errors': 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def _delay(self, kind):
+        with self._lock:
+            factor = 1 + self._rng.uniform(-self.jitter, self.jitter)
+            failed = self._rng.random() < self.error_rate
+        time.sleep(max(0.0, self.latency_ms[kind] * factor) / 1000)
+        return failed
+
+    def respond(self, path, body):
+        """(status, payload) for one API call"""
+        if ':embedContent' in path:
+            kind = 'embed'
+        elif ':generateContent' in path:
+            parts = [part for content in body.get('contents', []) for part in content.get('parts', [])]
+            kind = 'vision' if any('inlineData' in part or 'inline_data' in part for part in parts) else 'generate'
+        else:
+            return 404, {'error': {'code': 404, 'message': f"No stub for {path}", 'status': 'NOT_FOUND'}}
+
+        failed = self._delay(kind)
+        with self._lock:
+            self.calls[kind] += 1
+            self.calls['errors'] += failed
+        if failed:
+            return self.error_status, {'error': {'code': self.error_status, 'message': 'injected by load test',
+                                                 'status': 'RESOURCE_EXHAUSTED'}}
+
+        if kind == 'embed':
+            text = ' '.join(part.get('text', '') for part in body.get('content', {}).get('parts', []))
+            return 200, {'embedding': {'values': embed_text(text, self.dimension)}}
+        text = 'A screenshot of a terminal running a Python script.' if kind == 'vision' else \
+            'Stub answer: install the tool, check the course page, and ask on Discourse if it still fails.'
+        return 200, {'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'},
+                                     'finishReason': 1, 'index': 0}]}
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    body = {}
+                status, payload = stub.respond(self.path, body)
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = BacklogHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, name='stub-gemini', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_app(port, workers, env, log_file, timeout=180):
+    """Run the API under uvicorn as it is deployed and wait until /health answers"""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'src.api.main:app', '--host', '127.0.0.1', '--port', str(port),
+         '--workers', str(workers), '--log-level', 'warning'],
+        cwd=project_root, env=env, stdout=log_file, stderr=subprocess.STDOUT
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API exited with code {process.returncode} during startup")
+        try:
+            if requests.get(f"{url}/health", timeout=2).status_code == 200:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"API did not become healthy within {timeout}s")
+
+
+def make_images(count, size=(1024, 768), seed=0):
+    """Base64 PNG screenshots-alike; distinct images defeat the description cache"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    images = []
+    for _ in range(count):
+        image = Image.new('RGB', size, (30, 30, 30))
+        draw = ImageDraw.Draw(image)
+        for _ in range(12):
+            x, y = rng.randrange(size[0] - 100), rng.randrange(size[1] - 40)
+            colour = tuple(rng.randrange(256) for _ in range(3))
+            draw.rectangle([x, y, x + rng.randrange(40, 300), y + rng.randrange(10, 40)], fill=colour)
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        images.append(base64.b64encode(buffer.getvalue()).decode('ascii'))
+    return images
+
+
+class PayloadMix:
+    """Picks text or image /ask bodies at the configured ratio"""
+
+    def __init__(self, image_ratio, unique_images, seed=0):
+        self.image_ratio = image_ratio
+        self.unique_images = unique_images
+        self.rng = random.Random(seed)
+        self.images = make_images(256 if unique_images else 4, seed=seed) if image_ratio > 0 else []
+        self._next_image = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            question = self.rng.choice(QUESTIONS)
+            if self.images and self.rng.random() < self.image_ratio:
+                image = self.images[self._next_image % len(self.images)] if self.unique_images \
+                    else self.rng.choice(self.images)
+                self._next_image += 1
+                return 'image', {'question': question, 'image': image}
+            return 'text', {'question': question}
+
+
+def scrape_metrics(url):
+    try:
+        return requests.get(f"{url}/metrics", timeout=10).text
+    except requests.RequestException:
+        return ''
+
+
+def parse_series(text, name):
+    """{label string: value} for every sample of one metric in Prometheus text format"""
+    series = {}
+    for match in re.finditer(rf'^{re.escape(name)}(\{{[^}}]*\}})? (\S+)$', text, re.MULTILINE):
+        series[match.group(1) or ''] = float(match.group(2))
+    return series
+
+
+def histogram_delta(before, after, name):
+    """Bucket counts, sum and count added between two scrapes of one unlabelled histogram"""
+    def read(text):
+        buckets = parse_series(text, f'{name}_bucket')
+        bounds = sorted((float(re.search(r'le="([^"]+)"', key).group(1)), value) for key, value in buckets.items())
+        return bounds, parse_series(text, f'{name}_sum').get('', 0.0), parse_series(text, f'{name}_count').get('', 0.0)
+
+    bounds_after, sum_after, count_after = read(after)
+    bounds_before, sum_before, count_before = read(before)
+    previous = dict(bounds_before)
+    buckets = [(bound, value - previous.get(bound, 0.0)) for bound, value in bounds_after]
+    return buckets, sum_after - sum_before, count_after - count_before
+
+
+def histogram_quantile(buckets, count, q):
+    """Upper bound of the bucket holding the q-quantile (cumulative buckets)"""
+    if count <= 0:
+        return None
+    for bound, cumulative in buckets:
+        if cumulative >= q * count:
+            return bound
+    return float('inf')
+
+
+def counter_delta(before, after, name):
+    previous = parse_series(before, name)
+    return {key: value - previous.get(key, 0.0) for key, value in parse_series(after, name).items()
+            if value - previous.get(key, 0.0) > 0}
+
+
+def run_step(url, concurrency, duration, warmup, payloads, timeout):
+    """Closed loop: each virtual student sends the next question as soon as the last returns"""
+    records = []
+    lock = threading.Lock()
+    measure_from = time.perf_counter() + warmup
+    stop_at = measure_from + duration
+
+    def student():
+        session = requests.Session()
+        while True:
+            started = time.perf_counter()
+            if started >= stop_at:
+                return
+            kind, body = payloads.next()
+            try:
+                response = session.post(f"{url}/ask", json=body, timeout=timeout)
+                status = response.status_code
+            except requests.RequestException:
+                status = 0
+            finished = time.perf_counter()
+            if started >= measure_from:
+                with lock:
+                    records.append((kind, status, finished - started, finished))
+
+    threads = [threading.Thread(target=student, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Throughput counts only requests that finished inside the measured window
+    completed = [record for record in records if record[3] <= stop_at]
+    latencies = np.array([record[2] for record in records]) * 1000
+    errors = sum(1 for record in records if record[1] != 200)
+    result = {
+        'concurrency': concurrency,
+        'requests': len(records),
+        'throughput_rps': round(len(completed) / duration, 2),
+        'error_rate': round(errors / len(records), 4) if records else None,
+        'status_counts': {str(status): sum(1 for r in records if r[1] == status) for status in sorted({r[1] for r in records})},
+        'by_kind': {kind: sum(1 for r in records if r[0] == kind) for kind in ('text', 'image')}
+    }
+    if len(latencies):
+        result.update({
+            'latency_ms': {
+                'p50': round(float(np.percentile(latencies, 50)), 1),
+                'p95': round(float(np.percentile(latencies, 95)), 1),
+                'p99': round(float(np.percentile(latencies, 99)), 1),
+                'mean': round(float(latencies.mean()), 1),
+                'max': round(float(latencies.max()), 1)
+            }
+        })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stepped-concurrency load test of /ask against a stub Gemini")
+    parser.add_argument('--concurrency', default='1,2,4,8,16,32', help="Concurrent students per step")
+    parser.add_argument('--duration', type=float, default=15.0, help="Measured seconds per step")
+    parser.add_argument('--warmup', type=float, default=2.0, help="Unmeasured seconds at the start of each step")
+    parser.add_argument('--image-ratio', type=float, default=0.1, help="Share of requests carrying an image")
+    parser.add_argument('--unique-images', action='store_true', help="Never resend an image (no description cache hits)")
+    parser.add_argument('--embed-latency-ms', type=float, default=40)
+    parser.add_argument('--generate-latency-ms', type=float, default=800)
+    parser.add_argument('--vision-latency-ms', type=float, default=1500)
+    parser.add_argument('--jitter', type=float, default=0.25, help="Uniform +/- fraction applied to stub latencies")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of stub calls that fail")
+    parser.add_argument('--error-status', type=int, default=429)
+    parser.add_argument('--workers', type=int, default=1, help="uvicorn workers for the API under test")
+    parser.add_argument('--keep-precomputed', action='store_true',
+                        help="Serve the precomputed answer table instead of running every question end to end")
+    parser.add_argument('--url', help="Test an already running API instead (its upstream is not stubbed)")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Client timeout per request")
+    parser.add_argument('--output', default=None, help="JSON results path (default benchmarks/results/)")
+    args = parser.parse_args()
+
+    stub = None
+    process = None
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'settings': {key: value for key, value in vars(args).items() if key != 'output'},
+        'steps': []
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_path = os.path.join(tmp_dir, 'api.log')
+        try:
+            url = args.url
+            if not url:
+                stub = StubGeminiServer(args.embed_latency_ms, args.generate_latency_ms, args.vision_latency_ms,
+                                        args.jitter, args.error_rate, args.error_status).start()
+                env = dict(
+                    os.environ,
+                    GEMINI_API_KEY='load-test-key',
+                    GEMINI_API_ENDPOINT=stub.url,
+                    OCR_ENABLED='false',
+                    TRACE_LOG_PATH=os.path.join(tmp_dir, 'slow_requests.jsonl'),
+                    PRECOMPUTED_REFRESH_ON_SWAP='false',
+                    INDEX_WATCH_INTERVAL='0'
+                )
+                if not args.keep_precomputed:
+                    env['PRECOMPUTED_ANSWERS_FILE'] = os.path.join(tmp_dir, 'no-precomputed-answers.npz')
+                with open(log_path, 'w') as log_file:
+                    process, url = start_app(free_port(), args.workers, env, log_file)
+                print(f"API (pid {process.pid}, {args.workers} worker(s)) at {url}; stub Gemini at {stub.url}")
+
+            payloads = PayloadMix(args.image_ratio, args.unique_images)
+            print(f"\n{'conc':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} "
+                  f"{'loop lag mean/p99 ms':>21}  fallbacks")
+            for concurrency in [int(level) for level in args.concurrency.split(',')]:
+                before = scrape_metrics(url)
+                step = run_step(url, concurrency, args.duration, args.warmup, payloads, args.timeout)
+                after = scrape_metrics(url)
+
+                # Lag is measured inside the (scraped) worker by its own event-loop probe
+                buckets, lag_sum, lag_count = histogram_delta(before, after, 'tds_event_loop_lag_seconds')
+                step['event_loop_lag_ms'] = {
+                    'mean': round(lag_sum / lag_count * 1000, 2) if lag_count else None,
+                    'p99_upper_bound': (histogram_quantile(buckets, lag_count, 0.99) or 0) * 1000 if lag_count else None,
+                    'samples': int(lag_count)
+                }
+                step['fallbacks'] = counter_delta(before, after, 'tds_fallbacks_total')
+                step['upstream_errors'] = counter_delta(before, after, 'tds_upstream_errors_total')
+                report['steps'].append(step)
+
+                latency = step.get('latency_ms', {})
+                lag = step['event_loop_lag_ms']
+                lag_text = f"{lag['mean']}/{lag['p99_upper_bound']:g}" if lag['samples'] else 'n/a'
+                fallbacks = ', '.join(f"{re.sub(r'[{}]', '', key)}={int(value)}" for key, value in step['fallbacks'].items())
+                error_rate = f"{step['error_rate']:.1%}" if step['error_rate'] is not None else 'n/a'
+                print(f"{concurrency:>5} {step['throughput_rps']:>8} {latency.get('p50', 0):>9} "
+                      f"{latency.get('p95', 0):>9} {latency.get('p99', 0):>9} {error_rate:>7} "
+                      f"{lag_text:>21}  {fallbacks or '-'}")
+
+            if stub is not None:
+                report['stub_calls'] = dict(stub.calls)
+        finally:
+            if process is not None:
+                process.terminate()
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                if process.returncode not in (0, -15, None) or not report['steps']:
+                    with open(log_path, 'r', errors='replace') as f:
+                        print("API log tail:\n" + ''.join(f.readlines()[-20:]))
+            if stub is not None:
+                stub.stop()
+
+    output = args.output or os.path.join(
+        project_root, 'benchmarks', 'results', f"load-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSUCCESS: Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+from config.settings import settings
+
+SYNTHETIC_DIM = 768
+GENERATION_BLOCK = 50_000
+SEARCH_BLOCK = 65_536
+
+
+# --- corpora --------------------------------------------------------------
+
+def write_synthetic_corpus(directory, rows, dim=SYNTHETIC_DIM, with_npz=True, seed=0):
+    """Clustered random corpus as an mmap index (always) and an npz archive (if asked).
+
+    Rows are drawn around a few hundred centres so nearest-neighbour
+    structure resembles real embeddings rather than uniform noise.
+    """
+    from src.models.ingest_pipeline import IndexWriter
+
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((256, dim)).astype(np.float32)
+    index_dir = os.path.join(directory, 'index')
+    with IndexWriter(index_dir) as writer:
+        for start in range(0, rows, GENERATION_BLOCK):
+            count = min(GENERATION_BLOCK, rows - start)
+            block = centres[rng.integers(0, len(centres), count)] + 0.5 * rng.standard_normal((count, dim), dtype=np.float32)
+            texts = [f"synthetic chunk {start + i}" for i in range(count)]
+            writer.append(texts, [{'type': 'course_content', 'source': 'synthetic'}] * count, block)
+        writer.finish({'source': f'synthetic-{rows}'})
+
+    npz_path = None
+    if with_npz:
+        from src.models.shared_index import attach_index
+        data = attach_index(index_dir)
+        npz_path = os.path.join(directory, 'corpus.npz')
+        np.savez(
+            npz_path,
+            embeddings=np.asarray(data['embeddings']),
+            content=np.array(list(data['content']), dtype=object),
+            metadata=np.array([{'type': 'course_content', 'source': 'synthetic'}] * rows, dtype=object)
+        )
+    return index_dir, npz_path
+
+
+def make_queries(embeddings, count, seed=1):
+    """Queries near random corpus rows, like a question close to some chunk"""
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(embeddings), count)
+    base = np.asarray(embeddings[np.sort(rows)], dtype=np.float32)
+    return base + 0.3 * rng.standard_normal(base.shape, dtype=np.float32) * base.std()
+
+
+# --- backends -------------------------------------------------------------
+# Each backend is load(corpus) -> state, search(state, query, top_k) -> indices.
+# New retrieval implementations register here to be benchmarked alongside.
+
+def _store_backend(store_class):
+    # These stores re-read the npz inside every search_similar call,
+    # so their "load" is only construction and the cost shows up per query
+    def load(corpus):
+        store = store_class()
+        store.embeddings_file = corpus['npz']
+        return store
+
+    def search(store, query, top_k):
+        # Isolate retrieval from the embedding call: the store embeds to this vector
+        store.create_embedding = lambda text: query
+        return [hit['content'] for hit in store.search_similar('benchmark', top_k=top_k)]
+    return load, search
+
+
+def _api_load(corpus):
+    from src.api.index_manager import load_snapshot
+    missing = os.path.join(corpus['dir'], 'no-knowledge-base.json')
+    return load_snapshot(data_path=missing, embeddings_path=corpus['npz'] or missing, index_dir=corpus['index'])
+
+
+def _api_search(snapshot, query, top_k):
+    from src.api import main
+    return [hit['index'] for hit in main.search_knowledge_base('benchmark', top_k, index=snapshot, query_embedding=query)]
+
+
+def _matrix_load(corpus):
+    from src.models.shared_index import attach_index
+    data = attach_index(corpus['index'])
+    embeddings = data['embeddings']
+    norms = np.empty(len(embeddings), dtype=np.float32)
+    for start in range(0, len(embeddings), SEARCH_BLOCK):
+        norms[start:start + SEARCH_BLOCK] = np.linalg.norm(embeddings[start:start + SEARCH_BLOCK], axis=1)
+    norms[norms == 0] = 1
+    return embeddings, norms
+
+
+def _matrix_scores(state, queries):
+    embeddings, norms = state
+    scores = np.empty((len(queries), len(embeddings)), dtype=np.float32)
+    for start in range(0, len(embeddings), SEARCH_BLOCK):
+        block = embeddings[start:start + SEARCH_BLOCK]
+        scores[:, start:start + len(block)] = queries @ block.T
+    return scores / norms
+
+
+def _matrix_search(state, query, top_k):
+    return _matrix_batch(state, query[None, :], top_k)[0]
+
+
+def _matrix_batch(state, queries, top_k):
+    scores = _matrix_scores(state, np.asarray(queries, dtype=np.float32))
+    top = np.argpartition(-scores, min(top_k, scores.shape[1] - 1), axis=1)[:, :top_k]
+    order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+
+def _backends():
+    from src.models.vector_store import EfficientVectorStore
+    from src.models.vector_store_complete import ComprehensiveVectorStore
+    return {
+        # name: (load, search, batch or None, needs npz, default max rows)
+        'search_knowledge_base': (_api_load, _api_search, None, False, 100_000),
+        'ComprehensiveVectorStore.search_similar': (*_store_backend(ComprehensiveVectorStore), None, True, 100_000),
+        'EfficientVectorStore.search_similar': (*_store_backend(EfficientVectorStore), None, True, 100_000),
+        'mmap_matrix_topk': (_matrix_load, _matrix_search, _matrix_batch, False, None),
+    }
+
+
+# --- measurement ----------------------------------------------------------
+
+def percentiles(samples):
+    samples_ms = np.asarray(samples) * 1000
+    return {
+        'p50_ms': round(float(np.percentile(samples_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(samples_ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(samples_ms, 99)), 3),
+        'mean_ms': round(float(samples_ms.mean()), 3)
+    }
+
+
+def rss_bytes():
+    from src.api.metrics import resident_memory_bytes
+    return resident_memory_bytes()
+
+
+def run_case(backend_name, corpus, queries_path, top_k, batch_size, results):
+    """Runs in a fresh process so load time and memory are not polluted by other cases"""
+    import io
+    import contextlib
+
+    load, search, batch, _, _ = _backends()[backend_name]
+    queries = np.load(queries_path)
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    with quiet:
+        state = load(corpus)
+    load_seconds = time.perf_counter() - start
+    rss_loaded = rss_bytes()
+
+    with quiet:
+        search(state, queries[0], top_k)  # warm-up
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            search(state, query, top_k)
+            latencies.append(time.perf_counter() - start)
+
+        batches = []
+        for offset in range(0, len(queries), batch_size):
+            chunk = queries[offset:offset + batch_size]
+            start = time.perf_counter()
+            if batch is not None:
+                batch(state, chunk, top_k)
+            else:
+                for query in chunk:
+                    search(state, query, top_k)
+            batches.append((time.perf_counter() - start) / len(chunk))
+
+    results.put({
+        'backend': backend_name,
+        'load_seconds': round(load_seconds, 4),
+        'query': percentiles(latencies),
+        'batched_per_query': dict(percentiles(batches), batch_size=batch_size, native_batch=batch is not None),
+        'memory': {
+            'rss_loaded_mb': round((rss_loaded - rss_before) / 2**20, 1),
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        }
+    })
+
+
+def benchmark_corpus(name, corpus, rows, args, context):
+    from src.models.shared_index import attach_index
+    print(f"\n== {name}: {rows:,} chunks ==")
+    embeddings = attach_index(corpus['index'])['embeddings']
+    queries_path = os.path.join(corpus['dir'], 'queries.npy')
+    np.save(queries_path, make_queries(embeddings, args.queries))
+    del embeddings
+
+    cases = []
+    for backend_name, (_, _, _, needs_npz, max_rows) in _backends().items():
+        if args.backends and backend_name not in args.backends:
+            continue
+        limit = max_rows if args.max_rows is None else args.max_rows
+        if (needs_npz and not corpus['npz']) or (limit is not None and rows > limit):
+            print(f"  {backend_name:<42} skipped (over {limit:,} rows)")
+            cases.append({'backend': backend_name, 'skipped': True})
+            continue
+
+        results = context.Queue()
+        process = context.Process(
+            target=run_case, args=(backend_name, corpus, queries_path, args.top_k, args.batch_size, results)
+        )
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            print(f"  {backend_name:<42} failed (exit {process.exitcode})")
+            cases.append({'backend': backend_name, 'failed': True})
+            continue
+        case = results.get()
+        cases.append(case)
+        print(f"  {backend_name:<42} load {case['load_seconds']:7.3f}s  "
+              f"p50 {case['query']['p50_ms']:9.3f}ms  p99 {case['query']['p99_ms']:9.3f}ms  "
+              f"batched {case['batched_per_query']['p50_ms']:9.3f}ms/q  "
+              f"+{case['memory']['rss_loaded_mb']}MB")
+    return {'corpus': name, 'rows': rows, 'cases': cases}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval latency, load time and memory per backend")
+    parser.add_argument('--sizes', default='10000,100000,1000000',
+                        help="Synthetic corpus sizes; 0 or empty for the real corpus only")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--backends', nargs='*', help="Only run these backends")
+    parser.add_argument('--max-rows', type=int, default=None,
+                        help="Override every backend's row limit (slow backends skip large corpora by default)")
+    parser.add_argument('--npz-max-rows', type=int, default=100_000,
+                        help="Largest synthetic corpus also written as npz for the npz-based stores")
+    parser.add_argument('--output', default=None, help="JSON results path (default benchmarks/results/)")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'machine': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'settings': {'queries': args.queries, 'top_k': args.top_k, 'batch_size': args.batch_size},
+        'corpora': []
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Real corpus: the npz archive as served today, converted once to the mmap format
+        from src.models.shared_index import build_index_from_npz
+        real_dir = os.path.join(tmp_dir, 'real')
+        os.makedirs(real_dir)
+        npz_path = str(settings.EMBEDDINGS_FILE)
+        if os.path.exists(npz_path):
+            build_index_from_npz(npz_path, os.path.join(real_dir, 'index'))
+            corpus = {'dir': real_dir, 'index': os.path.join(real_dir, 'index'), 'npz': npz_path}
+            rows = len(np.load(npz_path, allow_pickle=True)['content'])
+            report['corpora'].append(benchmark_corpus('comprehensive_embeddings.npz', corpus, rows, args, context))
+
+        for rows in [int(size) for size in args.sizes.split(',') if size.strip() and int(size) > 0]:
+            corpus_dir = os.path.join(tmp_dir, f'synthetic-{rows}')
+            os.makedirs(corpus_dir)
+            start = time.perf_counter()
+            index_dir, corpus_npz = write_synthetic_corpus(corpus_dir, rows, with_npz=rows <= args.npz_max_rows)
+            print(f"\nGenerated synthetic corpus of {rows:,} rows in {time.perf_counter() - start:.1f}s")
+            corpus = {'dir': corpus_dir, 'index': index_dir, 'npz': corpus_npz}
+            report['corpora'].append(benchmark_corpus(f'synthetic-{rows}', corpus, rows, args, context))
+            # Free disk as we go; the 1M corpus alone is ~3 GB
+            import shutil
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(
+        project_root, 'benchmarks', 'results', f"retrieval-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSUCCESS: Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import argparse
+import glob
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+import numpy as np
+from config.settings import settings
+from src.api.index_manager import load_snapshot
+from src.models.reranker import LexicalReranker
+
+DEFAULT_KS = (1, 3, 5, 10)
+DEFAULT_CACHE = os.path.join(project_root, 'benchmarks', 'results', 'retrieval_eval_cache.sqlite3')
+
+
+def document_key(metadata):
+    """What a question is judged against: a Discourse topic or a course section"""
+    metadata = metadata or {}
+    if metadata.get('topic_id') is not None:
+        return f"topic:{metadata['topic_id']}"
+    return f"section:{metadata.get('section') or metadata.get('source') or 'unknown'}"
+
+
+def auto_questions(raw_dir=None, max_chars=500, min_chars=20):
+    """Title and first post of every scraped topic, each expected to retrieve that topic"""
+    raw_dir = raw_dir or settings.RAW_DATA_PATH
+    questions = []
+    for file_path in sorted(glob.glob(os.path.join(raw_dir, 'discourse_topic_*.json'))):
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                topic = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"WARNING: Skipping {file_path}: {e}")
+            continue
+        relevant = {f"topic:{topic['id']}": 1}
+        title = (topic.get('title') or '').strip()
+        if len(title) >= min_chars // 2:
+            questions.append({'id': f"{topic['id']}-title", 'kind': 'title', 'query': title, 'relevant': relevant})
+        first_post = next((post for post in topic.get('posts', []) if post.get('post_number') == 1), None)
+        text = ' '.join((first_post or {}).get('cleaned_text', '').split())[:max_chars]
+        if len(text) >= min_chars:
+            questions.append({'id': f"{topic['id']}-first_post", 'kind': 'first_post', 'query': text,
+                              'relevant': relevant})
+    return questions
+
+
+def load_questions(path):
+    """JSONL of {"id", "query", "relevant": [keys] or {key: grade}, "kind"?}"""
+    questions = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            question = json.loads(line)
+            relevant = question['relevant']
+            if isinstance(relevant, str):
+                relevant = [relevant]
+            if isinstance(relevant, list):
+                relevant = {key: 1 for key in relevant}
+            questions.append({
+                'id': str(question.get('id', number)),
+                'kind': question.get('kind', 'manual'),
+                'query': question['query'],
+                'relevant': relevant
+            })
+    return questions
+
+
+def score_ranking(ranked, relevant, ks=DEFAULT_KS):
+    """recall@k, reciprocal rank and nDCG@k of a ranked list of document keys"""
+    scores = {}
+    total_relevant = len(relevant)
+    for k in ks:
+        found = sum(1 for key in ranked[:k] if key in relevant)
+        scores[f'recall@{k}'] = found / total_relevant if total_relevant else 0.0
+        dcg = sum((2 ** relevant[key] - 1) / math.log2(rank + 2)
+                  for rank, key in enumerate(ranked[:k]) if key in relevant)
+        ideal = sorted(relevant.values(), reverse=True)[:k]
+        idcg = sum((2 ** grade - 1) / math.log2(rank + 2) for rank, grade in enumerate(ideal))
+        scores[f'ndcg@{k}'] = dcg / idcg if idcg else 0.0
+    first = next((rank for rank, key in enumerate(ranked, 1) if key in relevant), None)
+    scores['mrr'] = 1.0 / first if first else 0.0
+    scores['first_relevant_rank'] = first
+    return scores
+
+
+class EvalCache:
+    """SQLite cache of query embeddings and per-query retrieval runs.
+
+    Runs are keyed by the retriever fingerprint (retriever, parameters and
+    index version) and the query text, so after a re-chunk or a ranking
+    change only the affected configuration is recomputed. Embeddings are
+    keyed by embedder and text, so a new ranker over the same index never
+    pays for another embedding call.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                embedder TEXT NOT NULL, text_sha1 TEXT NOT NULL, vector BLOB NOT NULL,
+                PRIMARY KEY (embedder, text_sha1));
+            CREATE TABLE IF NOT EXISTS runs (
+                fingerprint TEXT NOT NULL, query_sha1 TEXT NOT NULL, depth INTEGER NOT NULL, hits TEXT NOT NULL,
+                PRIMARY KEY (fingerprint, query_sha1, depth));
+        """)
+        self.stats = Counter()
+
+    @staticmethod
+    def _sha1(text):
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def embedding(self, embedder, text, compute):
+        key = self._sha1(text)
+        row = self.conn.execute('SELECT vector FROM embeddings WHERE embedder = ? AND text_sha1 = ?',
+                                (embedder, key)).fetchone()
+        if row is not None:
+            self.stats['embedding_hits'] += 1
+            return np.frombuffer(row[0], dtype=np.float32)
+        vector = np.asarray(compute(text), dtype=np.float32)
+        self.conn.execute('INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)', (embedder, key, vector.tobytes()))
+        self.conn.commit()
+        self.stats['embedding_misses'] += 1
+        return vector
+
+    def run(self, fingerprint, query, depth, compute):
+        key = self._sha1(query)
+        row = self.conn.execute('SELECT hits FROM runs WHERE fingerprint = ? AND query_sha1 = ? AND depth = ?',
+                                (fingerprint, key, depth)).fetchone()
+        if row is not None:
+            self.stats['run_hits'] += 1
+            return json.loads(row[0])
+        hits = compute(query)
+        self.conn.execute('INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?)', (fingerprint, key, depth, json.dumps(hits)))
+        self.conn.commit()
+        self.stats['run_misses'] += 1
+        return hits
+
+    def drop_runs(self, fingerprint):
+        self.conn.execute('DELETE FROM runs WHERE fingerprint = ?', (fingerprint,))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def gemini_embedding(text):
+    """Query embedding exactly as /ask computes it, but failing instead of falling back"""
+    from src.api.main import configure_gemini
+
+    genai = configure_gemini()
+    result = genai.embed_content(model="models/embedding-001", content=text, task_type="retrieval_document")
+    return result['embedding']
+
+
+def gemini_available():
+    key = getattr(settings, 'GEMINI_API_KEY', '')
+    return bool(key) and key != "your_gemini_api_key_here"
+
+
+class DenseRetriever:
+    """The serving path: search_knowledge_base over the snapshot with a cached query embedding"""
+    name = 'dense'
+
+    def __init__(self, snapshot, cache, embedder='gemini', embed=gemini_embedding):
+        self.snapshot = snapshot
+        self.cache = cache
+        self.embedder = embedder
+        self.embed = embed
+
+    def fingerprint(self):
+        return f"{self.name}|{self.embedder}|{self.snapshot.source}|{self.snapshot.version}"
+
+    def dense_results(self, query, top_k):
+        from src.api.main import search_knowledge_base
+
+        query_embedding = self.cache.embedding(self.embedder, query, self.embed)
+        return search_knowledge_base(query, top_k=top_k, index=self.snapshot,
+                                     query_embedding=query_embedding.astype(np.float64))
+
+    def search(self, query, depth):
+        return [int(result['index']) for result in self.dense_results(query, depth)]
+
+
+class RerankedDenseRetriever(DenseRetriever):
+    """Dense top-N reordered by the local reranker, as /ask does with RERANK_ENABLED"""
+    name = 'dense_rerank'
+
+    def __init__(self, snapshot, cache, embedder='gemini', embed=gemini_embedding, candidates=None, reranker=None):
+        super().__init__(snapshot, cache, embedder, embed)
+        self.candidates = candidates or getattr(settings, 'RERANK_CANDIDATES', 20)
+        self.reranker = reranker or LexicalReranker()
+
+    def fingerprint(self):
+        weights = ','.join(f"{key}={value}" for key, value in sorted(self.reranker.weights.items()))
+        return f"{super().fingerprint()}|n={self.candidates},{weights}"
+
+    def search(self, query, depth):
+        results = self.dense_results(query, max(depth, self.candidates))
+        head, _ = self.reranker.rerank(query, results[:self.candidates], self.snapshot)
+        return [int(result['index']) for result in head + results[self.candidates:]][:depth]
+
+
+class Bm25Retriever:
+    """Okapi BM25 over chunk text; needs no embeddings, so it always runs offline"""
+    name = 'bm25'
+    token_pattern = re.compile(r'\w+')
+
+    def __init__(self, snapshot, cache=None, k1=1.2, b=0.75):
+        self.snapshot = snapshot
+        self.k1 = k1
+        self.b = b
+        postings = defaultdict(list)
+        lengths = []
+        for row, text in enumerate(snapshot.chunks):
+            counts = Counter(self.token_pattern.findall(str(text).lower()))
+            lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                postings[term].append((row, count))
+        self.lengths = np.array(lengths, dtype=np.float64)
+        self.average_length = self.lengths.mean() if len(lengths) else 0.0
+        n = len(lengths)
+        self.postings = {}
+        for term, entries in postings.items():
+            rows = np.fromiter((row for row, _ in entries), dtype=np.int64, count=len(entries))
+            tfs = np.fromiter((count for _, count in entries), dtype=np.float64, count=len(entries))
+            idf = math.log(1 + (n - len(entries) + 0.5) / (len(entries) + 0.5))
+            self.postings[term] = (rows, tfs, idf)
+
+    def fingerprint(self):
+        return f"{self.name}|k1={self.k1},b={self.b}|{self.snapshot.source}|{self.snapshot.version}"
+
+    def search(self, query, depth):
+        scores = np.zeros(len(self.lengths))
+        for term in set(self.token_pattern.findall(query.lower())):
+            if term not in self.postings:
+                continue
+            rows, tfs, idf = self.postings[term]
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[rows] / self.average_length)
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+        candidates = np.flatnonzero(scores)
+        top = candidates[np.argsort(-scores[candidates], kind='stable')[:depth]]
+        return [int(row) for row in top]
+
+
+RETRIEVERS = {'dense': DenseRetriever, 'dense_rerank': RerankedDenseRetriever, 'bm25': Bm25Retriever}
+
+
+def ranked_documents(rows, metadata):
+    """Collapse ranked chunk rows to ranked unique document keys"""
+    seen = []
+    for row in rows:
+        key = document_key(metadata[row] if row < len(metadata) else None)
+        if key not in seen:
+            seen.append(key)
+    return seen
+
+
+def evaluate_config(name, retriever, questions, cache, ks=DEFAULT_KS, depth=50):
+    """Mean metrics overall and per query kind, plus the per-query breakdown"""
+    fingerprint = retriever.fingerprint()
+    metadata = retriever.snapshot.metadata
+    per_query = []
+    start = time.perf_counter()
+    for question in questions:
+        rows = cache.run(fingerprint, question['query'], depth,
+                         lambda query: retriever.search(query, depth))
+        scores = score_ranking(ranked_documents(rows, metadata), question['relevant'], ks)
+        per_query.append({'id': question['id'], 'kind': question['kind'], **scores})
+
+    def mean(records):
+        metrics = [key for key in records[0] if key not in ('id', 'kind', 'first_relevant_rank')]
+        return {key: round(float(np.mean([record[key] for record in records])), 4) for key in metrics}
+
+    kinds = sorted({record['kind'] for record in per_query})
+    return {
+        'config': name,
+        'fingerprint': fingerprint,
+        'queries': len(per_query),
+        'seconds': round(time.perf_counter() - start, 2),
+        'overall': mean(per_query) if per_query else {},
+        'by_kind': {kind: mean([r for r in per_query if r['kind'] == kind]) for kind in kinds},
+        'per_query': per_query
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval quality: recall@k, MRR and nDCG per configuration")
+    parser.add_argument('--index', action='append',
+                        help="npz archive or index directory to evaluate (repeatable; default the served npz)")
+    parser.add_argument('--retrievers', default=None,
+                        help=f"Comma-separated subset of {sorted(RETRIEVERS)} (default bm25, plus the dense ones with a Gemini key)")
+    parser.add_argument('--questions', help="JSONL question set; default is generated from discourse_topic_*.json")
+    parser.add_argument('--write-questions', help="Save the question set as JSONL for hand editing")
+    parser.add_argument('--k', default=','.join(str(k) for k in DEFAULT_KS))
+    parser.add_argument('--depth', type=int, default=50, help="Chunks retrieved per query before collapsing to documents")
+    parser.add_argument('--cache', default=DEFAULT_CACHE)
+    parser.add_argument('--refresh', action='store_true', help="Recompute cached runs (embeddings stay cached)")
+    parser.add_argument('--output', default=None, help="JSON report path (default benchmarks/results/)")
+    args = parser.parse_args()
+
+    ks = tuple(int(k) for k in args.k.split(','))
+    questions = load_questions(args.questions) if args.questions else auto_questions()
+    if args.write_questions:
+        with open(args.write_questions, 'w', encoding='utf-8') as f:
+            for question in questions:
+                f.write(json.dumps(question, ensure_ascii=False) + '\n')
+    names = args.retrievers.split(',') if args.retrievers else ['bm25'] + (['dense', 'dense_rerank'] if gemini_available() else [])
+
+    cache = EvalCache(args.cache)
+    report = {'created_at': datetime.now().isoformat(), 'ks': ks, 'depth': args.depth, 'configs': []}
+    missing_path = os.path.join(os.path.dirname(os.path.abspath(args.cache)), 'no-knowledge-base.json')
+    for index_path in args.index or [str(settings.EMBEDDINGS_FILE)]:
+        if os.path.isdir(index_path):
+            snapshot = load_snapshot(data_path=missing_path, embeddings_path=missing_path, index_dir=index_path)
+        else:
+            snapshot = load_snapshot(data_path=missing_path, embeddings_path=index_path, index_dir='')
+        if not len(snapshot.chunks):
+            print(f"WARNING: No index at {index_path}")
+            continue
+
+        # Questions whose expected documents are not in this index cannot be answered by any ranking
+        available = {document_key(metadata) for metadata in snapshot.metadata}
+        answerable = [q for q in questions if any(key in available for key in q['relevant'])]
+        print(f"\n{index_path}: {len(snapshot.chunks)} chunks, version {snapshot.version}, "
+              f"{len(answerable)}/{len(questions)} questions answerable")
+
+        for retriever_name in names:
+            name = f"{retriever_name}@{os.path.basename(os.path.normpath(index_path))}"
+            retriever = RETRIEVERS[retriever_name](snapshot, cache)
+            if args.refresh:
+                cache.drop_runs(retriever.fingerprint())
+            try:
+                result = evaluate_config(name, retriever, answerable, cache, ks, args.depth)
+            except Exception as e:
+                print(f"  {name}: failed ({e})")
+                continue
+            report['configs'].append(result)
+            overall = result['overall']
+            recall = '  '.join(f"R@{k} {overall.get(f'recall@{k}', 0):.3f}" for k in ks)
+            print(f"  {name:<40} {recall}  MRR {overall.get('mrr', 0):.3f}  "
+                  f"nDCG@{ks[-1]} {overall.get(f'ndcg@{ks[-1]}', 0):.3f}  ({result['seconds']}s)")
+            for kind, scores in result['by_kind'].items():
+                print(f"    {kind:<38} R@{ks[-1]} {scores.get(f'recall@{ks[-1]}', 0):.3f}  MRR {scores.get('mrr', 0):.3f}")
+
+    report['cache'] = dict(cache.stats)
+    cache.close()
+    print(f"\nCache: {dict(cache.stats)}")
+
+    output = args.output or os.path.join(
+        project_root, 'benchmarks', 'results', f"retrieval-eval-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"SUCCESS: Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
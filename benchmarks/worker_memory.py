@@ -0,0 +1,107 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import argparse
+import json
+import multiprocessing
+import tempfile
+import numpy as np
+from config.settings import settings
+from src.models.shared_index import ensure_index, attach_index
+
+
+def memory_kb():
+    """Rss and Pss of this process; Pss splits shared pages between their users"""
+    values = {}
+    with open('/proc/self/smaps_rollup', 'r') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key.lower()] = int(rest.split()[0])
+    return values
+
+
+def private_worker(npz_path, ready, done, results):
+    data = np.load(npz_path, allow_pickle=True)
+    chunks = data['content'].tolist()
+    embeddings = np.array(data['embeddings'])
+    touched = float(embeddings.sum()) + sum(len(chunk) for chunk in chunks)
+    ready.wait()
+    results.put(dict(memory_kb(), touched=touched))
+    done.wait()
+
+
+def shared_worker(index_dir, ready, done, results):
+    data = attach_index(index_dir)
+    touched = float(np.asarray(data['embeddings']).sum()) + sum(len(chunk) for chunk in data['content'])
+    ready.wait()
+    results.put(dict(memory_kb(), touched=touched))
+    done.wait()
+
+
+def run_mode(target, source, workers):
+    """Start N workers holding the index and sum their memory once all are loaded"""
+    ready = multiprocessing.Barrier(workers + 1)
+    done = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=target, args=(source, ready, done, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    ready.wait()
+    samples = [results.get() for _ in processes]
+    done.set()
+    for process in processes:
+        process.join()
+
+    return {
+        'workers': workers,
+        'total_rss_mb': round(sum(s['rss'] for s in samples) / 1024, 1),
+        'total_pss_mb': round(sum(s['pss'] for s in samples) / 1024, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory of N workers with private vs shared index copies")
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--npz', default=str(settings.EMBEDDINGS_FILE))
+    parser.add_argument('--synthetic-rows', type=int, default=0,
+                        help="Benchmark a random 768-dim corpus of this many rows instead")
+    parser.add_argument('--output', help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method('spawn')
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        npz_path = args.npz
+        if args.synthetic_rows:
+            npz_path = os.path.join(tmp_dir, 'synthetic.npz')
+            rng = np.random.default_rng(0)
+            np.savez(
+                npz_path,
+                embeddings=rng.standard_normal((args.synthetic_rows, 768)),
+                content=np.array([f"synthetic chunk {i} " * 40 for i in range(args.synthetic_rows)], dtype=object),
+                metadata=np.array([{'chunk_id': i} for i in range(args.synthetic_rows)], dtype=object)
+            )
+        index_dir = os.path.join(tmp_dir, 'index')
+        ensure_index(index_dir, npz_path)
+
+        print(f"{'mode':<8} {'workers':>7} {'sum RSS MB':>11} {'sum PSS MB':>11}")
+        for workers in [int(n) for n in args.workers.split(',')]:
+            for mode, target, source in (('private', private_worker, npz_path),
+                                         ('shared', shared_worker, index_dir)):
+                result = dict(run_mode(target, source, workers), mode=mode)
+                results.append(result)
+                print(f"{mode:<8} {workers:>7} {result['total_rss_mb']:>11} {result['total_pss_mb']:>11}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,20 +11,148 @@ class Settings:
     RAW_DATA_PATH = BASE_DIR / "data" / "raw"
     PROCESSED_DATA_PATH = BASE_DIR / "data" / "processed"
     
+    # Course Scraper Configuration
+    TDS_COURSE_URL = os.getenv("TDS_COURSE_URL", "https://tds.s-anand.net")
+    REQUEST_DELAY = float(os.getenv("REQUEST_DELAY", 1.0))
+    COURSE_SCRAPER_WORKERS = int(os.getenv("COURSE_SCRAPER_WORKERS", 4))
+    
+    # Discourse category and term scraped by default (per-course values go in COURSES_FILE)
+    DISCOURSE_BASE_URL = os.getenv("DISCOURSE_BASE_URL", "https://discourse.onlinedegree.iitm.ac.in")
+    DISCOURSE_CATEGORY_ID = int(os.getenv("DISCOURSE_CATEGORY_ID", 34))
+    DISCOURSE_CATEGORY_SLUG = os.getenv("DISCOURSE_CATEGORY_SLUG", "courses/tds-kb")
+    DISCOURSE_START_DATE = os.getenv("DISCOURSE_START_DATE", "2025-01-01")
+    DISCOURSE_END_DATE = os.getenv("DISCOURSE_END_DATE", "2025-04-14")
+    
     # API Configuration
     API_HOST = os.getenv("API_HOST", "0.0.0.0")
     API_PORT = int(os.getenv("API_PORT", 8000))
+    API_WORKERS = int(os.getenv("API_WORKERS", 1))
+    # Workers attach to one memory-mapped index instead of loading private copies
+    SHARED_INDEX = os.getenv("SHARED_INDEX", "true" if API_WORKERS > 1 else "false").lower() in ("1", "true", "yes")
+    # Index hot swap: POST /admin/reload with X-Admin-Token, or poll the index files of every
+    # loaded course for rebuilds every INDEX_WATCH_INTERVAL seconds (0 = off)
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+    INDEX_WATCH_INTERVAL = float(os.getenv("INDEX_WATCH_INTERVAL", 0))
+    # On-demand CPU/allocation profiles under /admin/profile (also needs ADMIN_TOKEN);
+    # PROFILE_STARTUP records the startup loader for GET /admin/profile/startup
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+    PROFILE_STARTUP = os.getenv("PROFILE_STARTUP", "false").lower() in ("1", "true", "yes")
+    PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 60))
     
     # Gemini Configuration (Primary - Free for testing)
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "your_gemini_api_key_here")
+    # Alternative REST endpoint (a proxy, or the stub in benchmarks/load_test.py); empty uses Google's
+    GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT", "")
+    
+    # SDKs imported in the background at startup: "auto" (gemini,image when a key is set), "none", or a list
+    PREFETCH_MODULES = os.getenv("PREFETCH_MODULES", "auto")
     
     # Model Configuration (Gemini models from session)
     EMBEDDING_MODEL = "models/embedding-001"  # Gemini embedding model
     CHAT_MODEL = "gemini-2.0-flash"  # Gemini chat model (15 requests/min free)
     
+    # Second stage: rerank the dense top RERANK_CANDIDATES on CPU and send RERANK_TOP_K chunks to the LLM
+    RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() in ("1", "true", "yes")
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 20))
+    RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", 3))
+    RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", 20))
+    
+    # Expand Discourse hits with up to THREAD_EXPAND_POSTS posts of the same thread (0 = off),
+    # taken from THREAD_EXPAND_BEFORE posts before to THREAD_EXPAND_AFTER after, best-voted first
+    THREAD_EXPAND_POSTS = int(os.getenv("THREAD_EXPAND_POSTS", 2))
+    THREAD_EXPAND_BEFORE = int(os.getenv("THREAD_EXPAND_BEFORE", 1))
+    THREAD_EXPAND_AFTER = int(os.getenv("THREAD_EXPAND_AFTER", 5))
+    
+    # Source links returned with an answer, one per distinct topic or course page
+    RESPONSE_MAX_LINKS = int(os.getenv("RESPONSE_MAX_LINKS", 5))
+    
+    # Conversation sessions: /ask with a session_id keeps the last SESSION_MAX_TURNS turns as short
+    # summaries plus the chunks retrieved so far; idle sessions expire after SESSION_TTL_SECONDS and
+    # the least recently used go beyond SESSION_MAX_SESSIONS. A follow-up whose embedding is within
+    # SESSION_REUSE_SIMILARITY of the previous question reuses its retrieval; other follow-ups search
+    # with the previous question blended in at SESSION_CONTEXT_WEIGHT. Sessions are kept in each
+    # worker's memory, so with API_WORKERS > 1 route a session_id to one worker (sticky routing)
+    SESSIONS_ENABLED = os.getenv("SESSIONS_ENABLED", "true").lower() in ("1", "true", "yes")
+    SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", 10000))
+    SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", 1800))
+    SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", 4))
+    SESSION_MAX_CHUNKS = int(os.getenv("SESSION_MAX_CHUNKS", 10))
+    SESSION_SUMMARY_CHARS = int(os.getenv("SESSION_SUMMARY_CHARS", 300))
+    SESSION_REUSE_SIMILARITY = float(os.getenv("SESSION_REUSE_SIMILARITY", 0.9))
+    SESSION_CONTEXT_WEIGHT = float(os.getenv("SESSION_CONTEXT_WEIGHT", 0.3))
+    
+    # Image pipeline: uploads are validated, downscaled and described once per pixel digest (sha256
+    # of the downscaled pixels). IMAGE_NEAR_DUPLICATE_CACHE also reuses descriptions of images with
+    # an identical IMAGE_NEAR_DUPLICATE_HASH_SIZE**2-bit perceptual hash (recompressed re-sends), at
+    # the risk of matching same-layout screenshots with different text
+    IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", 10 * 1024 * 1024))
+    IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 40_000_000))
+    IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", 1568))
+    IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", 1024))
+    IMAGE_NEAR_DUPLICATE_CACHE = os.getenv("IMAGE_NEAR_DUPLICATE_CACHE", "false").lower() in ("1", "true", "yes")
+    IMAGE_NEAR_DUPLICATE_HASH_SIZE = int(os.getenv("IMAGE_NEAR_DUPLICATE_HASH_SIZE", 16))
+    
+    # Local OCR (needs pytesseract + tesseract): "auto" uses it when installed, "false" disables
+    OCR_ENABLED = os.getenv("OCR_ENABLED", "auto")
+    OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", 70))
+    OCR_MIN_CHARS = int(os.getenv("OCR_MIN_CHARS", 20))
+    
+    # Request tracing: requests slower than TRACE_SLOW_MS go to a rotating JSONL log;
+    # set OTLP_ENDPOINT (e.g. http://localhost:4318) to export every trace to a collector
+    TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", 2000))
+    TRACE_LOG_PATH = Path(os.getenv("TRACE_LOG_PATH", str(BASE_DIR / "logs" / "slow_requests.jsonl")))
+    TRACE_LOG_MAX_BYTES = int(os.getenv("TRACE_LOG_MAX_BYTES", 10 * 1024 * 1024))
+    TRACE_LOG_BACKUPS = int(os.getenv("TRACE_LOG_BACKUPS", 5))
+    OTLP_ENDPOINT = os.getenv("OTLP_ENDPOINT", "")
+    # Event-loop lag probe period in seconds, exported as tds_event_loop_lag_seconds (0 = off)
+    EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", 0.5))
+    
     # Vector Storage Configuration
-    EMBEDDINGS_FILE = PROCESSED_DATA_PATH / "comprehensive_embeddings.npz"
+    KNOWLEDGE_BASE_FILE = Path(os.getenv("KNOWLEDGE_BASE_FILE", str(RAW_DATA_PATH / "tds_course_all.json")))
+    EMBEDDINGS_FILE = Path(os.getenv("EMBEDDINGS_FILE", str(PROCESSED_DATA_PATH / "comprehensive_embeddings.npz")))
     MAX_EMBEDDINGS_SIZE_MB = 15
+    
+    # Streaming ingestion output (raw float32 matrix + chunks.jsonl + manifest.json)
+    INDEX_DIR = Path(os.getenv("INDEX_DIR", str(PROCESSED_DATA_PATH / "index")))
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+    
+    # Several courses/terms in one process: COURSES_FILE lists them (JSON, one index each) and
+    # /ask picks one with "course"; DEFAULT_COURSE is the index above, loaded at startup and never
+    # evicted. The others load on first use and are evicted least recently used first when their
+    # indexes exceed COURSE_INDEX_MEMORY_MB
+    COURSES_FILE = Path(os.getenv("COURSES_FILE", str(BASE_DIR / "config" / "courses.json")))
+    DEFAULT_COURSE = os.getenv("DEFAULT_COURSE", "tds-2025-01")
+    COURSE_INDEX_MEMORY_MB = float(os.getenv("COURSE_INDEX_MEMORY_MB", 1024))
+    
+    # Consolidated raw discourse corpus (SQLite): every scraper saves topics here and ingestion
+    # reads it, plus any legacy discourse_topic_<id>.json newer than the stored copy. Scrapers
+    # writing to another output directory use <output_dir>/discourse_corpus.sqlite3. Set
+    # SCRAPER_WRITE_JSON to also write the per-topic JSON files (compact)
+    CORPUS_DB_PATH = Path(os.getenv("CORPUS_DB_PATH", str(RAW_DATA_PATH / "discourse_corpus.sqlite3")))
+    SCRAPER_WRITE_JSON = os.getenv("SCRAPER_WRITE_JSON", "false").lower() in ("1", "true", "yes")
+    
+    # Precomputed answers for recurring questions (built by src/models/precomputed_answers.py); with
+    # PRECOMPUTED_REFRESH_ON_SWAP one worker rebuilds them after a swap and the others load its file
+    PRECOMPUTED_ANSWERS_FILE = Path(os.getenv("PRECOMPUTED_ANSWERS_FILE", str(PROCESSED_DATA_PATH / "precomputed_answers.npz")))
+    PRECOMPUTED_MIN_SIMILARITY = float(os.getenv("PRECOMPUTED_MIN_SIMILARITY", 0.92))
+    PRECOMPUTED_MERGE_THRESHOLD = float(os.getenv("PRECOMPUTED_MERGE_THRESHOLD", 0.9))
+    PRECOMPUTED_MAX_CLUSTERS = int(os.getenv("PRECOMPUTED_MAX_CLUSTERS", 300))
+    PRECOMPUTED_REFRESH_ON_SWAP = os.getenv("PRECOMPUTED_REFRESH_ON_SWAP", "false").lower() in ("1", "true", "yes")
+    
+    # Chunking Configuration (structure-aware chunker)
+    CHUNK_TARGET_TOKENS = int(os.getenv("CHUNK_TARGET_TOKENS", 350))
+    CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", 500))
+    # Words repeated at the start of the next chunk when a section is split for size (0 = off)
+    CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", 50))
+    
+    # HTML Cleaning Configuration ("auto" prefers lxml when installed)
+    HTML_PARSER = os.getenv("HTML_PARSER", "auto")
+    HTML_CLEAN_WORKERS = int(os.getenv("HTML_CLEAN_WORKERS", 0))  # 0 = one per CPU
+    
+    # Async Discourse Scraper Configuration
+    SCRAPER_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", 4))
+    SCRAPER_REQUESTS_PER_SECOND = float(os.getenv("SCRAPER_REQUESTS_PER_SECOND", 2.0))
+    SCRAPER_MAX_RETRIES = int(os.getenv("SCRAPER_MAX_RETRIES", 5))
 
 # Create settings instance
 settings = Settings()
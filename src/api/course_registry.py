@@ -0,0 +1,275 @@
+import asyncio
+import functools
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from config.settings import settings
+from src.api.index_manager import IndexManager, load_snapshot, validate_snapshot
+
+
+def default_course():
+    """The course described by the settings, i.e. the single index the service always served"""
+    return {
+        'id': settings.DEFAULT_COURSE,
+        'name': 'TDS',
+        'data_path': str(settings.KNOWLEDGE_BASE_FILE),
+        'embeddings_path': str(settings.EMBEDDINGS_FILE),
+        'index_dir': str(getattr(settings, 'INDEX_DIR', '')),
+        'course_url': getattr(settings, 'TDS_COURSE_URL', ''),
+        'discourse': {
+            'category_id': settings.DISCOURSE_CATEGORY_ID,
+            'category_slug': settings.DISCOURSE_CATEGORY_SLUG,
+            'start_date': settings.DISCOURSE_START_DATE,
+            'end_date': settings.DISCOURSE_END_DATE
+        }
+    }
+
+
+def load_courses(path=None):
+    """{course id: entry} from a COURSES_FILE; the settings course is always the first entry.
+
+    The file holds a list (or {"courses": [...]}) of objects with an "id",
+    "embeddings_path" and/or "index_dir", and optionally "data_path",
+    "name", "course_url", "links" (fallback links) and "discourse"
+    (DiscourseScraperFixed arguments). Relative paths are resolved against
+    the project root. An entry with the default course id overrides its
+    settings values except the index paths: the default course is served
+    by the settings-built manager, so a different data_path,
+    embeddings_path or index_dir for it is a ValueError.
+    """
+    default = default_course()
+    courses = OrderedDict([(default['id'], default)])
+    path = str(path or getattr(settings, 'COURSES_FILE', ''))
+    if not path or not os.path.exists(path):
+        return courses
+
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    if isinstance(entries, dict):
+        entries = entries.get('courses', [])
+    for entry in entries:
+        course_id = entry['id']
+        # Other courses must not fall back to the default course's files
+        course = dict(default if course_id == default['id'] else {'name': course_id, 'data_path': '', 'index_dir': ''})
+        course.update(entry)
+        for key in ('data_path', 'embeddings_path', 'index_dir'):
+            if course.get(key) and not os.path.isabs(course[key]):
+                course[key] = str(settings.BASE_DIR / course[key])
+        if course_id == default['id']:
+            overridden = [key for key in ('data_path', 'embeddings_path', 'index_dir')
+                          if os.path.normpath(course.get(key) or '.') != os.path.normpath(default[key] or '.')]
+            if overridden:
+                raise ValueError(f"Course {course_id} is the default course; set its {', '.join(overridden)} "
+                                 f"in the settings (KNOWLEDGE_BASE_FILE, EMBEDDINGS_FILE, INDEX_DIR) instead")
+        if not course.get('embeddings_path') and not course.get('index_dir'):
+            raise ValueError(f"Course {course_id} needs an embeddings_path or an index_dir")
+        courses[course_id] = course
+    return courses
+
+
+def snapshot_bytes(snapshot):
+    """Approximate resident size of an index: embeddings, in-memory chunk texts and metadata"""
+    size = int(getattr(snapshot.embeddings, 'nbytes', 0))
+    if isinstance(snapshot.chunks, list):
+        size += sum(len(chunk) for chunk in snapshot.chunks)
+    metadata_bytes = getattr(snapshot.metadata, 'nbytes', None)
+    if callable(metadata_bytes):
+        size += metadata_bytes()
+    return size
+
+
+class CourseRegistry:
+    """Course id -> IndexManager, loaded on first use and evicted least recently used first.
+
+    The default course is the manager the app starts with; it is loaded at
+    startup and never evicted. Any other course is loaded the first time a
+    request names it (one load per course however many requests race for
+    it), after which the least recently used courses are dropped until the
+    resident indexes fit the memory budget. Requests already holding an
+    evicted snapshot finish on it, and the per-snapshot reranker and
+    thread caches go with the last reference. After start_watching(), every
+    resident course has its own IndexManager.watch task, started when the
+    course loads and cancelled when it is evicted.
+    """
+
+    def __init__(self, courses, default_course=None, default_manager=None, memory_budget=None):
+        self.courses = courses
+        self.default_course = default_course if default_course in courses else next(iter(courses))
+        self.memory_budget = memory_budget
+        # Callables run with the snapshot of every lazily loaded course, and on its reloads
+        self.on_load = []
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        # Least recently used first
+        self._managers = OrderedDict()
+        self._managers[self.default_course] = default_manager or self.make_manager(courses[self.default_course])
+        # course id -> (manager, watch task), only touched on the event loop
+        self.watch_interval = 0
+        self._loop = None
+        self._watchers = {}
+
+    @classmethod
+    def from_settings(cls, path=None, default_manager=None):
+        try:
+            courses = load_courses(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not read courses file, serving only the default course: {e}")
+            courses = load_courses(os.devnull)
+        return cls(
+            courses, default_course=getattr(settings, 'DEFAULT_COURSE', None), default_manager=default_manager,
+            memory_budget=int(getattr(settings, 'COURSE_INDEX_MEMORY_MB', 1024) * 1024 * 1024)
+        )
+
+    def __len__(self):
+        return len(self._managers)
+
+    @property
+    def default_manager(self):
+        return self._managers[self.default_course]
+
+    def resolve(self, course=None):
+        """Course id for a request value (None = default); KeyError for unknown courses"""
+        course_id = course or self.default_course
+        if course_id not in self.courses:
+            raise KeyError(course_id)
+        return course_id
+
+    def course(self, course=None):
+        return self.courses[self.resolve(course)]
+
+    def make_manager(self, course):
+        index_dir = course.get('index_dir') or ''
+        embeddings_path = course.get('embeddings_path') or ''
+        loader = functools.partial(load_snapshot, data_path=course.get('data_path') or '',
+                                   embeddings_path=embeddings_path, index_dir=index_dir)
+        watch_paths = ([os.path.join(index_dir, 'manifest.json')] if index_dir else []) + [embeddings_path]
+        return IndexManager(loader=loader, watch_paths=[path for path in watch_paths if path])
+
+    def loaded(self, course=None):
+        """The course's manager if its index is resident (marking it recently used), else None"""
+        course_id = self.resolve(course)
+        with self._lock:
+            manager = self._managers.get(course_id)
+            if manager is not None:
+                self._managers.move_to_end(course_id)
+            return manager
+
+    def get(self, course=None):
+        """Manager of a course, loading its index on first use; blocks, so call it off the event loop"""
+        manager = self.loaded(course)
+        if manager is not None:
+            return manager
+
+        course_id = self.resolve(course)
+        with self._lock:
+            load_lock = self._load_locks.setdefault(course_id, threading.Lock())
+        with load_lock:
+            manager = self.loaded(course_id)
+            if manager is not None:
+                return manager
+            manager = self.make_manager(self.courses[course_id])
+            snapshot = manager.load_initial()
+            # A missing or broken index is not cached; the next request retries the load
+            validate_snapshot(snapshot)
+            for callback in self.on_load:
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    print(f"Course load callback {getattr(callback, '__name__', callback)} failed: {e}")
+                manager.on_swap.append(callback)
+            print(f"Loaded course {course_id}: {len(snapshot.chunks)} chunks from {snapshot.source}")
+            # Watch and unwatch are queued under the lock, so they reach the loop in order
+            with self._lock:
+                self._managers[course_id] = manager
+                self.watch(course_id, manager)
+                self.evict(keep=course_id)
+        return manager
+
+    def evict(self, keep=None):
+        """Drop least recently used courses until the resident indexes fit the budget; call under _lock"""
+        sizes = {course_id: snapshot_bytes(manager.current) for course_id, manager in self._managers.items()}
+        total = sum(sizes.values())
+        if self.memory_budget is None:
+            return total
+        for course_id in list(self._managers):
+            if total <= self.memory_budget:
+                break
+            if course_id in (self.default_course, keep):
+                continue
+            del self._managers[course_id]
+            self.unwatch(course_id)
+            total -= sizes[course_id]
+            self.evictions += 1
+            print(f"Evicted course {course_id} ({sizes[course_id] / 1024 / 1024:.1f} MB)")
+        return total
+
+    def start_watching(self, interval):
+        """Poll the index files of every resident course, and of courses loaded later; call on the event loop"""
+        self.watch_interval = interval
+        self._loop = asyncio.get_running_loop()
+        with self._lock:
+            managers = list(self._managers.items())
+        for course_id, manager in managers:
+            self.watch(course_id, manager)
+
+    def _on_loop(self, callback):
+        """Run callback on the watching event loop, from it or from a loader thread"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            callback()
+        else:
+            try:
+                self._loop.call_soon_threadsafe(callback)
+            except RuntimeError:
+                pass  # The loop is closed: the app is shutting down
+
+    def watch(self, course_id, manager):
+        if not self.watch_interval or self._loop is None:
+            return
+
+        def start():
+            # The course may have been evicted (or reloaded) since this was queued
+            if self._managers.get(course_id) is not manager:
+                return
+            current = self._watchers.get(course_id)
+            if current is not None:
+                if current[0] is manager:
+                    return
+                current[1].cancel()
+            self._watchers[course_id] = (manager, self._loop.create_task(manager.watch(self.watch_interval)))
+
+        self._on_loop(start)
+
+    def unwatch(self, course_id):
+        if self._loop is None:
+            return
+
+        def stop():
+            current = self._watchers.pop(course_id, None)
+            if current is not None:
+                current[1].cancel()
+
+        self._on_loop(stop)
+
+    def describe(self):
+        with self._lock:
+            managers = list(self._managers.items())
+        loaded = {
+            course_id: dict(manager.current.describe(), bytes=snapshot_bytes(manager.current))
+            for course_id, manager in managers
+        }
+        return {
+            'default': self.default_course,
+            'available': list(self.courses),
+            'loaded': loaded,
+            'resident_bytes': sum(course['bytes'] for course in loaded.values()),
+            'memory_budget_bytes': self.memory_budget,
+            'evictions': self.evictions,
+            'watched': sorted(self._watchers)
+        }
@@ -0,0 +1,175 @@
+import os
+import json
+import threading
+import time
+from datetime import datetime
+import numpy as np
+
+from config.settings import settings
+
+
+class IndexSnapshot:
+    """One immutable version of everything retrieval reads.
+
+    Request handlers take `manager.current` once and use that object to the
+    end, so a swap never mixes chunks of one version with embeddings of
+    another.
+    """
+
+    def __init__(self, knowledge_base, chunks, embeddings, metadata=None, version='empty', source=None):
+        self.knowledge_base = knowledge_base
+        self.chunks = chunks
+        self.embeddings = embeddings
+        self.metadata = metadata if metadata is not None else []
+        self.version = version
+        self.source = source
+        self.loaded_at = datetime.now().isoformat()
+        self.generation = 0
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'generation': self.generation,
+            'source': self.source,
+            'loaded_at': self.loaded_at,
+            'chunks': len(self.chunks)
+        }
+
+
+def _file_version(path):
+    stat = os.stat(path)
+    return f"{int(stat.st_mtime)}-{stat.st_size}"
+
+
+def load_snapshot(data_path=None, embeddings_path=None, index_dir=None):
+    """Read the knowledge base and the on-disk index (or the npz archive) into a snapshot"""
+    # None means the settings paths; an empty string means "this index has none"
+    data_path = str(data_path if data_path is not None else settings.KNOWLEDGE_BASE_FILE)
+    embeddings_path = str(embeddings_path if embeddings_path is not None else settings.EMBEDDINGS_FILE)
+    index_dir = str(index_dir if index_dir is not None else getattr(settings, 'INDEX_DIR', ''))
+
+    knowledge_base = {}
+    if data_path and os.path.exists(data_path):
+        with open(data_path, 'r', encoding='utf-8') as f:
+            knowledge_base = json.load(f)
+
+    if index_dir and os.path.exists(os.path.join(index_dir, 'manifest.json')):
+        from src.models.shared_index import attach_index, ensure_index
+        # An index converted from the npz is rebuilt (by one process) once the npz is rewritten
+        try:
+            ensure_index(index_dir, embeddings_path)
+        except OSError as e:
+            print(f"Could not rebuild index at {index_dir}, serving the existing one: {e}")
+        data = attach_index(index_dir)
+        manifest = data['manifest']
+        version = manifest.get('version') or f"{manifest.get('created_at', '')}-{manifest['count']}"
+        return IndexSnapshot(knowledge_base, data['content'], data['embeddings'], data['metadata'],
+                             version=version, source=index_dir)
+
+    if embeddings_path and os.path.exists(embeddings_path):
+        from src.models.metadata_columns import MetadataColumns
+        data = np.load(embeddings_path, allow_pickle=True)
+        # Columns instead of one dict per chunk; metadata[row] still yields the dict
+        metadata = MetadataColumns.from_records(data['metadata']) if 'metadata' in data.files else []
+        return IndexSnapshot(knowledge_base, data['content'].tolist(), data['embeddings'], metadata,
+                             version=_file_version(embeddings_path), source=embeddings_path)
+
+    return IndexSnapshot(knowledge_base, [], [], version='empty')
+
+
+def validate_snapshot(snapshot, expected_dim=None):
+    """Raise ValueError if a freshly loaded snapshot is not safe to serve"""
+    if len(snapshot.embeddings) != len(snapshot.chunks):
+        raise ValueError(f"{len(snapshot.chunks)} chunks but {len(snapshot.embeddings)} embeddings")
+    if len(snapshot.embeddings) == 0:
+        raise ValueError("Index is empty")
+    dim = snapshot.embeddings.shape[1]
+    if expected_dim and dim != expected_dim:
+        raise ValueError(f"Embedding dimension {dim} does not match the serving index ({expected_dim})")
+    sample = np.asarray(snapshot.embeddings[:min(len(snapshot.embeddings), 256)])
+    if not np.isfinite(sample).all():
+        raise ValueError("Index contains non-finite embeddings")
+
+
+class IndexManager:
+    """Holds the current IndexSnapshot and swaps in new versions atomically.
+
+    reload() loads and validates the new version off to the side, then
+    replaces `current` with a single assignment; requests that already
+    hold the old snapshot finish on it. With several workers every process
+    has its own manager, so the polling watcher is the way to reload them
+    all.
+    """
+
+    def __init__(self, loader=load_snapshot, watch_paths=None):
+        self.loader = loader
+        # Files whose rewrite means a new version (default: the settings paths)
+        self.watch_paths = watch_paths
+        self.current = IndexSnapshot({}, [], [])
+        self.last_error = None
+        self._reload_lock = threading.Lock()
+        self._generation = 0
+        self._watch_mtime = None
+        # Callables run with the new snapshot after every successful reload
+        self.on_swap = []
+
+    def swap(self, snapshot):
+        self._generation += 1
+        snapshot.generation = self._generation
+        self.current = snapshot
+        return snapshot
+
+    def load_initial(self):
+        self._watch_mtime = self.watched_mtime()
+        return self.swap(self.loader())
+
+    def reload(self):
+        """Load, validate and swap in a new version; returns (swapped, info)"""
+        if not self._reload_lock.acquire(blocking=False):
+            return False, {'error': 'Reload already in progress'}
+        try:
+            started = time.perf_counter()
+            self._watch_mtime = self.watched_mtime()
+            snapshot = self.loader()
+            old = self.current
+            old_dim = old.embeddings.shape[1] if len(old.embeddings) else None
+            validate_snapshot(snapshot, old_dim)
+            if snapshot.version == old.version and snapshot.source == old.source:
+                return False, dict(old.describe(), unchanged=True)
+            self.swap(snapshot)
+            self.last_error = None
+            print(f"Swapped index {old.version} -> {snapshot.version} "
+                  f"in {time.perf_counter() - started:.2f}s")
+            for callback in self.on_swap:
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    print(f"Swap callback {getattr(callback, '__name__', callback)} failed: {e}")
+            return True, snapshot.describe()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Index reload rejected: {e}")
+            return False, {'error': str(e)}
+        finally:
+            self._reload_lock.release()
+
+    def watched_mtime(self):
+        """Latest modification time of the watched files, so rewriting any of them is noticed"""
+        paths = self.watch_paths
+        if paths is None:
+            index_dir = str(getattr(settings, 'INDEX_DIR', ''))
+            paths = ([os.path.join(index_dir, 'manifest.json')] if index_dir else []) + [str(settings.EMBEDDINGS_FILE)]
+        mtimes = [os.stat(path).st_mtime for path in paths if os.path.exists(path)]
+        return max(mtimes) if mtimes else None
+
+    def changed_on_disk(self):
+        mtime = self.watched_mtime()
+        return mtime is not None and mtime != self._watch_mtime
+
+    async def watch(self, interval):
+        """Poll the index files and reload when a rebuild lands"""
+        import asyncio
+        while True:
+            await asyncio.sleep(interval)
+            if self.changed_on_disk():
+                await asyncio.to_thread(self.reload)
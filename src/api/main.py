@@ -1,25 +1,38 @@
 import sys
 import os
-import json
-import base64
+import asyncio
+import importlib.util
 import hashlib
-import io
+import threading
+import time
 import numpy as np
+from contextlib import contextmanager
 from datetime import datetime
 
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, Response, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 
 from config.settings import settings
+from src.api.index_manager import IndexManager
+from src.api.course_registry import CourseRegistry
+from src.api.sessions import SessionStore
+from src.api.tracing import TracingMiddleware, span
+from src.api.metrics import (
+    REGISTRY, CONTENT_TYPE, Gauge, ASK_STAGE_SECONDS, ASK_REQUESTS, FALLBACKS, CACHE_LOOKUPS, UPSTREAM_ERRORS,
+    EVENT_LOOP_LAG, monitor_event_loop_lag
+)
+from src.api import profiling
+from src.api.warmup import gemini_configured, start_warmup, warmup_status
+from src.utils.ocr import extract_text, ocr_enabled
+from src.utils.image_pipeline import DescriptionCache, ImageValidationError, prepare_image
+from src.models.reranker import LexicalReranker
+from src.models.thread_index import ThreadExpander
 
-# Optional import for enhanced vector search
-try:
-    from src.models.vector_store_complete import ComprehensiveVectorStore
-    VECTOR_STORE_AVAILABLE = True
-except ImportError:
-    VECTOR_STORE_AVAILABLE = False
+# Only check that the ingestion stack is installed; importing it pulls in
+# requests and bs4, which the serving path never needs
+VECTOR_STORE_AVAILABLE = importlib.util.find_spec("src.models.vector_store_complete") is not None
 
 # Initialize FastAPI
 app = FastAPI(
@@ -37,107 +50,304 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request id, per-stage spans, Server-Timing header and slow-request log
+app.add_middleware(TracingMiddleware)
+
 # Request/Response models
 class QuestionRequest(BaseModel):
     question: str
     image: Optional[str] = None
     context: Optional[str] = "general"
+    course: Optional[str] = None
+    # Any unguessable client-chosen id (e.g. a UUID) to ask follow-up questions
+    session_id: Optional[str] = None
 
 class TAResponse(BaseModel):
     answer: str
     links: List[Dict[str, str]]
-
-# Global state
-knowledge_base = {}
-chunks = []
-embeddings = []
+    session_id: Optional[str] = None
+
+# Global state: the served index lives in one swappable snapshot
+index_manager = IndexManager()
+# Other courses/terms get their own index, loaded on first use and LRU-evicted under a memory cap
+course_registry = CourseRegistry.from_settings(default_manager=index_manager)
+precomputed_answers = None
+image_description_cache = DescriptionCache()
+reranker = LexicalReranker()
+thread_expander = ThreadExpander()
+session_store = SessionStore()
+startup_profile = None
+
+INDEX_CHUNKS = Gauge('tds_index_chunks', 'Chunks in the served index',
+                     fn=lambda: len(index_manager.current.chunks))
+INDEX_DIMENSION = Gauge('tds_index_dimension', 'Embedding dimension of the served index',
+                        fn=lambda: index_manager.current.embeddings.shape[1] if len(index_manager.current.embeddings) else 0)
+INDEX_GENERATION = Gauge('tds_index_generation', 'Hot-swap generation of the served index',
+                         fn=lambda: index_manager.current.generation)
+INDEX_EMBEDDING_BYTES = Gauge('tds_index_embedding_bytes', 'Size of the embedding matrix',
+                              fn=lambda: getattr(index_manager.current.embeddings, 'nbytes', 0))
+COURSE_INDEXES = Gauge('tds_course_indexes_loaded', 'Course indexes resident in this worker',
+                       fn=lambda: len(course_registry))
+SESSIONS_ACTIVE = Gauge('tds_sessions_active', 'Conversation sessions held by this worker',
+                        fn=lambda: len(session_store))
+PRECOMPUTED_ENTRIES = Gauge('tds_precomputed_answers', 'Entries in the precomputed answer table',
+                            fn=lambda: len(precomputed_answers) if precomputed_answers is not None else 0)
+
+DEFAULT_LINKS = [
+    {
+        "url": "https://tds.s-anand.net/#/2025-01/",
+        "text": "TDS Course Content"
+    },
+    {
+        "url": "https://discourse.onlinedegree.iitm.ac.in/c/courses/tds-kb/34",
+        "text": "TDS Discourse"
+    }
+]
+
+@contextmanager
+def ask_stage(name):
+    """Time one /ask stage into both the trace and the stage histogram"""
+    with span(name), ASK_STAGE_SECONDS.time(stage=name):
+        yield
+
+def load_precomputed_answers(snapshot=None):
+    """(Re)load the precomputed answer table and refresh it in the background if stale"""
+    global precomputed_answers
+    from src.models.precomputed_answers import PrecomputedAnswers, refresh_precomputed_answers
+
+    snapshot = snapshot or index_manager.current
+    path = str(getattr(settings, 'PRECOMPUTED_ANSWERS_FILE', ''))
+    table = PrecomputedAnswers.load(path) if path else None
+    precomputed_answers = table
+    if table is not None:
+        print(f"Loaded {len(table)} precomputed answers (index {table.index_version})")
+
+    stale = table is None or table.index_version != snapshot.version
+    # Hash-fallback vectors put unrelated questions close together, so no key means no table
+    if path and stale and getattr(settings, 'PRECOMPUTED_REFRESH_ON_SWAP', False) and len(snapshot.chunks) > 0 \
+            and gemini_configured():
+        def refresh():
+            global precomputed_answers
+            precomputed_answers = refresh_precomputed_answers(
+                snapshot, model_embedding, precomputed_answer_for(snapshot), path=path
+            )
+        threading.Thread(target=refresh, name='precomputed-refresh', daemon=True).start()
+
+def precomputed_answer_for(index):
+    """answer(question) -> (text, links) as /ask would give it on this index, for building the table"""
+    def answer(question):
+        results = retrieve_context(question, index)
+        return generate_response(question, results), source_links(results, index)
+    return answer
+
+def match_precomputed(query_embedding, index):
+    """Serve a pre-generated answer when the question is close to a known cluster"""
+    table = precomputed_answers
+    if table is None or table.index_version != index.version:
+        return None
+    return table.match(query_embedding, getattr(settings, 'PRECOMPUTED_MIN_SIMILARITY', 0.92))
 
 @app.on_event("startup")
 async def load_knowledge_base():
-    global knowledge_base, chunks, embeddings
+    global startup_profile
+    session = None
+    if getattr(settings, 'PROFILE_STARTUP', False) and profiling.try_acquire():
+        session = profiling.ProfileSession(cpu=True, memory=True).start()
+
     try:
-        # Use relative paths from project root (Render's working directory)
-        data_path = "data/raw/tds_course_all.json"
-        embeddings_path = "data/processed/comprehensive_embeddings.npz"
+        # The default course; other courses load on their first request
+        data_path = str(settings.KNOWLEDGE_BASE_FILE)
+        embeddings_path = str(settings.EMBEDDINGS_FILE)
 
         print(f"Trying data_path: {os.path.abspath(data_path)}")
         print(f"Trying embeddings_path: {os.path.abspath(embeddings_path)}")
 
-        if os.path.exists(data_path):
-            with open(data_path, 'r', encoding='utf-8') as f:
-                knowledge_base = json.load(f)
-            print(f"Loaded {len(knowledge_base)} sections from knowledge base")
-        else:
-            print("Knowledge base file not found at", data_path)
-            knowledge_base = {}
-
-        if os.path.exists(embeddings_path):
-            data = np.load(embeddings_path, allow_pickle=True)
-            chunks = data['content'].tolist()
-            embeddings = data['embeddings']
-            print(f"Loaded {len(chunks)} chunks and embeddings")
+        index_dir = str(getattr(settings, 'INDEX_DIR', ''))
+        if index_dir and getattr(settings, 'SHARED_INDEX', False):
+            try:
+                # First worker converts the npz archive; the rest wait and attach
+                from src.models.shared_index import ensure_index
+                ensure_index(index_dir, embeddings_path)
+            except OSError as e:
+                print(f"Could not build shared index at {index_dir}: {e}")
+
+        snapshot = index_manager.load_initial()
+        print(f"Loaded {len(snapshot.knowledge_base)} sections from knowledge base")
+        if len(snapshot.chunks) > 0:
+            print(f"Loaded {len(snapshot.chunks)} chunks and embeddings from {snapshot.source} "
+                  f"(version {snapshot.version}, pid {os.getpid()})")
         else:
             print("No embeddings file found at", embeddings_path)
     except Exception as e:
         print(f"Failed to load knowledge base: {e}")
-        knowledge_base = {}
 
-def get_embeddings(text):
-    """Generate embeddings for text using Gemini or fallback to hash-based embedding"""
+    try:
+        load_precomputed_answers()
+    except Exception as e:
+        print(f"Failed to load precomputed answers: {e}")
+    # Answers generated for the previous index are reloaded or rebuilt on every swap
+    index_manager.on_swap.append(load_precomputed_answers)
+
+    # Reranker term statistics and the thread index are per index version;
+    # build them before the first request
+    for component in (reranker, thread_expander):
+        try:
+            component.prepare(index_manager.current)
+        except Exception as e:
+            print(f"Failed to prepare {type(component).__name__}: {e}")
+        index_manager.on_swap.append(component.prepare)
+        course_registry.on_load.append(component.prepare)
+
+    if session is not None:
+        startup_profile = session.stop()
+        profiling.release()
+
+    # Import the Gemini/PIL SDKs and fault in index pages off the request path
+    start_warmup(index_manager.current)
+
+    # Every resident course is polled, including courses loaded on later requests
+    interval = getattr(settings, 'INDEX_WATCH_INTERVAL', 0)
+    if interval > 0:
+        course_registry.start_watching(interval)
+
+    lag_interval = getattr(settings, 'EVENT_LOOP_LAG_INTERVAL', 0)
+    if lag_interval > 0:
+        asyncio.create_task(monitor_event_loop_lag(EVENT_LOOP_LAG, lag_interval))
+
+def configure_gemini():
+    """Configure the Gemini SDK; GEMINI_API_ENDPOINT reroutes it over REST (proxy or load-test stub)"""
+    import google.generativeai as genai
+
+    endpoint = getattr(settings, 'GEMINI_API_ENDPOINT', '')
+    if endpoint:
+        genai.configure(api_key=settings.GEMINI_API_KEY, transport='rest',
+                        client_options={'api_endpoint': endpoint})
+    else:
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+    return genai
+
+def embed_text(text):
+    """(embedding, used_fallback): the Gemini embedding, or the hash-based one if Gemini is unavailable"""
     try:
         if getattr(settings, 'GEMINI_API_KEY', '') and settings.GEMINI_API_KEY != "your_gemini_api_key_here":
-            import google.generativeai as genai
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            result = genai.embed_content(
-                model="models/embedding-001",
-                content=text,
-                task_type="retrieval_document"
-            )
-            return np.array(result['embedding'])
+            genai = configure_gemini()
+            with span('gemini.embed_content'):
+                result = genai.embed_content(
+                    model="models/embedding-001",
+                    content=text,
+                    task_type="retrieval_document"
+                )
+            return np.array(result['embedding']), False
     except Exception as e:
+        UPSTREAM_ERRORS.inc(upstream='gemini_embedding')
         print(f"Gemini embedding failed: {e}")
 
     # Fallback: deterministic hash embedding
+    FALLBACKS.inc(kind='hash_embedding')
     text_hash = hashlib.sha256(text.encode()).hexdigest()
     embedding = np.array([int(text_hash[i:i+2], 16) / 255.0 for i in range(0, min(768, len(text_hash)), 2)])
-    return np.pad(embedding, (0, 384 - len(embedding)), 'constant')[:384]
+    return np.pad(embedding, (0, 384 - len(embedding)), 'constant')[:384], True
 
-def get_image_description(image_data):
-    """Process image using Gemini 2.0 Flash model"""
-    try:
-        if getattr(settings, 'GEMINI_API_KEY', '') and settings.GEMINI_API_KEY != "your_gemini_api_key_here":
-            import google.generativeai as genai
-            from PIL import Image
+def get_embeddings(text):
+    """Generate embeddings for text using Gemini or fallback to hash-based embedding"""
+    return embed_text(text)[0]
 
-            genai.configure(api_key=settings.GEMINI_API_KEY)
+def model_embedding(text):
+    """The Gemini embedding of text, or None when only the hash fallback was available"""
+    embedding, used_fallback = embed_text(text)
+    return None if used_fallback else embedding
 
-            # Decode base64 image
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
+def describe_image_with_gemini(image):
+    """Vision call for an already downscaled PIL image"""
+    genai = configure_gemini()
 
-            # Use Gemini 2.0 Flash for image processing
-            model = genai.GenerativeModel('gemini-2.0-flash')
+    # Use Gemini 2.0 Flash for image processing
+    model = genai.GenerativeModel('gemini-2.0-flash')
 
-            prompt = """
-            Analyze this image in the context of Tools in Data Science (TDS) course.
-            Describe what you see and how it relates to data science concepts, programming, 
-            or course materials. Be specific and educational.
-            """
+    prompt = """
+    Analyze this image in the context of Tools in Data Science (TDS) course.
+    Describe what you see and how it relates to data science concepts, programming, 
+    or course materials. Be specific and educational.
+    """
 
-            response = model.generate_content([prompt, image])
-            return response.text
+    with span('gemini.vision', width=image.width, height=image.height):
+        response = model.generate_content([prompt, image])
+    return response.text
+
+def get_image_description(image_data):
+    """Describe an uploaded image, reusing the cached description of an identical one.
+
+    Local OCR runs first when available; its text is used as the
+    description if tesseract is confident, and only otherwise is the image
+    escalated to the vision model. Decoding, OCR and the vision call are
+    blocking, so callers on the event loop run this in a thread. Raises
+    ImageValidationError for images that are too large or not images at all.
+    """
+    gemini = gemini_configured()
+    ocr = ocr_enabled()
+    if not gemini and not ocr:
+        return None
+
+    try:
+        with span('image.prepare'):
+            prepared = prepare_image(image_data)
+
+        description = image_description_cache.get(prepared)
+        CACHE_LOOKUPS.inc(cache='image_description', result='miss' if description is None else 'hit')
+        if description is not None:
+            return description
+
+        ocr_result = None
+        if ocr:
+            try:
+                with span('image.ocr'):
+                    ocr_result = extract_text(prepared.image)
+            except Exception as e:
+                # A broken tesseract install is not a vision outage; escalate instead
+                UPSTREAM_ERRORS.inc(upstream='tesseract')
+                print(f"OCR failed: {e}")
+            if ocr_result is not None and ocr_result.is_confident():
+                description = f"Text in image:\n{ocr_result.text}"
+                image_description_cache.put(prepared, description)
+                return description
+
+        vision_failed = False
+        if gemini:
+            try:
+                description = describe_image_with_gemini(prepared.image)
+            except Exception as e:
+                UPSTREAM_ERRORS.inc(upstream='gemini_vision')
+                print(f"Vision description failed: {e}")
+                vision_failed = True
+            else:
+                image_description_cache.put(prepared, description)
+                return description
+
+        # No vision model (or it failed): low-confidence text still beats nothing
+        if ocr_result is not None and ocr_result.text:
+            FALLBACKS.inc(kind='low_confidence_ocr')
+            return f"Text in image (low confidence):\n{ocr_result.text}"
+        if vision_failed or ocr_result is None:
+            return "Image processing failed. Please describe your question in text."
+        return None
+    except ImageValidationError:
+        raise
     except Exception as e:
         print(f"Image processing failed: {e}")
         return "Image processing failed. Please describe your question in text."
 
-def search_knowledge_base(query, top_k=5):
+def search_knowledge_base(query, top_k=5, index=None, query_embedding=None):
     """Search knowledge base using vector similarity"""
+    index = index or index_manager.current
+    chunks = index.chunks
+    embeddings = index.embeddings
     try:
         if len(embeddings) == 0:
             return []
 
         # Get query embedding
-        query_embedding = get_embeddings(query)
+        if query_embedding is None:
+            query_embedding = get_embeddings(query)
 
         # Calculate similarities
         similarities = []
@@ -166,21 +376,120 @@ def search_knowledge_base(query, top_k=5):
         print(f"Search failed: {e}")
         return []
 
-def generate_response(question, context_results, image_description=None):
+def carry_over_candidates(rows, index, query_embedding, exclude):
+    """Chunks retrieved in earlier turns of a session, scored against the new question"""
+    query = np.asarray(query_embedding, dtype=np.float32)
+    candidates = []
+    for row in rows:
+        if row in exclude or row >= len(index.chunks):
+            continue
+        embedding = np.asarray(index.embeddings[row], dtype=np.float32)
+        norms = np.linalg.norm(query) * np.linalg.norm(embedding)
+        candidates.append({
+            'content': index.chunks[row],
+            'similarity': float(query @ embedding / norms) if norms else 0.0,
+            'index': row
+        })
+    return candidates
+
+def retrieve_context(search_query, index, query_embedding=None, hits=None, carry_over=()):
+    """Dense search, local rerank and thread expansion: the chunks the LLM gets to see.
+
+    `hits` (a session follow-up reusing the previous retrieval) skips search
+    and rerank; `carry_over` rows from earlier turns compete with the new
+    dense candidates in the rerank.
+    """
+    if hits is not None:
+        context_results = hits
+    else:
+        # Search knowledge base
+        rerank = getattr(settings, 'RERANK_ENABLED', False)
+        with ask_stage('vector_search'):
+            context_results = search_knowledge_base(
+                search_query, top_k=getattr(settings, 'RERANK_CANDIDATES', 20) if rerank else 5,
+                index=index, query_embedding=query_embedding
+            )
+        if carry_over and query_embedding is not None:
+            context_results = context_results + carry_over_candidates(
+                carry_over, index, query_embedding, {result['index'] for result in context_results}
+            )
+            context_results.sort(key=lambda result: result['similarity'], reverse=True)
+
+        # Rerank the dense candidates locally so fewer, better chunks reach the LLM
+        if rerank and context_results:
+            with ask_stage('rerank'):
+                context_results, rerank_info = reranker.rerank(
+                    search_query, context_results, index,
+                    top_k=getattr(settings, 'RERANK_TOP_K', 3), budget_ms=getattr(settings, 'RERANK_BUDGET_MS', 20)
+                )
+            if rerank_info['budget_exhausted']:
+                FALLBACKS.inc(kind='rerank_budget')
+        else:
+            context_results = context_results[:3]
+
+    # Follow Discourse hits into their thread, where the accepted answer usually is
+    posts_per_hit = getattr(settings, 'THREAD_EXPAND_POSTS', 0)
+    if posts_per_hit > 0 and context_results:
+        with ask_stage('thread_expansion'):
+            context_results = thread_expander.expand(
+                context_results, index, posts_per_hit=posts_per_hit,
+                before=getattr(settings, 'THREAD_EXPAND_BEFORE', 1),
+                after=getattr(settings, 'THREAD_EXPAND_AFTER', 5)
+            )
+    return context_results
+
+def course_page_url(url, base=None):
+    """Raw course markdown URL -> the rendered page, e.g. .../docker.md -> .../#/docker"""
+    base = (base or getattr(settings, 'TDS_COURSE_URL', '')).rstrip('/')
+    if base and url.startswith(base + '/') and url.endswith('.md'):
+        page = url[len(base) + 1:-3]
+        return f"{base}/#/" if page == 'README' else f"{base}/#/{page}"
+    return url
+
+def source_links(context_results, index, limit=None, course=None):
+    """One link per distinct source of the retrieved chunks, best hit first"""
+    limit = limit or getattr(settings, 'RESPONSE_MAX_LINKS', 5)
+    course = course or {}
+    metadata = index.metadata
+    links = []
+    seen = set()
+    for result in context_results:
+        row = result.get('index')
+        if row is None or row >= len(metadata):
+            continue
+        meta = metadata[row]
+        url = meta.get('url')
+        if not url:
+            continue
+        if meta.get('type') == 'course_content':
+            url = course_page_url(url, course.get('course_url'))
+            headings = meta.get('heading_path') or []
+            text = f"{course.get('name', 'TDS')} course: {headings[0] if headings else meta.get('section', '')}".rstrip(': ')
+        else:
+            text = meta.get('topic_title') or url
+        if url in seen:
+            continue
+        seen.add(url)
+        links.append({"url": url, "text": text})
+        if len(links) >= limit:
+            break
+    return links or course.get('links') or DEFAULT_LINKS
+
+def generate_response(question, context_results, image_description=None, history=None):
     """Generate response using Gemini or fallback to template"""
     try:
         if getattr(settings, 'GEMINI_API_KEY', '') and settings.GEMINI_API_KEY != "your_gemini_api_key_here":
-            import google.generativeai as genai
-
-            genai.configure(api_key=settings.GEMINI_API_KEY)
+            genai = configure_gemini()
             model = genai.GenerativeModel('gemini-2.0-flash')
 
             # Prepare context
-            context_text = "\n\n".join([result['content'] for result in context_results[:3]])
+            context_text = "\n\n".join([result['content'] for result in context_results])
 
             prompt = f"""
             You are a Virtual Teaching Assistant for the Tools in Data Science (TDS) course.
 
+            {f"Conversation so far (summarized):{chr(10)}{history}" if history else ""}
+
             Question: {question}
 
             {f"Image Description: {image_description}" if image_description else ""}
@@ -193,12 +502,15 @@ def generate_response(question, context_results, image_description=None):
             assignments, or technical concepts, provide detailed guidance.
             """
 
-            response = model.generate_content(prompt)
+            with span('gemini.generate_content'):
+                response = model.generate_content(prompt)
             return response.text
     except Exception as e:
+        UPSTREAM_ERRORS.inc(upstream='gemini_generation')
         print(f"Response generation failed: {e}")
 
     # Fallback response
+    FALLBACKS.inc(kind='template_answer')
     if context_results:
         return f"Based on the course materials, here's what I found relevant to your question: {context_results[0]['content'][:500]}..."
     else:
@@ -207,71 +519,259 @@ def generate_response(question, context_results, image_description=None):
 @app.get("/")
 async def root():
     """Health check endpoint"""
+    index = index_manager.current
     return {
         "message": "TDS Virtual TA API is running!",
         "status": "healthy",
-        "knowledge_base_loaded": len(knowledge_base) > 0,
-        "embeddings_loaded": len(embeddings) > 0
+        "knowledge_base_loaded": len(index.knowledge_base) > 0,
+        "embeddings_loaded": len(index.embeddings) > 0
     }
 
+def course_manager(course):
+    """IndexManager of a course (None = default); blocks while a course loads, so run it in a thread"""
+    if course_registry.resolve(course) == course_registry.default_course:
+        return index_manager
+    return course_registry.get(course)
+
+async def course_index(course):
+    """(course entry, snapshot) of the requested course; 404 for unknown courses"""
+    try:
+        if course_registry.resolve(course) == course_registry.default_course:
+            manager = index_manager
+        else:
+            manager = course_registry.loaded(course)
+            if manager is None:
+                # First request for this course: load its index off the event loop
+                with ask_stage('course_load'):
+                    manager = await asyncio.to_thread(course_registry.get, course)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown course: {course}")
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=f"Index of course {course} is unavailable: {e}")
+    return course_registry.course(course), manager.current
+
+def open_session(session_id, course, index):
+    """(live session, copy of its state) bound to this course and index version, or (None, None)"""
+    if not session_id or not getattr(settings, 'SESSIONS_ENABLED', False):
+        return None, None
+    if len(session_id) > 128:
+        raise HTTPException(status_code=400, detail="session_id must be at most 128 characters")
+    return session_store.open(session_id, course['id'], index.version)
+
+def blend_embeddings(query_embedding, previous_embedding, weight):
+    """Unit query vector nudged towards the previous question, so "and on Windows?" keeps its topic"""
+    query = np.asarray(query_embedding, dtype=np.float32)
+    previous = np.asarray(previous_embedding, dtype=np.float32)
+    if weight <= 0 or previous.shape != query.shape:
+        return query_embedding
+    query_norm, previous_norm = np.linalg.norm(query), np.linalg.norm(previous)
+    if not query_norm or not previous_norm:
+        return query_embedding
+    return query / query_norm + weight * previous / previous_norm
+
 @app.post("/ask")
 async def ask_question(request: QuestionRequest) -> TAResponse:
     """Main endpoint for asking questions to the Virtual TA"""
+    started = time.perf_counter()
     try:
         question = request.question
         image_data = request.image
         context = request.context
 
+        # The whole request uses one index version of the requested course
+        try:
+            course, index = await course_index(request.course)
+            session, session_state = open_session(request.session_id, course, index)
+        except HTTPException as e:
+            ASK_REQUESTS.inc(outcome='bad_request' if e.status_code < 500 else 'error')
+            raise
+
         # Process image if provided
         image_description = None
         if image_data:
-            image_description = get_image_description(image_data)
-            # Combine question with image description for better search
-            search_query = f"{question} {image_description}"
-        else:
-            search_query = question
-
-        # Search knowledge base
-        context_results = search_knowledge_base(search_query, top_k=5)
-
-        # Generate response
-        answer = generate_response(question, context_results, image_description)
-
-        # Prepare links
-        links = [
-            {
-                "url": "https://tds.s-anand.net/#/2025-01/",
-                "text": "TDS Course Content"
-            },
-            {
-                "url": "https://discourse.onlinedegree.iitm.ac.in/c/courses/tds-kb/34",
-                "text": "TDS Discourse"
-            }
-        ]
-
-        return TAResponse(answer=answer, links=links)
-
+            try:
+                with ask_stage('image_description'):
+                    image_description = await asyncio.to_thread(get_image_description, image_data)
+            except ImageValidationError as e:
+                ASK_REQUESTS.inc(outcome='bad_request')
+                raise HTTPException(status_code=400, detail=str(e))
+        # Combine question with image description for better search (there may be none)
+        search_query = f"{question} {image_description}" if image_description else question
+
+        with ask_stage('query_embedding'):
+            query_embedding, used_fallback = await asyncio.to_thread(embed_text, search_query)
+
+        follow_up = session is not None and len(session_state.turns) > 0
+        session_id = session.session_id if session is not None else None
+
+        # Recurring text questions are answered from the precomputed table (follow-ups depend on
+        # the conversation, and a hash-fallback query vector is no evidence of a similar question)
+        if not image_data and not follow_up and not used_fallback:
+            hit = match_precomputed(query_embedding, index)
+            CACHE_LOOKUPS.inc(cache='precomputed_answers', result='miss' if hit is None else 'hit')
+            if hit is not None:
+                entry, similarity = hit
+                if session is not None:
+                    session_store.record(session, question, entry['answer'], query_embedding, [])
+                ASK_REQUESTS.inc(outcome='precomputed')
+                ASK_STAGE_SECONDS.observe(time.perf_counter() - started, stage='total')
+                return TAResponse(answer=entry['answer'], links=entry['links'], session_id=session_id)
+
+        # A follow-up close to the previous question reuses its ranked hits; other
+        # follow-ups search with the previous question blended in, and the chunks
+        # of earlier turns compete with the new candidates
+        hits = None
+        carry_over = ()
+        search_embedding = query_embedding
+        if follow_up and session_state.last_embedding is not None:
+            if session_state.hits and \
+                    session_state.similarity(query_embedding) >= getattr(settings, 'SESSION_REUSE_SIMILARITY', 0.9):
+                hits = [{'content': index.chunks[row], 'similarity': similarity, 'index': row}
+                        for row, similarity in session_state.hits]
+            else:
+                search_embedding = blend_embeddings(query_embedding, session_state.last_embedding,
+                                                    getattr(settings, 'SESSION_CONTEXT_WEIGHT', 0.3))
+                carry_over = session_state.chunk_rows
+            CACHE_LOOKUPS.inc(cache='session_retrieval', result='miss' if hits is None else 'hit')
+
+        # Search, rerank and expand into threads; like the embedding and LLM calls this
+        # blocks, so it runs in a worker thread and the event loop keeps serving
+        context_results = await asyncio.to_thread(retrieve_context, search_query, index, search_embedding,
+                                                  hits=hits, carry_over=carry_over)
+
+        # Generate response; earlier turns go in as short summaries, not their full context
+        with ask_stage('llm_generation'):
+            history = {'history': session_state.history()} if follow_up else {}
+            answer = await asyncio.to_thread(generate_response, question, context_results, image_description, **history)
+        if session is not None:
+            session_store.record(session, question, answer, query_embedding, context_results)
+
+        # Link the sources the answer was built from
+        links = source_links(context_results, index, course=course)
+
+        ASK_REQUESTS.inc(outcome='ok')
+        ASK_STAGE_SECONDS.observe(time.perf_counter() - started, stage='total')
+        return TAResponse(answer=answer, links=links, session_id=session_id)
+
+    except HTTPException:
+        raise
     except Exception as e:
+        ASK_REQUESTS.inc(outcome='error')
         print(f"Error processing question: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
+    index = index_manager.current
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "knowledge_base_sections": len(knowledge_base),
-        "total_chunks": len(chunks),
-        "embeddings_shape": embeddings.shape if len(embeddings) > 0 else "No embeddings",
+        "knowledge_base_sections": len(index.knowledge_base),
+        "total_chunks": len(index.chunks),
+        "embeddings_shape": index.embeddings.shape if len(index.embeddings) > 0 else "No embeddings",
+        "index_version": index.version,
+        "index_generation": index.generation,
+        "index_loaded_at": index.loaded_at,
+        "last_reload_error": index_manager.last_error,
+        "courses": course_registry.describe(),
+        "warmup": warmup_status(),
+        "image_description_cache": image_description_cache.stats(),
+        "sessions": session_store.stats(),
+        "precomputed_answers": len(precomputed_answers) if precomputed_answers is not None else 0,
+        "precomputed_index_version": precomputed_answers.index_version if precomputed_answers is not None else None,
         "vector_store_available": VECTOR_STORE_AVAILABLE,
         "gemini_configured": bool(getattr(settings, 'GEMINI_API_KEY', '') and settings.GEMINI_API_KEY != "your_gemini_api_key_here")
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text-format metrics for this worker"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+def require_admin(request: Request, enabled=True):
+    """404 unless the admin surface is configured, 403 without the right X-Admin-Token"""
+    admin_token = getattr(settings, 'ADMIN_TOKEN', '')
+    if not admin_token or not enabled:
+        raise HTTPException(status_code=404, detail="Not found")
+    if request.headers.get("X-Admin-Token") != admin_token:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@app.post("/admin/reload")
+async def reload_index(request: Request, course: Optional[str] = None):
+    """Load a new index version of a course (default: the default course) and swap it in"""
+    require_admin(request)
+
+    try:
+        manager = await asyncio.to_thread(course_manager, course)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown course: {course}")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    swapped, info = await asyncio.to_thread(manager.reload)
+    if 'error' in info:
+        raise HTTPException(status_code=409, detail=info['error'])
+    return {"swapped": swapped, "index": info}
+
+async def run_profile(session, seconds):
+    """Profile the live server for `seconds` while it keeps serving requests"""
+    seconds = min(max(seconds, 0.1), getattr(settings, 'PROFILE_MAX_SECONDS', 60))
+    if not profiling.try_acquire():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        session.start()
+        await asyncio.sleep(seconds)
+        return await asyncio.to_thread(session.stop)
+    finally:
+        profiling.release()
+
+def profile_response(result, kind, format):
+    if format == 'json':
+        return result
+    return Response(content=result[kind]['collapsed'] + '\n', media_type='text/plain; charset=utf-8')
+
+@app.post("/admin/profile/cpu")
+async def profile_cpu(request: Request, seconds: float = 10, interval_ms: float = 5,
+                      idle: bool = False, format: str = 'collapsed'):
+    """Sample every thread's stack for N seconds; collapsed stacks feed flamegraph.pl or speedscope"""
+    require_admin(request, getattr(settings, 'PROFILING_ENABLED', False))
+    session = profiling.ProfileSession(cpu=True, interval=max(interval_ms, 1) / 1000, include_idle=idle)
+    return profile_response(await run_profile(session, seconds), 'cpu', format)
+
+@app.post("/admin/profile/memory")
+async def profile_memory(request: Request, seconds: float = 10, frames: int = 25, format: str = 'collapsed'):
+    """Allocations made during the window and still alive at its end (tracemalloc snapshot diff)"""
+    require_admin(request, getattr(settings, 'PROFILING_ENABLED', False))
+    session = profiling.ProfileSession(cpu=False, memory=True, frames=min(max(frames, 1), 100))
+    return profile_response(await run_profile(session, seconds), 'memory', format)
+
+@app.get("/admin/profile/startup")
+async def profile_startup(request: Request, kind: str = 'cpu', format: str = 'collapsed'):
+    """CPU samples and retained allocations of the startup loader (PROFILE_STARTUP=true)"""
+    require_admin(request, getattr(settings, 'PROFILING_ENABLED', False))
+    if startup_profile is None or kind not in startup_profile:
+        raise HTTPException(status_code=404, detail="No startup profile recorded")
+    return profile_response(startup_profile, kind, format)
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(
-        app, 
-        host=getattr(settings, 'API_HOST', '0.0.0.0'), 
-        port=getattr(settings, 'API_PORT', 8000)
-    )
+    workers = getattr(settings, 'API_WORKERS', 1)
+    if workers > 1:
+        # Build the shared index once in the parent; workers only mmap it
+        if getattr(settings, 'SHARED_INDEX', False):
+            from src.models.shared_index import ensure_index
+            ensure_index(str(settings.INDEX_DIR), str(settings.EMBEDDINGS_FILE))
+        if getattr(settings, 'SESSIONS_ENABLED', False):
+            print(f"Sessions are per worker: route each session_id to one of the {workers} workers (sticky routing)")
+        uvicorn.run(
+            "src.api.main:app",
+            host=getattr(settings, 'API_HOST', '0.0.0.0'),
+            port=getattr(settings, 'API_PORT', 8000),
+            workers=workers
+        )
+    else:
+        uvicorn.run(
+            app, 
+            host=getattr(settings, 'API_HOST', '0.0.0.0'), 
+            port=getattr(settings, 'API_PORT', 8000)
+        )
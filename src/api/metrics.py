@@ -0,0 +1,209 @@
+import asyncio
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans a cached answer (~1 ms) to a slow LLM call (~30 s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(Metric):
+    """Monotonic count, optionally per label set"""
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def collect(self):
+        lines = self.header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Metric):
+    """Current value, either set directly or read from a callback at scrape time"""
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, fn=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._values = {}
+        self.fn = fn
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+    def collect(self):
+        lines = self.header()
+        values = self._values
+        if self.fn is not None:
+            try:
+                produced = self.fn()
+            except Exception:
+                produced = None
+            if produced is None:
+                return lines
+            # A callback returns a number, or {label tuple: number} for labelled gauges
+            values = produced if isinstance(produced, dict) else {(): produced}
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    """Cumulative-bucket latency histogram; observe() is a bisect and three adds"""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def collect(self):
+        lines = self.header()
+        for key, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = [('le', _format_value(bound) if bound == float('inf') else repr(bound))]
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def unregister(self, name):
+        self._metrics.pop(name, None)
+
+    def render(self):
+        """Prometheus text exposition format 0.0.4"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def resident_memory_bytes():
+    """RSS from /proc on Linux, else the peak RSS from getrusage"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+async def monitor_event_loop_lag(histogram, interval=0.5):
+    """Observe how late each sleep wakes up; blocking calls on the loop show up as lag"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        histogram.observe(max(0.0, time.perf_counter() - start - interval))
+
+
+# /ask instrumentation
+ASK_STAGE_SECONDS = Histogram(
+    'tds_ask_stage_seconds', 'Time spent in each /ask stage', ['stage']
+)
+ASK_REQUESTS = Counter(
+    'tds_ask_requests_total', '/ask requests by outcome', ['outcome']
+)
+FALLBACKS = Counter(
+    'tds_fallbacks_total', 'Degraded paths taken (hash embedding, template answer)', ['kind']
+)
+CACHE_LOOKUPS = Counter(
+    'tds_cache_lookups_total', 'Cache lookups by cache and result', ['cache', 'result']
+)
+UPSTREAM_ERRORS = Counter(
+    'tds_upstream_errors_total', 'Failed calls to upstream providers', ['upstream']
+)
+PROCESS_MEMORY = Gauge(
+    'process_resident_memory_bytes', 'Resident memory of this worker', fn=resident_memory_bytes
+)
+EVENT_LOOP_LAG = Histogram(
+    'tds_event_loop_lag_seconds', 'Delay of event-loop wakeups behind schedule',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
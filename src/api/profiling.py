@@ -0,0 +1,181 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Leaf frames of threads parked in the kernel; left out unless idle stacks are requested
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'),
+    ('socket.py', 'accept'),
+    ('queue.py', 'get'),
+}
+
+# Only one profile runs at a time; a second request gets a 409
+_active = threading.Lock()
+
+
+def short_path(filename):
+    """Project-relative or site-packages-relative path, to keep stacks readable"""
+    if filename.startswith(project_root + os.sep):
+        return os.path.relpath(filename, project_root)
+    marker = 'site-packages' + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return os.path.basename(filename)
+
+
+def frame_label(code):
+    return f"{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack at a fixed interval into collapsed stacks.
+
+    It is a wall-clock sampler driven by sys._current_frames() from its own
+    thread: nothing is hooked into the interpreter, so outside start()/stop()
+    it costs nothing.
+    """
+
+    def __init__(self, interval=0.005, include_idle=False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.counts = Counter()
+        self.samples = 0
+        self.started = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        next_refresh = 0.0
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            if now >= next_refresh:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                next_refresh = now + 1.0
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f'thread-{ident}'))
+                self.counts[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Brendan Gregg's folded format: "root;...;leaf count" per line"""
+        return '\n'.join(f"{stack} {count}" for stack, count in self.counts.most_common())
+
+
+def collapsed_allocations(statistics, limit=None):
+    """Folded stacks weighted by bytes, from tracemalloc statistics or snapshot diffs"""
+    lines = []
+    for stat in statistics[:limit]:
+        size = getattr(stat, 'size_diff', stat.size)
+        if size <= 0:
+            continue
+        stack = ';'.join(f"{short_path(frame.filename)}:{frame.lineno}" for frame in stat.traceback)
+        lines.append(f"{stack} {size}")
+    return '\n'.join(lines)
+
+
+def top_allocations(statistics, limit=50):
+    return [
+        {
+            'size_bytes': getattr(stat, 'size_diff', stat.size),
+            'count': getattr(stat, 'count_diff', stat.count),
+            'traceback': [f"{short_path(frame.filename)}:{frame.lineno}" for frame in reversed(stat.traceback)]
+        }
+        for stat in statistics[:limit]
+    ]
+
+
+_TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+class ProfileSession:
+    """CPU samples and/or a tracemalloc diff between start() and stop().
+
+    tracemalloc is only switched on for the session (unless something
+    else already had it on), so the allocator runs untraced otherwise.
+    """
+
+    def __init__(self, cpu=True, memory=False, interval=0.005, frames=25, include_idle=False):
+        self.profiler = SamplingProfiler(interval, include_idle) if cpu else None
+        self.memory = memory
+        self.frames = frames
+        self._was_tracing = False
+        self._before = None
+
+    def start(self):
+        if self.memory:
+            self._was_tracing = tracemalloc.is_tracing()
+            if not self._was_tracing:
+                tracemalloc.start(self.frames)
+            self._before = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+        if self.profiler is not None:
+            self.profiler.start()
+        return self
+
+    def stop(self, limit=50):
+        result = {}
+        if self.profiler is not None:
+            self.profiler.stop()
+            result['cpu'] = {
+                'samples': self.profiler.samples,
+                'seconds': round(self.profiler.duration, 3),
+                'interval_ms': self.profiler.interval * 1000,
+                'collapsed': self.profiler.collapsed()
+            }
+        if self.memory:
+            after = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+            traced, peak = tracemalloc.get_traced_memory()
+            if not self._was_tracing:
+                tracemalloc.stop()
+            diff = after.compare_to(self._before, 'traceback')
+            result['memory'] = {
+                'traced_bytes': traced,
+                'peak_bytes': peak,
+                'collapsed': collapsed_allocations(diff),
+                'top': top_allocations(diff, limit)
+            }
+        return result
+
+
+def try_acquire():
+    return _active.acquire(blocking=False)
+
+
+def release():
+    _active.release()
@@ -0,0 +1,163 @@
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from config.settings import settings
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+
+
+def summarize(text, max_chars):
+    """Leading sentences of a turn that fit in `max_chars`; the history sent back to the LLM"""
+    text = ' '.join(str(text).split())
+    if len(text) <= max_chars:
+        return text
+    summary = ''
+    for sentence in SENTENCE_END_RE.split(text):
+        if len(summary) + len(sentence) + 1 > max_chars:
+            break
+        summary = f"{summary} {sentence}".strip()
+    return summary or text[:max_chars - 3].rstrip() + '...'
+
+
+class ConversationSession:
+    """What one student's conversation keeps between questions.
+
+    Only bounded, compact state: the last few turns as short summaries,
+    the chunk rows retrieved so far (most recent first) and the previous
+    question's embedding in float16. Chunk rows are only meaningful for the
+    index version they came from, so a swap or a course change drops them.
+    """
+
+    __slots__ = ('session_id', 'course', 'index_version', 'turns', 'chunk_rows', 'hits',
+                 'last_embedding', 'last_seen')
+
+    def __init__(self, session_id, max_turns):
+        self.session_id = session_id
+        self.course = None
+        self.index_version = None
+        self.turns = deque(maxlen=max_turns)
+        self.chunk_rows = []
+        self.hits = []
+        self.last_embedding = None
+        self.last_seen = time.monotonic()
+
+    def bind(self, course, index_version):
+        """Forget retrieval state made against another course or index version"""
+        if (course, index_version) != (self.course, self.index_version):
+            self.course, self.index_version = course, index_version
+            self.chunk_rows = []
+            self.hits = []
+            self.last_embedding = None
+
+    def copy(self):
+        """Detached copy of the state, for reading while other requests record turns"""
+        copy = ConversationSession(self.session_id, self.turns.maxlen)
+        copy.course, copy.index_version = self.course, self.index_version
+        copy.turns.extend(self.turns)
+        copy.chunk_rows = list(self.chunk_rows)
+        copy.hits = list(self.hits)
+        # record() replaces the array rather than writing into it, so sharing it is safe
+        copy.last_embedding = self.last_embedding
+        copy.last_seen = self.last_seen
+        return copy
+
+    def history(self):
+        return '\n'.join(f"Student: {question}\nTA: {answer}" for question, answer in self.turns)
+
+    def similarity(self, query_embedding):
+        """Cosine between a new question and the previous one (0 when there is none)"""
+        if self.last_embedding is None or query_embedding is None:
+            return 0.0
+        previous = self.last_embedding.astype(np.float32)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if previous.shape != query.shape:
+            return 0.0
+        norms = np.linalg.norm(previous) * np.linalg.norm(query)
+        return float(previous @ query / norms) if norms else 0.0
+
+    def record(self, question, answer, query_embedding, context_results, max_chunks, summary_chars):
+        """Remember a finished turn: its summary, its ranked hits and the rows the LLM saw"""
+        self.turns.append((summarize(question, summary_chars), summarize(answer, summary_chars)))
+        if query_embedding is not None:
+            self.last_embedding = np.asarray(query_embedding, dtype=np.float16)
+        # Ranked hits (not the thread posts added around them) as (row, similarity)
+        self.hits = [(int(result['index']), float(result.get('similarity', 0.0)))
+                     for result in context_results if result.get('index') is not None and 'expanded_from' not in result]
+        rows = [int(result['index']) for result in context_results if result.get('index') is not None]
+        self.chunk_rows = list(dict.fromkeys(rows + self.chunk_rows))[:max_chunks]
+
+
+class SessionStore:
+    """Bounded LRU of conversation sessions with an idle TTL.
+
+    Sessions are ordered by last use, so expired ones are always at the
+    front and are dropped there on every access; past `max_sessions` the
+    least recently used session goes too. Memory is therefore capped at
+    `max_sessions` times a few kilobytes whatever the number of students.
+
+    Sessions live in one worker's memory. With API_WORKERS > 1 a follow-up
+    only finds its session if the proxy routes every request of a
+    session_id to the same worker (sticky routing); otherwise run one
+    worker or disable sessions.
+    """
+
+    def __init__(self, max_sessions=None, ttl=None, max_turns=None, max_chunks=None, summary_chars=None):
+        self.max_sessions = max_sessions or settings.SESSION_MAX_SESSIONS
+        self.ttl = settings.SESSION_TTL_SECONDS if ttl is None else ttl
+        self.max_turns = max_turns or settings.SESSION_MAX_TURNS
+        self.max_chunks = max_chunks or settings.SESSION_MAX_CHUNKS
+        self.summary_chars = summary_chars or settings.SESSION_SUMMARY_CHARS
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _expire(self, now):
+        while self._sessions and self.ttl > 0:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_seen <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def _get(self, session_id, now):
+        self._expire(now)
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = ConversationSession(session_id, self.max_turns)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        self._sessions.move_to_end(session_id)
+        session.last_seen = now
+        return session
+
+    def get(self, session_id):
+        """The live session with this id, created on first use"""
+        with self._lock:
+            return self._get(session_id, time.monotonic())
+
+    def open(self, session_id, course, index_version):
+        """(live session, copy of its state) for a request on this course and index version.
+
+        Record turns into the live session through record(); read the copy,
+        which concurrent requests of the same session cannot change midway.
+        """
+        with self._lock:
+            session = self._get(session_id, time.monotonic())
+            session.bind(course, index_version)
+            return session, session.copy()
+
+    def record(self, session, question, answer, query_embedding, context_results):
+        with self._lock:
+            session.record(question, answer, query_embedding, context_results, self.max_chunks, self.summary_chars)
+
+    def stats(self):
+        return {'sessions': len(self._sessions), 'expired': self.expired, 'evicted': self.evicted}
@@ -0,0 +1,256 @@
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+from config.settings import settings
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+class Trace:
+    """Spans of one request, timed relative to its start.
+
+    asyncio.to_thread copies the context, so spans recorded in worker
+    threads land on the same trace.
+    """
+
+    def __init__(self, request_id, method, path):
+        self.request_id = request_id
+        self.trace_id = secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.method = method
+        self.path = path
+        self.start_ns = time.time_ns()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.status = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add_span(self, name, start, duration, attributes):
+        with self._lock:
+            self.spans.append({
+                'name': name,
+                'start_ms': round((start - self.start) * 1000, 3),
+                'duration_ms': round(duration * 1000, 3),
+                'span_id': secrets.token_hex(8),
+                **({'attributes': attributes} if attributes else {})
+            })
+
+    def finish(self, status):
+        self.status = status
+        self.duration = time.perf_counter() - self.start
+
+    def server_timing(self):
+        """Server-Timing header value; repeated stages are summed"""
+        totals = {}
+        for span in self.spans:
+            name = span['name'].replace('.', '_')
+            totals[name] = totals.get(name, 0.0) + span['duration_ms']
+        parts = [f"{name};dur={ms:.1f}" for name, ms in totals.items()]
+        parts.append(f"total;dur={self.duration * 1000:.1f}")
+        return ', '.join(parts)
+
+    def as_dict(self):
+        return {
+            'request_id': self.request_id,
+            'trace_id': self.trace_id,
+            'method': self.method,
+            'path': self.path,
+            'status': self.status,
+            'started_at': self.start_ns / 1e9,
+            'duration_ms': round(self.duration * 1000, 3),
+            'spans': self.spans
+        }
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a block into the current request's trace; a no-op outside a request"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(name, start, time.perf_counter() - start, attributes)
+
+
+class SlowRequestLog:
+    """Rotating JSONL file of traces slower than the threshold.
+
+    The file is opened on the first slow request, so read-only deployments
+    only lose the log, not the server.
+    """
+
+    def __init__(self, path, max_bytes, backups):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.logger = None
+        self.disabled = False
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        logger = logging.getLogger(f'tds.slow_requests.{self.path}')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+        return logger
+
+    def write(self, trace):
+        if self.disabled:
+            return
+        if self.logger is None:
+            try:
+                self.logger = self._open()
+            except OSError as e:
+                print(f"Slow request log disabled: {e}")
+                self.disabled = True
+                return
+        self.logger.info(json.dumps(trace.as_dict(), ensure_ascii=False))
+
+
+def to_otlp(traces, service_name='tds-virtual-ta'):
+    """OTLP/HTTP JSON payload: one server span per request, one child span per stage"""
+    spans = []
+    for trace in traces:
+        end_ns = trace.start_ns + int(trace.duration * 1e9)
+        spans.append({
+            'traceId': trace.trace_id,
+            'spanId': trace.span_id,
+            'name': f"{trace.method} {trace.path}",
+            'kind': 2,  # SPAN_KIND_SERVER
+            'startTimeUnixNano': str(trace.start_ns),
+            'endTimeUnixNano': str(end_ns),
+            'attributes': [
+                {'key': 'http.request_id', 'value': {'stringValue': trace.request_id}},
+                {'key': 'http.status_code', 'value': {'intValue': str(trace.status or 0)}},
+            ]
+        })
+        for child in trace.spans:
+            start_ns = trace.start_ns + int(child['start_ms'] * 1e6)
+            spans.append({
+                'traceId': trace.trace_id,
+                'spanId': child['span_id'],
+                'parentSpanId': trace.span_id,
+                'name': child['name'],
+                'kind': 1,  # SPAN_KIND_INTERNAL
+                'startTimeUnixNano': str(start_ns),
+                'endTimeUnixNano': str(start_ns + int(child['duration_ms'] * 1e6)),
+                'attributes': [
+                    {'key': key, 'value': {'stringValue': str(value)}}
+                    for key, value in child.get('attributes', {}).items()
+                ]
+            })
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]},
+            'scopeSpans': [{'scope': {'name': 'src.api.tracing'}, 'spans': spans}]
+        }]
+    }
+
+
+class OtlpExporter:
+    """Batches finished traces and POSTs them to an OTLP/HTTP collector from a daemon thread"""
+
+    def __init__(self, endpoint, batch_size=64, flush_interval=2.0, max_queue=2048):
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name='otlp-exporter', daemon=True)
+        self.thread.start()
+
+    def export(self, trace):
+        try:
+            self.queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _post(self, batch):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(to_otlp(batch)).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+        except Exception as e:
+            print(f"OTLP export of {len(batch)} traces failed: {e}")
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._post(batch)
+
+
+class TracingMiddleware:
+    """ASGI middleware: request id, span collection, Server-Timing, slow log and export"""
+
+    def __init__(self, app, slow_ms=None, log_path=None, otlp_endpoint=None):
+        self.app = app
+        self.slow_ms = settings.TRACE_SLOW_MS if slow_ms is None else slow_ms
+        self.slow_log = SlowRequestLog(
+            str(log_path or settings.TRACE_LOG_PATH), settings.TRACE_LOG_MAX_BYTES, settings.TRACE_LOG_BACKUPS
+        )
+        endpoint = settings.OTLP_ENDPOINT if otlp_endpoint is None else otlp_endpoint
+        self.exporter = OtlpExporter(endpoint) if endpoint else None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get('headers') or [])
+        request_id = headers.get(b'x-request-id', b'').decode('latin-1')[:64] or secrets.token_hex(8)
+        trace = Trace(request_id, scope.get('method', ''), scope.get('path', ''))
+        token = _current_trace.set(trace)
+
+        async def send_with_headers(message):
+            if message['type'] == 'http.response.start':
+                trace.finish(message['status'])
+                message['headers'] = list(message.get('headers', [])) + [
+                    (b'x-request-id', request_id.encode('latin-1')),
+                    (b'server-timing', trace.server_timing().encode('latin-1')),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_trace.reset(token)
+            if trace.duration is None:
+                trace.finish(500)
+            if trace.duration * 1000 >= self.slow_ms:
+                self.slow_log.write(trace)
+            if self.exporter is not None:
+                self.exporter.export(trace)
@@ -0,0 +1,79 @@
+import importlib
+import threading
+import time
+
+from config.settings import settings
+
+# SDKs the request handlers import on first use, grouped by feature
+PREFETCH_GROUPS = {
+    'gemini': ['google.generativeai'],
+    'image': ['PIL.Image'],
+}
+
+# Seconds spent on each warm-up step (None if an import failed)
+warmup_timings = {}
+_index_warmed = threading.Event()
+
+
+def gemini_configured():
+    return bool(getattr(settings, 'GEMINI_API_KEY', '') and settings.GEMINI_API_KEY != "your_gemini_api_key_here")
+
+
+def resolve_groups(spec=None):
+    """Turn PREFETCH_MODULES ("auto", "none" or "gemini,image") into module names"""
+    spec = (spec if spec is not None else getattr(settings, 'PREFETCH_MODULES', 'auto')).strip().lower()
+    if spec in ('', 'none', 'off'):
+        return []
+    if spec == 'auto':
+        # Without a key those SDKs are never imported by a request
+        groups = list(PREFETCH_GROUPS) if gemini_configured() else []
+    else:
+        groups = [group.strip() for group in spec.split(',') if group.strip()]
+    return [module for group in groups for module in PREFETCH_GROUPS.get(group, [group])]
+
+
+def prefetch_modules(modules):
+    """Import modules now so the first request that needs them doesn't"""
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            warmup_timings[name] = round(time.perf_counter() - start, 4)
+        except Exception as e:
+            warmup_timings[name] = None
+            print(f"Prefetch of {name} failed: {e}")
+    return warmup_timings
+
+
+def warm_index(snapshot):
+    """Fault the embedding pages into memory so the first search is not a cold read"""
+    embeddings = snapshot.embeddings
+    if len(embeddings) > 0:
+        start = time.perf_counter()
+        for row in range(0, len(embeddings), 4096):
+            embeddings[row:row + 4096].sum()
+        warmup_timings['index_pages'] = round(time.perf_counter() - start, 4)
+    _index_warmed.set()
+
+
+def start_warmup(snapshot=None, modules=None):
+    """Run prefetch and index warm-up in a daemon thread; returns the thread"""
+    modules = resolve_groups() if modules is None else modules
+
+    def run():
+        if snapshot is not None:
+            warm_index(snapshot)
+        prefetch_modules(modules)
+        # Probing for tesseract spawns a process; do it before the first image arrives
+        from src.utils.ocr import ocr_enabled
+        start = time.perf_counter()
+        ocr_enabled()
+        warmup_timings['ocr_probe'] = round(time.perf_counter() - start, 4)
+
+    thread = threading.Thread(target=run, name='warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def warmup_status():
+    return {'index_warmed': _index_warmed.is_set(), 'timings': dict(warmup_timings)}
@@ -0,0 +1,295 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import argparse
+import json
+import shutil
+import time
+from datetime import datetime
+import numpy as np
+from config.settings import settings
+from src.utils.fileio import atomic_write_json
+
+EMBEDDINGS_FILENAME = 'embeddings.f32'
+CHUNKS_FILENAME = 'chunks.jsonl'
+MANIFEST_FILENAME = 'manifest.json'
+
+
+class StageCounter:
+    """Items and wall time spent inside one pipeline stage"""
+
+    def __init__(self, name, unit='items'):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.inclusive_seconds = 0.0
+        self.seconds = 0.0
+
+    def wrap(self, iterator, count=None):
+        """Re-yield from iterator, timing every next() call"""
+        iterator = iter(iterator)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.inclusive_seconds += time.perf_counter() - start
+                return
+            self.inclusive_seconds += time.perf_counter() - start
+            self.items += count(item) if count else 1
+            yield item
+
+    def as_dict(self):
+        return {
+            'stage': self.name,
+            'items': self.items,
+            'unit': self.unit,
+            'seconds': round(self.seconds, 4),
+            'per_second': round(self.items / self.seconds, 1) if self.seconds > 0 else None
+        }
+
+
+class IndexWriter:
+    """Append-only on-disk index: a raw float32 matrix plus a JSONL of chunks.
+
+    Rows are streamed to disk as they arrive, so memory use does not grow
+    with the corpus. Everything is written to a temporary directory that
+    replaces the target only once the manifest is complete.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = os.path.abspath(index_dir)
+        self.tmp_dir = f"{self.index_dir}.tmp-{os.getpid()}"
+        self.count = 0
+        self.dim = None
+        self._embeddings = None
+        self._chunks = None
+
+    def __enter__(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        os.makedirs(self.tmp_dir)
+        self._embeddings = open(os.path.join(self.tmp_dir, EMBEDDINGS_FILENAME), 'wb')
+        self._chunks = open(os.path.join(self.tmp_dir, CHUNKS_FILENAME), 'w', encoding='utf-8')
+        return self
+
+    def append(self, texts, metadatas, embeddings):
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+        elif embeddings.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension changed from {self.dim} to {embeddings.shape[1]}")
+
+        self._embeddings.write(embeddings.tobytes())
+        for text, metadata in zip(texts, metadatas):
+            self._chunks.write(json.dumps({'content': text, 'metadata': metadata}, ensure_ascii=False) + '\n')
+        self.count += len(texts)
+
+    def finish(self, extra=None):
+        self._embeddings.close()
+        self._chunks.close()
+        manifest = {
+            'count': self.count,
+            'dim': self.dim or 0,
+            'dtype': 'float32',
+            'created_at': datetime.now().isoformat(),
+            **(extra or {})
+        }
+        atomic_write_json(os.path.join(self.tmp_dir, MANIFEST_FILENAME), manifest)
+
+        old_dir = f"{self.index_dir}.old-{os.getpid()}"
+        if os.path.exists(self.index_dir):
+            os.replace(self.index_dir, old_dir)
+        os.replace(self.tmp_dir, self.index_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        return manifest
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            for f in (self._embeddings, self._chunks):
+                if f and not f.closed:
+                    f.close()
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+def load_index(index_dir, mmap=True):
+    """Load an index written by IndexWriter; embeddings are memory-mapped"""
+    with open(os.path.join(index_dir, MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    shape = (manifest['count'], manifest['dim'])
+    embeddings_path = os.path.join(index_dir, EMBEDDINGS_FILENAME)
+    if manifest['count'] == 0:
+        embeddings = np.zeros(shape, dtype=np.float32)
+    elif mmap:
+        embeddings = np.memmap(embeddings_path, dtype=manifest['dtype'], mode='r', shape=shape)
+    else:
+        embeddings = np.fromfile(embeddings_path, dtype=manifest['dtype']).reshape(shape)
+
+    content = []
+    metadata = []
+    with open(os.path.join(index_dir, CHUNKS_FILENAME), 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            content.append(record['content'])
+            metadata.append(record['metadata'])
+
+    return {'embeddings': embeddings, 'content': content, 'metadata': metadata, 'manifest': manifest}
+
+
+class IngestPipeline:
+    """Generator pipeline: read source -> clean -> chunk -> embed in batches -> write.
+
+    Only one topic file and one embedding batch are held in memory at a
+    time, and each stage reports its own throughput.
+    """
+
+    def __init__(self, index_dir=None, batch_size=None, vector_store=None, raw_dir=None, corpus_db=None):
+        if vector_store is None:
+            from src.models.vector_store_complete import ComprehensiveVectorStore
+            vector_store = ComprehensiveVectorStore()
+        self.vector_store = vector_store
+        self.index_dir = index_dir or settings.INDEX_DIR
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.raw_dir = raw_dir or settings.RAW_DATA_PATH
+        if corpus_db is None:
+            from src.utils.corpus_store import corpus_path_for
+            corpus_db = corpus_path_for(self.raw_dir)
+        self.corpus_db = corpus_db
+        self.counters = [
+            StageCounter('read', 'documents'),
+            StageCounter('clean', 'texts'),
+            StageCounter('chunk', 'chunks'),
+            StageCounter('embed', 'chunks'),
+            StageCounter('write', 'chunks'),
+        ]
+
+    def read_sources(self):
+        """Yield (kind, document) for course sections, then one discourse topic at a time.
+
+        Topics come from the SQLite corpus store the scrapers write, plus
+        any legacy discourse_topic_*.json file the store lacks or holds an
+        older scrape of (scraped_at), so nothing scraped is left out.
+        """
+        data_path = os.path.join(self.raw_dir, 'tds_course_all.json')
+        if os.path.exists(data_path):
+            with open(data_path, 'r', encoding='utf-8') as f:
+                knowledge_base = json.load(f)
+            for section_name, section_data in knowledge_base.items():
+                yield 'course', dict(section_data, section=section_name)
+
+        from src.utils.corpus_store import iter_scraped_topics
+        for topic in iter_scraped_topics(self.raw_dir, self.corpus_db, fields=('raw_content', 'cleaned_text')):
+            yield 'discourse', topic
+
+    def clean(self, documents):
+        """Yield (text, base_metadata) per course section / discourse post"""
+        # Imported here so serving code that only reads indexes skips bs4
+        from src.utils.html_text import html_to_text
+        for kind, document in documents:
+            if kind == 'course':
+                content = document.get('content', '')
+                if content:
+                    yield content, {
+                        'source': document['section'],
+                        'url': document.get('url', ''),
+                        'type': 'course_content',
+                        'scraped_at': document.get('scraped_at', ''),
+                        'section': document['section']
+                    }
+                continue
+
+            topic_id = document.get('id')
+            for post in document.get('posts', []):
+                content = post.get('raw_content', '') or post.get('cleaned_text', '') \
+                    or html_to_text(post.get('cooked_content', ''))
+                if content and len(content) > 50:
+                    yield content, {
+                        'source': f"discourse_topic_{topic_id}",
+                        'url': document.get('url', ''),
+                        'type': 'discourse_post',
+                        'topic_id': topic_id,
+                        'topic_title': document.get('title', ''),
+                        'post_number': post.get('post_number', 1),
+                        'username': post.get('username', 'unknown'),
+                        'created_at': post.get('created_at', ''),
+                        'like_count': post.get('like_count', 0),
+                        'trust_level': post.get('trust_level', 0),
+                        'section': 'discourse'
+                    }
+
+    def chunk(self, texts):
+        """Yield (chunk_text, metadata) using the structure-aware chunker"""
+        for text, base_metadata in texts:
+            for i, chunk in enumerate(self.vector_store.chunker.iter_chunks(text)):
+                yield chunk['content'], dict(
+                    base_metadata,
+                    chunk_id=i,
+                    heading_path=chunk['heading_path'],
+                    char_start=chunk['char_start'],
+                    char_end=chunk['char_end']
+                )
+
+    def batches(self, chunks):
+        batch = []
+        for item in chunks:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def embed(self, batches):
+        """Yield (texts, metadatas, float32 matrix) per batch"""
+        for batch in batches:
+            texts = [text for text, _ in batch]
+            metadatas = [metadata for _, metadata in batch]
+            yield texts, metadatas, self.vector_store.create_embeddings_batch(texts)
+
+    def run(self):
+        """Run the whole pipeline and return the index manifest"""
+        print(f"Streaming ingestion into {self.index_dir} (batch size {self.batch_size})...")
+        read, clean, chunk, embed, write = self.counters
+
+        started = time.perf_counter()
+        stream = read.wrap(self.read_sources())
+        stream = clean.wrap(self.clean(stream))
+        stream = chunk.wrap(self.chunk(stream))
+        stream = embed.wrap(self.embed(self.batches(stream)), count=lambda item: len(item[0]))
+
+        with IndexWriter(self.index_dir) as writer:
+            for texts, metadatas, embeddings in stream:
+                start = time.perf_counter()
+                writer.append(texts, metadatas, embeddings)
+                write.inclusive_seconds += time.perf_counter() - start
+                write.items += len(texts)
+
+            # Each stage's inclusive time contains the stages upstream of it
+            upstream = 0.0
+            for counter in (read, clean, chunk, embed):
+                counter.seconds = max(0.0, counter.inclusive_seconds - upstream)
+                upstream = counter.inclusive_seconds
+            write.seconds = write.inclusive_seconds
+
+            stats = [counter.as_dict() for counter in self.counters]
+            manifest = writer.finish({
+                'stages': stats,
+                'total_seconds': round(time.perf_counter() - started, 3)
+            })
+
+        for stat in stats:
+            rate = f"{stat['per_second']:.1f} {stat['unit']}/s" if stat['per_second'] else "-"
+            print(f"  {stat['stage']:<6} {stat['items']:>7} {stat['unit']:<10} {stat['seconds']:8.3f}s  {rate}")
+        print(f"SUCCESS: Wrote {manifest['count']} chunks x {manifest['dim']} dims to {self.index_dir}")
+        return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming ingestion from raw files to an on-disk index")
+    parser.add_argument('--index-dir', default=None)
+    parser.add_argument('--batch-size', type=int, default=None)
+    args = parser.parse_args()
+
+    IngestPipeline(index_dir=args.index_dir, batch_size=args.batch_size).run()
@@ -0,0 +1,83 @@
+import json
+
+import numpy as np
+
+
+class MetadataColumns:
+    """Chunk metadata stored column-wise with dictionary encoding.
+
+    Every field becomes an int32 code array indexing that field's distinct
+    values (-1 where a chunk lacks the field). Repeated strings such as
+    topic titles, URLs and sections are stored once, and the per-chunk
+    cost is four bytes per field instead of a dict. `columns[row]` still
+    returns the original dict, so code written against a list of dicts
+    keeps working.
+    """
+
+    def __init__(self, codes, values, length):
+        self._codes = codes
+        self._values = values
+        self._length = length
+
+    @classmethod
+    def from_records(cls, records):
+        records = list(records)
+        codes = {}
+        values = {}
+        lookups = {}
+        for row, record in enumerate(records):
+            for field, value in (record or {}).items():
+                if field not in codes:
+                    codes[field] = np.full(len(records), -1, dtype=np.int32)
+                    values[field] = []
+                    lookups[field] = {}
+                # Values can be lists (heading_path), so key the lookup on their JSON form
+                key = json.dumps(value, sort_keys=True, default=str)
+                code = lookups[field].get(key)
+                if code is None:
+                    code = lookups[field][key] = len(values[field])
+                    values[field].append(value)
+                codes[field][row] = code
+        return cls(codes, values, len(records))
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(self._length))]
+        if row < 0:
+            row += self._length
+        if not 0 <= row < self._length:
+            raise IndexError(row)
+        record = {}
+        for field, codes in self._codes.items():
+            code = codes[row]
+            if code >= 0:
+                record[field] = self._values[field][code]
+        return record
+
+    def __iter__(self):
+        for row in range(self._length):
+            yield self[row]
+
+    @property
+    def fields(self):
+        return list(self._codes)
+
+    def get(self, row, field, default=None):
+        """One field of one chunk without building the whole dict"""
+        codes = self._codes.get(field)
+        if codes is None or codes[row] < 0:
+            return default
+        return self._values[field][codes[row]]
+
+    def codes(self, field):
+        """Code array and distinct values of a field, for vectorised filters"""
+        return self._codes.get(field, np.full(self._length, -1, dtype=np.int32)), self._values.get(field, [])
+
+    def tolist(self):
+        return list(self)
+
+    def nbytes(self):
+        return sum(codes.nbytes for codes in self._codes.values())
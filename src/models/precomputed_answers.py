@@ -0,0 +1,241 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import argparse
+import json
+from datetime import datetime
+import numpy as np
+from config.settings import settings
+from src.utils.fileio import exclusive_lock
+
+
+def _normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class PrecomputedAnswers:
+    """Answers for recurring questions, looked up by nearest cluster centroid.
+
+    Stored as one .npz: a float32 matrix of unit-length centroids and a JSON
+    list of {question, answer, links, members} entries, plus the index
+    version the answers were generated against.
+    """
+
+    def __init__(self, centroids, entries, index_version=None, built_at=None):
+        self.centroids = _normalize(centroids) if len(entries) else np.zeros((0, 0), dtype=np.float32)
+        self.entries = entries
+        self.index_version = index_version
+        self.built_at = built_at or datetime.now().isoformat()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            return cls(data['centroids'], json.loads(str(data['entries'])),
+                       meta.get('index_version'), meta.get('built_at'))
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp-{os.getpid()}.npz"
+        np.savez_compressed(
+            tmp_path,
+            centroids=self.centroids,
+            entries=np.array(json.dumps(self.entries, ensure_ascii=False)),
+            meta=np.array(json.dumps({'index_version': self.index_version, 'built_at': self.built_at}))
+        )
+        os.replace(tmp_path, path)
+
+    def match(self, query_embedding, min_similarity):
+        """Return (entry, similarity) for the closest centroid, or None if not confident"""
+        if not len(self.entries):
+            return None
+        query = _normalize(query_embedding)
+        if query.shape[-1] != self.centroids.shape[1]:
+            return None
+        similarities = self.centroids @ query
+        best = int(np.argmax(similarities))
+        if similarities[best] < min_similarity:
+            return None
+        return self.entries[best], float(similarities[best])
+
+
+def load_seed_questions(summary_path=None, questions_path=None):
+    """Recurring questions from discourse topic titles and, optionally, a question log.
+
+    The log is a text file with one question per line or a JSONL file with
+    a "question" field; repeated questions add weight.
+    """
+    summary_path = summary_path or os.path.join(settings.RAW_DATA_PATH, 'discourse_summary.json')
+    questions = {}
+
+    if os.path.exists(summary_path):
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+        for topic in summary.get('topics_summary', []):
+            questions[topic['title']] = {
+                'question': topic['title'],
+                'url': topic.get('url', ''),
+                'weight': int(topic.get('posts_count') or 1)
+            }
+
+    if questions_path and os.path.exists(questions_path):
+        with open(questions_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                text = json.loads(line).get('question', '') if line.startswith('{') else line
+                if text:
+                    entry = questions.setdefault(text, {'question': text, 'url': '', 'weight': 0})
+                    entry['weight'] += 1
+
+    return sorted(questions.values(), key=lambda q: q['weight'], reverse=True)
+
+
+def cluster_questions(vectors, merge_threshold):
+    """Greedy leader clustering over questions already sorted by weight.
+
+    Each question joins the first existing cluster whose leader is at
+    least `merge_threshold` similar, otherwise it starts a new one.
+    """
+    vectors = _normalize(vectors)
+    leaders = []
+    clusters = []
+    for i, vector in enumerate(vectors):
+        if leaders:
+            similarities = np.stack(leaders) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= merge_threshold:
+                clusters[best].append(i)
+                continue
+        leaders.append(vector)
+        clusters.append([i])
+    return clusters
+
+
+def embed_questions(questions, embed, retries=1):
+    """Embed each question, retrying failures; questions that still fail are dropped.
+
+    Returns (questions, vectors) for the questions that got a vector of
+    the same dimension as the first one.
+    """
+    kept = []
+    vectors = []
+    for question in questions:
+        vector = None
+        for _ in range(retries + 1):
+            vector = embed(question['question'])
+            if vector is not None:
+                break
+        if vector is None:
+            print(f"  Skipping '{question['question']}': no model embedding")
+            continue
+        vector = np.asarray(vector, dtype=np.float32)
+        if vectors and vector.shape != vectors[0].shape:
+            print(f"  Skipping '{question['question']}': {vector.shape[-1]}-d embedding, expected {vectors[0].shape[-1]}")
+            continue
+        kept.append(question)
+        vectors.append(vector)
+    return kept, vectors
+
+
+def build_precomputed_answers(questions, embed, answer, index_version=None,
+                              merge_threshold=0.9, max_clusters=300):
+    """Cluster questions, answer each cluster once and return the lookup table.
+
+    `embed(text)` must be the model embedding /ask matches against, returning
+    None when only a fallback vector was available, and `answer(question)`
+    returns (answer_text, links). Raises ValueError if no question could be
+    embedded.
+    """
+    if not questions:
+        return PrecomputedAnswers(np.zeros((0, 0)), [], index_version)
+
+    questions, vectors = embed_questions(questions, embed)
+    if not vectors:
+        raise ValueError("No question could be embedded with the embedding model")
+    vectors = np.stack(vectors)
+    clusters = cluster_questions(vectors, merge_threshold)
+    clusters.sort(key=lambda members: sum(questions[i]['weight'] for i in members), reverse=True)
+
+    centroids = []
+    entries = []
+    normalized = _normalize(vectors)
+    for members in clusters[:max_clusters]:
+        lead = questions[members[0]]
+        text, links = answer(lead['question'])
+        topic_links = [
+            {'url': questions[i]['url'], 'text': questions[i]['question']}
+            for i in members if questions[i]['url']
+        ][:2]
+        centroids.append(normalized[members].mean(axis=0))
+        entries.append({
+            'question': lead['question'],
+            'answer': text,
+            'links': topic_links + [link for link in links if link not in topic_links],
+            'members': [questions[i]['question'] for i in members]
+        })
+        print(f"  [{len(entries)}/{min(len(clusters), max_clusters)}] {lead['question']} ({len(members)} questions)")
+
+    return PrecomputedAnswers(np.stack(centroids), entries, index_version)
+
+
+def refresh_precomputed_answers(index, embed, answer, path=None, questions_path=None, force=False):
+    """Rebuild the answer file if it was made for a different index version.
+
+    `embed` and `answer` are as for build_precomputed_answers. The build
+    runs under a lock next to the file: with several workers the first one
+    builds, the others wait and then load its result.
+    """
+    path = path or str(settings.PRECOMPUTED_ANSWERS_FILE)
+    existing = PrecomputedAnswers.load(path)
+    if existing is not None and existing.index_version == index.version and not force:
+        print(f"Precomputed answers are current for index {index.version}")
+        return existing
+
+    started = datetime.now().isoformat()
+    with exclusive_lock(f"{path}.lock"):
+        existing = PrecomputedAnswers.load(path)
+        if existing is not None and existing.index_version == index.version and (not force or existing.built_at >= started):
+            print(f"Loaded precomputed answers another worker built for index {index.version}")
+            return existing
+
+        print(f"Building precomputed answers for index {index.version}...")
+        try:
+            table = build_precomputed_answers(
+                load_seed_questions(questions_path=questions_path),
+                embed,
+                answer,
+                index_version=index.version,
+                merge_threshold=settings.PRECOMPUTED_MERGE_THRESHOLD,
+                max_clusters=settings.PRECOMPUTED_MAX_CLUSTERS
+            )
+        except ValueError as e:
+            print(f"Not building precomputed answers: {e}")
+            return existing
+        table.save(path)
+    print(f"SUCCESS: Saved {len(table)} precomputed answers to {path}")
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate answers for recurring questions")
+    parser.add_argument('--questions', help="Question log (one per line, or JSONL with a 'question' field)")
+    parser.add_argument('--force', action='store_true', help="Rebuild even if the index version is unchanged")
+    args = parser.parse_args()
+
+    from src.api import main
+    if not main.gemini_configured():
+        print("ERROR: GEMINI_API_KEY is required; hash-fallback embeddings would match unrelated questions")
+        sys.exit(1)
+    index = main.index_manager.load_initial()
+    refresh_precomputed_answers(index, main.model_embedding, main.precomputed_answer_for(index),
+                                questions_path=args.questions, force=args.force)
@@ -0,0 +1,138 @@
+import math
+import re
+import threading
+import time
+import weakref
+from collections import Counter
+
+import numpy as np
+
+TOKEN_RE = re.compile(r'\w+')
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from has have how i if in is it its my of on or
+so that the their there this to was what when where which who why will with you your me we
+""".split())
+
+# Relative weight of each signal in the final score; all signals are in [0, 1]
+DEFAULT_WEIGHTS = {'dense': 0.4, 'coverage': 0.35, 'phrase': 0.15, 'title': 0.1}
+
+
+def tokenize(text):
+    """Lowercased word tokens with a light plural strip, so "containers" matches "container" """
+    tokens = []
+    for token in TOKEN_RE.findall(str(text).lower()):
+        if len(token) > 3:
+            if token.endswith(('sses', 'xes', 'ches', 'shes')):
+                token = token[:-2]
+            elif token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+                token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def bigrams(tokens):
+    return set(zip(tokens, tokens[1:]))
+
+
+class TermStats:
+    """Document frequencies estimated from an evenly spaced sample of the index"""
+
+    def __init__(self, chunks, sample_size=5000):
+        total = len(chunks)
+        rows = np.unique(np.linspace(0, total - 1, min(total, sample_size)).astype(np.int64)) if total else []
+        self.documents = len(rows)
+        self.df = Counter()
+        for row in rows:
+            self.df.update(set(tokenize(chunks[int(row)])))
+
+    def idf(self, term):
+        df = self.df.get(term, 0)
+        return math.log(1 + (self.documents - df + 0.5) / (df + 0.5))
+
+
+class LexicalReranker:
+    """Second-stage scorer over the dense top-N, run locally on CPU.
+
+    Each candidate is scored jointly with the query, cross-encoder style,
+    from four signals: its first-stage cosine (min-max scaled over the
+    candidates), IDF-weighted query-term coverage, query-bigram (phrase)
+    overlap, and term coverage of its topic title or section. Candidates
+    are scored in batches; when the time budget runs out the remaining
+    ones keep their first-stage order behind the scored ones.
+    """
+
+    def __init__(self, weights=None, batch_size=8, sample_size=5000):
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.batch_size = batch_size
+        self.sample_size = sample_size
+        self._stats = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def prepare(self, index):
+        """Term statistics for an index snapshot; built once and kept while the snapshot lives"""
+        stats = self._stats.get(index)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.get(index)
+                if stats is None:
+                    stats = self._stats[index] = TermStats(index.chunks, self.sample_size)
+        return stats
+
+    def score_batch(self, query_weights, query_bigrams, batch, titles, dense):
+        total_weight = sum(query_weights.values()) or 1.0
+        scores = []
+        for candidate, title, dense_score in zip(batch, titles, dense):
+            tokens = tokenize(candidate['content'])
+            terms = set(tokens)
+            coverage = sum(weight for term, weight in query_weights.items() if term in terms) / total_weight
+            phrase = len(query_bigrams & bigrams(tokens)) / len(query_bigrams) if query_bigrams else 0.0
+            title_terms = set(tokenize(title))
+            title_score = sum(weight for term, weight in query_weights.items() if term in title_terms) / total_weight
+            scores.append(
+                self.weights['dense'] * dense_score
+                + self.weights['coverage'] * coverage
+                + self.weights['phrase'] * phrase
+                + self.weights['title'] * title_score
+            )
+        return scores
+
+    def rerank(self, query, candidates, index, top_k=None, budget_ms=None):
+        """Reorder search_knowledge_base results; returns (results, info)"""
+        start = time.perf_counter()
+        deadline = start + budget_ms / 1000 if budget_ms else None
+        stats = self.prepare(index)
+
+        query_tokens = [token for token in tokenize(query) if token not in STOPWORDS]
+        query_weights = {term: stats.idf(term) for term in set(query_tokens)}
+        query_bigrams = bigrams(query_tokens)
+
+        similarities = np.array([candidate.get('similarity', 0.0) for candidate in candidates], dtype=np.float64)
+        spread = similarities.max() - similarities.min() if len(similarities) else 0.0
+        dense = (similarities - similarities.min()) / spread if spread > 0 else np.ones(len(candidates))
+
+        metadata = index.metadata
+        scored = []
+        exhausted = False
+        for offset in range(0, len(candidates), self.batch_size):
+            if deadline is not None and offset and time.perf_counter() > deadline:
+                exhausted = True
+                break
+            batch = candidates[offset:offset + self.batch_size]
+            titles = []
+            for candidate in batch:
+                row = candidate.get('index')
+                meta = metadata[row] if row is not None and row < len(metadata) else {}
+                titles.append(meta.get('topic_title') or meta.get('section') or '')
+            scores = self.score_batch(query_weights, query_bigrams, batch, titles, dense[offset:offset + len(batch)])
+            scored.extend(dict(candidate, rerank_score=round(score, 4)) for candidate, score in zip(batch, scores))
+
+        scored.sort(key=lambda candidate: candidate['rerank_score'], reverse=True)
+        results = scored + list(candidates[len(scored):])
+        info = {
+            'candidates': len(candidates),
+            'scored': len(scored),
+            'budget_exhausted': exhausted,
+            'seconds': round(time.perf_counter() - start, 6)
+        }
+        return results[:top_k] if top_k else results, info
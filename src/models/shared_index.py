@@ -0,0 +1,154 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import json
+import mmap
+import numpy as np
+
+from src.models.ingest_pipeline import (
+    IndexWriter, EMBEDDINGS_FILENAME, CHUNKS_FILENAME, MANIFEST_FILENAME
+)
+from src.utils.fileio import exclusive_lock
+
+
+def index_lock(index_dir):
+    """Exclusive lock next to the index so only one process builds it"""
+    return exclusive_lock(f"{os.path.abspath(index_dir)}.lock")
+
+
+def build_index_from_npz(npz_path, index_dir):
+    """Convert a comprehensive_embeddings.npz archive into the mmap-able index format"""
+    stat = os.stat(npz_path)
+    data = np.load(npz_path, allow_pickle=True)
+    content = data['content'].tolist()
+    metadata = data['metadata'].tolist() if 'metadata' in data.files else [{}] * len(content)
+
+    with IndexWriter(index_dir) as writer:
+        writer.append(content, metadata, data['embeddings'])
+        # What the index was converted from, so a rewritten archive is noticed
+        return writer.finish({
+            'source': os.path.basename(str(npz_path)),
+            'source_mtime': stat.st_mtime,
+            'source_size': stat.st_size
+        })
+
+
+def index_is_stale(index_dir, npz_path):
+    """True if index_dir is missing, or was converted from npz_path before its last rewrite.
+
+    Indexes written by the ingestion pipeline record no npz source and are
+    never considered stale here.
+    """
+    if not npz_path or not os.path.exists(npz_path):
+        return False
+    manifest_path = os.path.join(index_dir, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return True
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return True
+    if manifest.get('source') != os.path.basename(str(npz_path)):
+        return False
+    stat = os.stat(npz_path)
+    return (manifest.get('source_mtime'), manifest.get('source_size')) != (stat.st_mtime, stat.st_size)
+
+
+def shadows_npz(index_dir, npz_path):
+    """True if index_dir holds an index not converted from npz_path, which load_snapshot serves instead"""
+    manifest_path = os.path.join(index_dir, MANIFEST_FILENAME) if index_dir else ''
+    if not manifest_path or not os.path.exists(manifest_path):
+        return False
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return manifest.get('source') != os.path.basename(str(npz_path))
+
+
+def ensure_index(index_dir, npz_path=None):
+    """Make sure an up-to-date index exists at index_dir, building it under the lock if needed.
+
+    Every worker can call this at startup or on reload: the first one
+    converts the npz archive, the others block on the lock and then find
+    a manifest matching the archive's mtime and size.
+    Returns True if this process built the index.
+    """
+    if not index_is_stale(index_dir, npz_path):
+        return False
+    with index_lock(index_dir):
+        if not index_is_stale(index_dir, npz_path):
+            return False
+        manifest = build_index_from_npz(npz_path, index_dir)
+        print(f"Built shared index with {manifest['count']} chunks at {index_dir}")
+        return True
+
+
+class MappedChunks:
+    """Read-only sequence over the texts in chunks.jsonl without loading them.
+
+    The file is memory-mapped, so every worker shares the same page-cache
+    pages; only a small array of line offsets is private to each process.
+    """
+
+    def __init__(self, path, field='content'):
+        self.path = path
+        self.field = field
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size == 0:
+            self._mmap = None
+            self._starts = np.zeros(0, dtype=np.int64)
+            self._ends = self._starts
+            return
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        newlines = np.flatnonzero(np.frombuffer(self._mmap, dtype=np.uint8) == 10)
+        self._ends = newlines.astype(np.int64)
+        self._starts = np.concatenate(([0], self._ends[:-1] + 1)).astype(np.int64)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def record(self, index):
+        start, end = int(self._starts[index]), int(self._ends[index])
+        return json.loads(self._mmap[start:end])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self.record(index)[self.field]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+
+def attach_index(index_dir):
+    """Attach to an index zero-copy: embeddings and chunk texts are both mmapped"""
+    with open(os.path.join(index_dir, MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    shape = (manifest['count'], manifest['dim'])
+    if manifest['count'] == 0:
+        embeddings = np.zeros(shape, dtype=np.float32)
+    else:
+        embeddings = np.memmap(
+            os.path.join(index_dir, EMBEDDINGS_FILENAME), dtype=manifest['dtype'], mode='r', shape=shape
+        )
+
+    chunks_path = os.path.join(index_dir, CHUNKS_FILENAME)
+    return {
+        'embeddings': embeddings,
+        'content': MappedChunks(chunks_path, 'content'),
+        'metadata': MappedChunks(chunks_path, 'metadata'),
+        'manifest': manifest
+    }
@@ -0,0 +1,145 @@
+import os
+import threading
+import weakref
+
+from config.settings import settings
+
+
+def load_post_stats(topic_ids, raw_dir=None, corpus_db=None):
+    """{(topic_id, post_number): (like_count, trust_level)} from the scraped topics.
+
+    Only needed for indexes built before chunk metadata carried these
+    fields; reads the corpus store, then the topic files for topics the
+    store does not have.
+    """
+    topic_ids = {int(topic_id) for topic_id in topic_ids}
+    stats = {}
+
+    def add(topic):
+        for post in topic.get('posts', []):
+            stats[(int(topic['id']), int(post.get('post_number') or 0))] = (
+                int(post.get('like_count') or 0), int(post.get('trust_level') or 0)
+            )
+
+    raw_dir = raw_dir or settings.RAW_DATA_PATH
+    from src.utils.corpus_store import CorpusStore, corpus_path_for, read_topic_file
+    corpus_db = str(corpus_db or corpus_path_for(raw_dir))
+    missing = set(topic_ids)
+    if os.path.exists(corpus_db):
+        with CorpusStore(corpus_db) as store:
+            for topic in store.iter_topics(fields=()):
+                if int(topic['id']) in topic_ids:
+                    add(topic)
+                    missing.discard(int(topic['id']))
+
+    for topic_id in missing:
+        try:
+            topic = read_topic_file(raw_dir, topic_id)
+        except (OSError, ValueError) as e:
+            print(f"WARNING: Could not read post stats for topic {topic_id}: {e}")
+            continue
+        if topic is not None:
+            add(topic)
+    return stats
+
+
+class ThreadIndex:
+    """Precomputed topic -> posts adjacency over the chunk rows of one index.
+
+    `threads[topic_id]` lists that topic's posts in post order as
+    (post_number, rows, like_count, trust_level); `position[row]` is the
+    (topic_id, offset) of the post a chunk belongs to. Expanding a hit is
+    two dict lookups and a slice of its thread.
+    """
+
+    def __init__(self, metadata, post_stats=None):
+        posts = {}
+        for row, meta in enumerate(metadata):
+            topic_id = (meta or {}).get('topic_id')
+            if topic_id is None:
+                continue
+            key = (int(topic_id), int(meta.get('post_number') or 0))
+            post = posts.get(key)
+            if post is None:
+                post = posts[key] = {'rows': [], 'like_count': meta.get('like_count'),
+                                     'trust_level': meta.get('trust_level')}
+            post['rows'].append(row)
+
+        # Older indexes lack the vote/trust fields in chunk metadata
+        if post_stats is None and any(post['like_count'] is None for post in posts.values()):
+            post_stats = load_post_stats({topic_id for topic_id, _ in posts})
+        post_stats = post_stats or {}
+
+        self.threads = {}
+        self.position = {}
+        for (topic_id, post_number), post in sorted(posts.items()):
+            likes, trust = post_stats.get((topic_id, post_number), (0, 0))
+            if post['like_count'] is not None:
+                likes, trust = int(post['like_count'] or 0), int(post['trust_level'] or 0)
+            thread = self.threads.setdefault(topic_id, [])
+            for row in post['rows']:
+                self.position[row] = (topic_id, len(thread))
+            thread.append((post_number, tuple(post['rows']), likes, trust))
+
+    def __len__(self):
+        return len(self.threads)
+
+    def neighbours(self, row, before=1, after=5):
+        """Other posts of the hit's thread within the window, best-voted and most trusted first"""
+        located = self.position.get(row)
+        if located is None:
+            return []
+        topic_id, offset = located
+        thread = self.threads[topic_id]
+        window = [
+            (offset_ - offset, post)
+            for offset_, post in enumerate(thread[max(0, offset - before):offset + after + 1], max(0, offset - before))
+            if offset_ != offset
+        ]
+        # Ties go to the nearest post, replies before the posts preceding the hit
+        window.sort(key=lambda item: (-item[1][2], -item[1][3], abs(item[0]), item[0] < 0))
+        return [post for _, post in window]
+
+
+class ThreadExpander:
+    """Adds the best answer posts around each Discourse hit to the retrieved context"""
+
+    def __init__(self):
+        self._indexes = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def prepare(self, index):
+        """Thread index for a snapshot; built once and kept while the snapshot lives"""
+        thread_index = self._indexes.get(index)
+        if thread_index is None:
+            with self._lock:
+                thread_index = self._indexes.get(index)
+                if thread_index is None:
+                    thread_index = self._indexes[index] = ThreadIndex(index.metadata)
+        return thread_index
+
+    def expand(self, results, index, posts_per_hit=2, before=1, after=5):
+        """Each hit followed by up to `posts_per_hit` neighbouring posts, never repeating a row"""
+        thread_index = self.prepare(index)
+        seen = {result.get('index') for result in results}
+        expanded = []
+        for result in results:
+            expanded.append(result)
+            added = 0
+            for post_number, rows, likes, trust in thread_index.neighbours(result.get('index'), before, after):
+                if added >= posts_per_hit:
+                    break
+                if any(row in seen for row in rows):
+                    continue
+                seen.update(rows)
+                expanded.append({
+                    'content': '\n'.join(str(index.chunks[row]) for row in rows),
+                    'similarity': result.get('similarity', 0.0),
+                    'index': rows[0],
+                    'expanded_from': result.get('index'),
+                    'post_number': post_number,
+                    'like_count': likes,
+                    'trust_level': trust
+                })
+                added += 1
+        return expanded
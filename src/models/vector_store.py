@@ -8,8 +8,8 @@ import json
 import requests
 from datetime import datetime
 from config.settings import settings
+from src.utils.html_text import html_to_text
 import glob
-from bs4 import BeautifulSoup
 
 class EfficientVectorStore:
     def __init__(self):
@@ -51,24 +51,7 @@ class EfficientVectorStore:
     
     def clean_html_content(self, html_content):
         """Clean HTML content to extract readable text"""
-        if not html_content:
-            return ""
-        
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Get text content
-        text = soup.get_text()
-        
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        cleaned_text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        return cleaned_text
+        return html_to_text(html_content)
     
     def chunk_content(self, content, chunk_size=500, overlap=50):
         """Split content into overlapping chunks for better retrieval"""
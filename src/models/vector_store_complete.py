@@ -6,15 +6,19 @@ sys.path.insert(0, project_root)
 import numpy as np
 import json
 import requests
-import glob
 from datetime import datetime
 from config.settings import settings
-from bs4 import BeautifulSoup
+from src.utils.html_text import html_to_text
 import hashlib
+from src.utils.chunker import StructureAwareChunker
+from src.utils.corpus_store import CorpusStore, corpus_path_for, iter_scraped_topics, read_topic_file
 
 class ComprehensiveVectorStore:
-    def __init__(self):
-        self.embeddings_file = 'data/processed/comprehensive_embeddings.npz'
+    def __init__(self, embeddings_file=None, raw_dir=None):
+        self.embeddings_file = str(embeddings_file or 'data/processed/comprehensive_embeddings.npz')
+        # Where update_topic_embeddings reads the re-scraped topics (the scraper's output_dir)
+        self.raw_dir = str(raw_dir or settings.RAW_DATA_PATH)
+        self.chunker = StructureAwareChunker()
         
     def create_embedding(self, text):
         """Create embedding using Gemini with fallback"""
@@ -43,38 +47,31 @@ class ComprehensiveVectorStore:
             
         return embedding
     
-    def chunk_content(self, content, chunk_size=500, overlap=50):
-        """Split content into overlapping chunks for better retrieval"""
-        words = content.split()
-        chunks = []
-        
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = ' '.join(words[i:i + chunk_size])
-            if len(chunk.strip()) > 50:
-                chunks.append(chunk)
+    def create_embeddings_batch(self, texts):
+        """Embed a batch of texts in one Gemini call, falling back per text"""
+        try:
+            if hasattr(settings, 'GEMINI_API_KEY') and settings.GEMINI_API_KEY != "your_gemini_api_key_here":
+                import google.generativeai as genai
+                genai.configure(api_key=settings.GEMINI_API_KEY)
+                
+                result = genai.embed_content(
+                    model="models/embedding-001",
+                    content=list(texts),
+                    task_type="retrieval_document"
+                )
+                return np.array(result['embedding'], dtype=np.float32)
+        except Exception as e:
+            print(f"Gemini batch embedding failed: {e}")
         
-        return chunks
+        return np.array([self.create_embedding(text) for text in texts], dtype=np.float32)
+    
+    def chunk_content(self, content):
+        """Split content into structure-aware chunks (headings, code fences)"""
+        return [chunk['content'] for chunk in self.chunker.iter_chunks(content)]
     
     def clean_html_content(self, html_content):
         """Clean HTML content to extract readable text"""
-        if not html_content:
-            return ""
-        
-        try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            text = soup.get_text()
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            cleaned_text = ' '.join(chunk for chunk in chunks if chunk)
-            
-            return cleaned_text
-        except Exception as e:
-            print(f"WARNING: HTML cleaning error: {e}")
-            return html_content
+        return html_to_text(html_content)
     
     def create_comprehensive_embeddings(self):
         """Create embeddings from all sources using NumPy method"""
@@ -96,12 +93,10 @@ class ComprehensiveVectorStore:
                 content = section_data.get('content', '')
                 
                 if content:
-                    chunks = self.chunk_content(content)
-                    
-                    for i, chunk in enumerate(chunks):
-                        embedding = self.create_embedding(chunk)
+                    for i, chunk in enumerate(self.chunker.iter_chunks(content)):
+                        embedding = self.create_embedding(chunk['content'])
                         
-                        all_content.append(chunk)
+                        all_content.append(chunk['content'])
                         all_embeddings.append(embedding)
                         all_metadata.append({
                             'source': section_name,
@@ -109,61 +104,39 @@ class ComprehensiveVectorStore:
                             'url': section_data.get('url', ''),
                             'type': 'course_content',
                             'scraped_at': section_data.get('scraped_at', ''),
-                            'section': section_name
+                            'section': section_name,
+                            'heading_path': chunk['heading_path'],
+                            'char_start': chunk['char_start'],
+                            'char_end': chunk['char_end']
                         })
                         
-                        print(f"  SUCCESS: Processed chunk {i+1}/{len(chunks)} from {section_name}")
+                        print(f"  SUCCESS: Processed chunk {i+1} from {section_name}")
         
         # Process Discourse content
         print("Processing Discourse content...")
-        discourse_files = glob.glob(os.path.join(settings.RAW_DATA_PATH, 'discourse_topic_*.json'))
-        
         discourse_chunks_count = 0
-        for file_path in discourse_files:
+        discourse_topics_count = 0
+        for topic_data in iter_scraped_topics(self.raw_dir):
+            discourse_topics_count += 1
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    topic_data = json.load(f)
-                
                 topic_id = topic_data.get('id')
                 topic_title = topic_data.get('title', '')
-                topic_url = topic_data.get('url', '')
                 
-                posts = topic_data.get('posts', [])
-                for post in posts:
-                    raw_content = post.get('raw_content', '')
-                    cleaned_content = post.get('cleaned_text', '')
+                for content, metadata in self.iter_topic_chunks(topic_data):
+                    embedding = self.create_embedding(content)
                     
-                    content = raw_content if raw_content else cleaned_content
+                    all_content.append(content)
+                    all_embeddings.append(embedding)
+                    all_metadata.append(metadata)
                     
-                    if content and len(content) > 50:
-                        chunks = self.chunk_content(content)
-                        
-                        for i, chunk in enumerate(chunks):
-                            embedding = self.create_embedding(chunk)
-                            
-                            all_content.append(chunk)
-                            all_embeddings.append(embedding)
-                            all_metadata.append({
-                                'source': f"discourse_topic_{topic_id}",
-                                'chunk_id': i,
-                                'url': topic_url,
-                                'type': 'discourse_post',
-                                'topic_id': topic_id,
-                                'topic_title': topic_title,
-                                'post_number': post.get('post_number', 1),
-                                'username': post.get('username', 'unknown'),
-                                'created_at': post.get('created_at', ''),
-                                'section': 'discourse'
-                            })
-                            
-                            discourse_chunks_count += 1
+                    discourse_chunks_count += 1
                 
                 print(f"  SUCCESS: Processed topic {topic_id}: {topic_title}")
                 
             except Exception as e:
-                print(f"WARNING: Error processing {file_path}: {e}")
+                print(f"WARNING: Error processing topic {topic_data.get('id')}: {e}")
         
-        print(f"Processed {discourse_chunks_count} discourse chunks from {len(discourse_files)} topics")
+        print(f"Processed {discourse_chunks_count} discourse chunks from {discourse_topics_count} topics")
         
         # Create output directory
         os.makedirs('data/processed', exist_ok=True)
@@ -200,6 +173,99 @@ class ComprehensiveVectorStore:
             'embedding_dimensions': len(all_embeddings[0]) if all_embeddings else 0
         }
     
+    def iter_topic_chunks(self, topic_data):
+        """Yield (content, metadata) for every chunk of a discourse topic"""
+        topic_id = topic_data.get('id')
+        topic_title = topic_data.get('title', '')
+        topic_url = topic_data.get('url', '')
+        
+        for post in topic_data.get('posts', []):
+            raw_content = post.get('raw_content', '')
+            cleaned_content = post.get('cleaned_text', '')
+            
+            content = raw_content if raw_content else cleaned_content
+            
+            if content and len(content) > 50:
+                for i, chunk in enumerate(self.chunker.iter_chunks(content)):
+                    yield chunk['content'], {
+                        'source': f"discourse_topic_{topic_id}",
+                        'chunk_id': i,
+                        'url': topic_url,
+                        'type': 'discourse_post',
+                        'topic_id': topic_id,
+                        'topic_title': topic_title,
+                        'post_number': post.get('post_number', 1),
+                        'username': post.get('username', 'unknown'),
+                        'created_at': post.get('created_at', ''),
+                        'like_count': post.get('like_count', 0),
+                        'trust_level': post.get('trust_level', 0),
+                        'section': 'discourse',
+                        'heading_path': chunk['heading_path'],
+                        'char_start': chunk['char_start'],
+                        'char_end': chunk['char_end']
+                    }
+    
+    def update_topic_embeddings(self, topic_ids):
+        """Re-embed only the given discourse topics inside the existing archive.
+
+        Only the npz archive is updated. An index converted from it is
+        rebuilt on its next load, but an index written by the ingestion
+        pipeline to INDEX_DIR is served instead of the archive and has to be
+        rebuilt with IngestPipeline to pick up the change.
+        """
+        embeddings_data = self.load_embeddings()
+        if not embeddings_data:
+            print("ERROR: No existing embeddings to update, run create_comprehensive_embeddings() first")
+            return None
+        
+        topic_ids = {int(topic_id) for topic_id in topic_ids}
+        keep = [
+            i for i, metadata in enumerate(embeddings_data['metadata'])
+            if metadata.get('topic_id') is None or int(metadata['topic_id']) not in topic_ids
+        ]
+        
+        new_content = []
+        new_embeddings = []
+        new_metadata = []
+        corpus_db = corpus_path_for(self.raw_dir)
+        corpus_store = CorpusStore(corpus_db) if os.path.exists(corpus_db) else None
+        try:
+            for topic_id in sorted(topic_ids):
+                topic_data = (corpus_store.get_topic(topic_id) if corpus_store else None) \
+                    or read_topic_file(self.raw_dir, topic_id)
+                if topic_data is None:
+                    continue
+                for content, metadata in self.iter_topic_chunks(topic_data):
+                    new_content.append(content)
+                    new_embeddings.append(self.create_embedding(content))
+                    new_metadata.append(metadata)
+        finally:
+            if corpus_store is not None:
+                corpus_store.close()
+        
+        embeddings = embeddings_data['embeddings'][keep]
+        if new_embeddings and len(new_embeddings[0]) != embeddings.shape[1]:
+            print(f"ERROR: New embeddings have {len(new_embeddings[0])} dimensions, archive has {embeddings.shape[1]}")
+            return None
+        if new_embeddings:
+            embeddings = np.vstack([embeddings, np.array(new_embeddings)])
+        content = np.concatenate([embeddings_data['content'][keep], np.array(new_content, dtype=object)])
+        metadata = np.concatenate([embeddings_data['metadata'][keep], np.array(new_metadata, dtype=object)])
+        
+        # The hot-swap watcher polls this file: never let it see a half-written archive
+        tmp_path = f"{self.embeddings_file}.tmp-{os.getpid()}.npz"
+        np.savez_compressed(tmp_path, embeddings=embeddings, content=content, metadata=metadata)
+        os.replace(tmp_path, self.embeddings_file)
+        
+        print(f"SUCCESS: Updated {len(topic_ids)} topics "
+              f"({len(embeddings_data['content']) - len(keep)} chunks removed, {len(new_content)} added)")
+        return {
+            'topics_updated': len(topic_ids),
+            'chunks_removed': len(embeddings_data['content']) - len(keep),
+            'chunks_added': len(new_content),
+            'total_chunks': len(content)
+        }
+    
     def load_embeddings(self):
         """Load embeddings from NumPy archive"""
         if not os.path.exists(self.embeddings_file):
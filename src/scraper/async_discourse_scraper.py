@@ -0,0 +1,231 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import asyncio
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import partial
+from requests.adapters import HTTPAdapter
+from config.settings import settings
+from src.scraper.discourse_scraper_final import DiscourseScraperFixed
+from src.scraper.scrape_journal import JournaledDiscourseScrape
+
+
+def parse_retry_after(value, default=None):
+    """Parse a Retry-After header given either in seconds or as an HTTP date"""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+
+class RateLimiter:
+    """Global requests-per-second budget shared by every scraper task"""
+
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        """Hold back every task, e.g. after the server answered 429"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            wait = max(self._next_slot, self._paused_until) - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+                now = time.monotonic()
+            self._next_slot = max(now, self._next_slot) + self.interval
+
+
+class AsyncDiscourseScraper(DiscourseScraperFixed):
+    """Concurrent version of DiscourseScraperFixed.
+
+    Topics are fetched by a bounded number of tasks sharing one keep-alive
+    connection pool, paced by a global requests-per-second budget instead
+    of a fixed sleep after every request. Corpus store reads and writes and
+    the fsync'd journal appends run on one writer thread, which owns the
+    SQLite connection, so they never block the event loop.
+    """
+
+    def __init__(self, base_url=None, output_dir=None, concurrency=None,
+                 requests_per_second=None, max_retries=None, journal_path=None, **course):
+        # course: category_id, category_slug, start_date, end_date (see DiscourseScraperFixed)
+        super().__init__(base_url=base_url, output_dir=output_dir, **course)
+        self.concurrency = concurrency or settings.SCRAPER_CONCURRENCY
+        self.requests_per_second = (
+            requests_per_second if requests_per_second is not None
+            else settings.SCRAPER_REQUESTS_PER_SECOND
+        )
+        self.max_retries = max_retries if max_retries is not None else settings.SCRAPER_MAX_RETRIES
+        # None = the journaled job's default, <output_dir>/discourse_scrape_journal.jsonl
+        self.journal_path = journal_path
+
+        # One pooled connection per concurrent task, reused across requests
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = None
+        self.writer = None
+        self.limiter = None
+
+    async def in_writer(self, fn, *args):
+        """Run a store or journal call on the single writer thread"""
+        return await asyncio.get_running_loop().run_in_executor(self.writer, partial(fn, *args))
+
+    async def fetch_json(self, url, params=None):
+        """GET a JSON document, honouring the rate budget and 429 Retry-After"""
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            try:
+                response = await loop.run_in_executor(self.executor, partial(
+                    self.session.get,
+                    url,
+                    cookies=self.cookies,
+                    headers=self.headers,
+                    params=params,
+                    timeout=30
+                ))
+            except Exception as e:
+                print(f"❌ Request error for {url}: {e}")
+                await asyncio.sleep(min(2 ** attempt, 30))
+                continue
+
+            if response.status_code == 200:
+                self.update_cookies_from_response(response)
+                return self.decode_response_content(response)
+
+            if response.status_code == 429:
+                delay = parse_retry_after(response.headers.get('Retry-After'), default=min(2 ** attempt, 30))
+                print(f"⏳ 429 Too Many Requests for {url}, retrying in {delay:.1f}s")
+                self.limiter.pause(delay)
+                continue
+
+            if response.status_code >= 500:
+                print(f"⚠️ {response.status_code} for {url}, retrying")
+                await asyncio.sleep(min(2 ** attempt, 30))
+                continue
+
+            if response.status_code == 403:
+                print("❌ 403 Forbidden: Cookies expired or invalid")
+            else:
+                print(f"❌ Failed to fetch {url}: {response.status_code}")
+            return None
+
+        print(f"❌ Giving up on {url} after {self.max_retries + 1} attempts")
+        return None
+
+    async def list_topics_async(self, job, state):
+        """Continue the journaled category listing (see JournaledDiscourseScrape.list_topics)"""
+        print("🔍 Fetching all topics with pagination and date filtering...")
+        url = f"{self.base_url}/c/{self.category_slug}/{self.category_id}.json"
+
+        while not state['listing_complete']:
+            page = state['next_page']
+            params = {'page': page} if page > 0 else {}
+            data = await self.fetch_json(url, params)
+            if data is None:
+                print(f"❌ Listing stopped at page {page}; rerun to resume from here")
+                return False
+            await self.in_writer(job.record_page, state, page, data.get('topic_list', {}).get('topics', []))
+            print(f"✅ Page {page}: {len(state['topics'])} relevant topics so far")
+
+        print(f"🎉 Total relevant topics found: {len(state['topics'])}")
+        return True
+
+    async def scrape_topic_async(self, topic_id, topic_title):
+        """Async counterpart of scrape_individual_topic"""
+        stored_topic = await self.in_writer(self.load_topic, topic_id)
+        if stored_topic is not None:
+            print(f"⏭️ Skipping topic {topic_id} (already exists)")
+            return stored_topic
+
+        topic_data = await self.fetch_json(f"{self.base_url}/t/{topic_id}.json")
+        if topic_data is None:
+            return None
+
+        loop = asyncio.get_running_loop()
+        try:
+            processed_topic = await loop.run_in_executor(
+                self.executor, self.process_topic_data, topic_id, topic_data
+            )
+            await self.in_writer(self.save_topic, processed_topic)
+        except Exception as e:
+            print(f"❌ Error scraping topic {topic_id}: {e}")
+            return None
+
+        print(f"✅ Saved topic {topic_id} ({topic_title[:40]}) with {len(processed_topic['posts'])} posts")
+        return processed_topic
+
+    async def scrape_all_async(self):
+        """Complete discourse scraping workflow with bounded parallelism.
+
+        Runs as a JournaledDiscourseScrape job: listing pages and finished
+        topics are journaled as they complete, so a rerun resumes the job.
+        """
+        print(f"🚀 Starting async Discourse scraping "
+              f"(concurrency={self.concurrency}, {self.requests_per_second} req/s)...")
+
+        job = JournaledDiscourseScrape(self, journal_path=self.journal_path, delay=0)
+        self.limiter = RateLimiter(self.requests_per_second)
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scrape-writer')
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        try:
+            state = await self.in_writer(job.start)
+            if not await self.list_topics_async(job, state):
+                return []
+            if not state['topics']:
+                print("❌ No topics found in the specified date range")
+
+            async def bounded(topic):
+                async with semaphore:
+                    topic_data = await self.scrape_topic_async(topic['id'], topic['title'])
+                await self.in_writer(job.record_topic, state, topic['id'], topic_data)
+
+            await asyncio.gather(*(bounded(topic) for topic in job.pending_topics(state)))
+            scraped_topics = await self.in_writer(job.finish, state)
+        finally:
+            self.executor.shutdown(wait=True)
+            # The store's connection belongs to the writer thread
+            await self.in_writer(self.close)
+            self.writer.shutdown(wait=True)
+
+        print(f"\n🎉 Discourse scraping completed!")
+        print(f"📊 Successfully scraped: {len(scraped_topics)} topics")
+        print(f"📊 Failed topics: {len(state['topics']) - len(scraped_topics)}")
+        return scraped_topics
+
+    def scrape_all_discourse_data(self):
+        """Run the async workflow from synchronous code"""
+        return asyncio.run(self.scrape_all_async())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent Discourse scraper")
+    parser.add_argument('--concurrency', type=int, default=settings.SCRAPER_CONCURRENCY)
+    parser.add_argument('--rps', type=float, default=settings.SCRAPER_REQUESTS_PER_SECOND,
+                        help="Global requests-per-second budget")
+    args = parser.parse_args()
+
+    scraper = AsyncDiscourseScraper(concurrency=args.concurrency, requests_per_second=args.rps)
+    scraper.scrape_all_discourse_data()
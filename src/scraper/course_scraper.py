@@ -7,16 +7,27 @@ sys.path.insert(0, project_root)
 import requests
 import time
 import json
-from urllib.parse import urljoin
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+from requests.adapters import HTTPAdapter
 from config.settings import settings
+from src.utils.fileio import atomic_write_json
+
+# Markdown links to other pages: [text](page.md), [text](#/page) or [text](/page.md#anchor)
+MARKDOWN_LINK_RE = re.compile(r'\]\(\s*<?([^)\s>]+)>?(?:\s+"[^"]*")?\s*\)')
 
 class TDSCourseScraper:
-    def __init__(self):
-        self.base_url = settings.TDS_COURSE_URL
+    def __init__(self, base_url=None, output_dir=None):
+        self.base_url = (base_url or settings.TDS_COURSE_URL).rstrip('/')
+        self.output_dir = output_dir or settings.RAW_DATA_PATH
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        self.cache_file = os.path.join(self.output_dir, 'tds_course_cache.json')
+        self.last_run_stats = {}
         
     def get_markdown_files(self):
         """Get list of markdown files to scrape"""
@@ -75,8 +86,8 @@ class TDSCourseScraper:
     
     def save_content(self, content, filename):
         """Save scraped content to file"""
-        os.makedirs(settings.RAW_DATA_PATH, exist_ok=True)
-        filepath = os.path.join(settings.RAW_DATA_PATH, filename)
+        os.makedirs(self.output_dir, exist_ok=True)
+        filepath = os.path.join(self.output_dir, filename)
         
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(content)
@@ -84,6 +95,162 @@ class TDSCourseScraper:
         print(f"💾 Saved content to {filepath}")
         return filepath
     
+    def discover_linked_pages(self, content, current_filename=''):
+        """Find other course .md pages linked from a markdown page"""
+        pages = []
+        base = urljoin(f"{self.base_url}/", current_filename)
+        host = urlparse(self.base_url).netloc
+        
+        for target in MARKDOWN_LINK_RE.findall(content or ''):
+            # Docsify routes look like #/docker or #/docker.md
+            if target.startswith('#/'):
+                target = target[2:]
+            elif target.startswith('#'):
+                continue
+            
+            target = target.split('#', 1)[0].split('?', 1)[0]
+            if not target:
+                continue
+            if target.endswith('/'):
+                target += 'README.md'
+            elif not target.endswith('.md'):
+                if urlparse(target).scheme or '.' in target.rsplit('/', 1)[-1]:
+                    continue
+                target += '.md'
+            
+            url = urljoin(base, target)
+            parsed = urlparse(url)
+            if parsed.netloc != host:
+                continue
+            
+            base_path = urlparse(self.base_url).path.rstrip('/')
+            filename = parsed.path[len(base_path):].lstrip('/') if parsed.path.startswith(base_path) else None
+            if filename and filename not in pages:
+                pages.append(filename)
+        
+        return pages
+    
+    def load_cache(self):
+        """Load ETag / Last-Modified validators and last scraped pages"""
+        cache = {}
+        if os.path.exists(self.cache_file):
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        
+        previous = {}
+        combined_file = os.path.join(self.output_dir, 'tds_course_all.json')
+        if os.path.exists(combined_file):
+            with open(combined_file, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        return cache, previous
+    
+    def fetch_conditional(self, filename, validators):
+        """GET a markdown file, sending stored validators; returns (status, content, validators)"""
+        url = f"{self.base_url}/{filename}"
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        
+        try:
+            response = self.session.get(url, headers=headers, timeout=30)
+        except requests.RequestException as e:
+            print(f"✗ Error scraping {filename}: {e}")
+            return None, None, validators
+        
+        if response.status_code == 304:
+            print(f"⏭️ {filename} not modified (304)")
+            return 304, None, validators
+        
+        if response.status_code == 200:
+            print(f"✓ Successfully scraped {filename}: {len(response.text)} characters")
+            return 200, response.text, {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+        
+        print(f"✗ Failed to scrape {filename}: HTTP {response.status_code}")
+        return response.status_code, None, validators
+    
+    def scrape_all_content_concurrent(self, max_workers=None, discover=True):
+        """Fetch course pages in parallel, following links, with conditional GETs"""
+        print("🚀 Starting concurrent TDS Course content scraping...")
+        max_workers = max_workers or settings.COURSE_SCRAPER_WORKERS
+        
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        cache, previous = self.load_cache()
+        previous_by_file = {data.get('filename'): data for data in previous.values()}
+        
+        scraped_data = {}
+        new_cache = {}
+        stats = {'fetched': 0, 'not_modified': 0, 'failed': 0, 'kept': 0}
+        lock = threading.Lock()
+        seen = set()
+        
+        def process(filename):
+            status, content, validators = self.fetch_conditional(filename, cache.get(filename, {}))
+            page_name = filename[:-len('.md')].replace('/', '_')
+            
+            if status == 304 and filename in previous_by_file:
+                entry = previous_by_file[filename]
+                raw_content = entry.get('content', '')
+                with lock:
+                    stats['not_modified'] += 1
+            elif status == 200:
+                raw_content = content
+                cleaned_content = self.clean_markdown_content(content)
+                entry = {
+                    'filename': filename,
+                    'url': f"{self.base_url}/{filename}",
+                    'content': cleaned_content,
+                    'raw_length': len(content),
+                    'cleaned_length': len(cleaned_content),
+                    'scraped_at': time.strftime('%Y-%m-%d %H:%M:%S')
+                }
+                self.save_content(cleaned_content, f"tds_course_{page_name}.md")
+                with lock:
+                    stats['fetched'] += 1
+            elif status not in (404, 410) and filename in previous_by_file:
+                # Transient failure: keep the last good copy and its validators until the next run
+                entry = previous_by_file[filename]
+                raw_content = entry.get('content', '')
+                with lock:
+                    stats['failed'] += 1
+                    stats['kept'] += 1
+            else:
+                with lock:
+                    stats['failed'] += 1
+                return []
+            
+            with lock:
+                scraped_data[page_name] = entry
+                new_cache[filename] = validators
+            return self.discover_linked_pages(raw_content, filename) if discover else []
+        
+        wave = [f for f in ['_sidebar.md'] + self.get_markdown_files() if not (f in seen or seen.add(f))]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while wave:
+                next_wave = []
+                for links in executor.map(process, wave):
+                    for filename in links:
+                        if filename not in seen:
+                            seen.add(filename)
+                            next_wave.append(filename)
+                wave = next_wave
+        
+        os.makedirs(self.output_dir, exist_ok=True)
+        atomic_write_json(os.path.join(self.output_dir, 'tds_course_all.json'), scraped_data)
+        atomic_write_json(self.cache_file, new_cache)
+        
+        self.last_run_stats = stats
+        print(f"\n✅ Scraping completed! {stats['fetched']} fetched, "
+              f"{stats['not_modified']} not modified, {stats['failed']} failed")
+        return scraped_data
+    
     def scrape_all_content(self):
         """Main method to scrape all TDS course content"""
         print("🚀 Starting TDS Course content scraping...")
@@ -122,7 +289,7 @@ class TDSCourseScraper:
             time.sleep(settings.REQUEST_DELAY)
         
         # Save combined data as JSON
-        combined_file = os.path.join(settings.RAW_DATA_PATH, 'tds_course_all.json')
+        combined_file = os.path.join(self.output_dir, 'tds_course_all.json')
         with open(combined_file, 'w', encoding='utf-8') as f:
             json.dump(scraped_data, f, indent=2, ensure_ascii=False)
         
@@ -139,7 +306,10 @@ class TDSCourseScraper:
 if __name__ == "__main__":
     scraper = TDSCourseScraper()
     try:
-        data = scraper.scrape_all_content()
+        if '--concurrent' in sys.argv:
+            data = scraper.scrape_all_content_concurrent()
+        else:
+            data = scraper.scrape_all_content()
         print(f"\n🎉 Successfully scraped {len(data)} files from TDS course")
         
         # Show what we got
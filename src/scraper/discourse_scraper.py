@@ -11,6 +11,7 @@ from datetime import datetime, timedelta
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 from config.settings import settings
+from src.utils.html_text import html_to_text
 
 class TDSDiscourseScraper:
     def __init__(self):
@@ -228,24 +229,7 @@ class TDSDiscourseScraper:
     
     def clean_html_content(self, html_content):
         """Clean HTML content to extract readable text"""
-        if not html_content:
-            return ""
-        
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Get text content
-        text = soup.get_text()
-        
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        cleaned_text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        return cleaned_text
+        return html_to_text(html_content)
     
     def save_discourse_data(self, topics_data, filename):
         """Save scraped Discourse data to file"""
@@ -7,17 +7,32 @@ import requests
 import json
 import time
 from datetime import datetime, timezone
-from bs4 import BeautifulSoup
 from config.settings import settings
+from src.utils.html_text import html_to_text, clean_html_batch, shutdown_pool
+from src.utils.fileio import atomic_write_json
+from src.utils.corpus_store import CorpusStore, corpus_path_for, read_topic_file
+
+def parse_date(value):
+    """Timezone-aware datetime from a datetime or an ISO date string such as "2025-04-14" """
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
 
 class DiscourseScraperFixed:
-    def __init__(self):
+    def __init__(self, base_url=None, output_dir=None, corpus_store=None,
+                 category_id=None, category_slug=None, start_date=None, end_date=None):
         self.session = requests.Session()
-        self.base_url = "https://discourse.onlinedegree.iitm.ac.in"
-        self.category_id = 34  # TDS category
+        # Topics are saved to this CorpusStore; by default the output directory's, opened on first use
+        self.corpus_store = corpus_store
+        self.owns_corpus_store = corpus_store is None
+        self.base_url = base_url or settings.DISCOURSE_BASE_URL
+        self.output_dir = output_dir or settings.RAW_DATA_PATH
+        # Category and term default to the TDS Jan-Apr 2025 settings; pass them per course
+        self.category_id = int(category_id or settings.DISCOURSE_CATEGORY_ID)
+        self.category_slug = (category_slug or settings.DISCOURSE_CATEGORY_SLUG).strip('/')
         # Make timezone-aware dates to fix parsing error
-        self.start_date = datetime(2025, 1, 1, tzinfo=timezone.utc)
-        self.end_date = datetime(2025, 4, 14, tzinfo=timezone.utc)
+        self.start_date = parse_date(start_date or settings.DISCOURSE_START_DATE)
+        self.end_date = parse_date(end_date or settings.DISCOURSE_END_DATE)
         
         # FRESH COOKIES FROM YOUR BROWSER
         self.cookies = {
@@ -62,6 +77,41 @@ class DiscourseScraperFixed:
             print(f"❌ Response decoding error: {e}")
             return None
     
+    def fetch_topic_page(self, page):
+        """Fetch one page of the category listing; returns its topics or None on failure"""
+        url = f"{self.base_url}/c/{self.category_slug}/{self.category_id}.json"
+        params = {'page': page} if page > 0 else {}
+        
+        try:
+            print(f"📄 Fetching page {page}...")
+            response = self.session.get(
+                url, 
+                cookies=self.cookies, 
+                headers=self.headers,
+                params=params,
+                timeout=30
+            )
+            
+            print(f"📄 Page {page}: Status {response.status_code}")
+            
+            if response.status_code == 200:
+                data = self.decode_response_content(response)
+                if data is None:
+                    return None
+                
+                self.update_cookies_from_response(response)
+                return data.get('topic_list', {}).get('topics', [])
+            
+            elif response.status_code == 403:
+                print("❌ 403 Forbidden: Cookies expired or invalid")
+            else:
+                print(f"❌ Failed to get topics: {response.status_code}")
+                
+        except Exception as e:
+            print(f"❌ Error fetching page {page}: {e}")
+        
+        return None
+    
     def get_all_topics_with_pagination(self):
         """Get all topics using pagination with proper date handling"""
         print("🔍 Fetching all topics with pagination and date filtering...")
@@ -70,87 +120,57 @@ class DiscourseScraperFixed:
         page = 0
         
         while True:
-            url = f"{self.base_url}/c/courses/tds-kb/{self.category_id}.json"
-            params = {'page': page} if page > 0 else {}
+            topics = self.fetch_topic_page(page)
+            if topics is None:
+                break
             
-            try:
-                print(f"📄 Fetching page {page}...")
-                response = self.session.get(
-                    url, 
-                    cookies=self.cookies, 
-                    headers=self.headers,
-                    params=params,
-                    timeout=30
-                )
-                
-                print(f"📄 Page {page}: Status {response.status_code}")
-                
-                if response.status_code == 200:
-                    data = self.decode_response_content(response)
-                    if data is None:
-                        break
-                    
-                    topics = data.get('topic_list', {}).get('topics', [])
-                    
-                    if not topics:
-                        print(f"📄 No more topics found on page {page}")
-                        break
-                    
-                    print(f"📄 Found {len(topics)} topics on page {page}")
-                    
-                    # Filter by date range with proper timezone handling
-                    filtered_topics = []
-                    for topic in topics:
-                        created_at = topic.get('created_at', '')
-                        if created_at:
-                            try:
-                                # Parse the datetime and make it timezone-aware
-                                topic_date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                                
-                                if self.start_date <= topic_date <= self.end_date:
-                                    filtered_topics.append(topic)
-                                    print(f"  ✅ Topic {topic.get('id')}: {topic.get('title', 'Unknown')[:50]}...")
-                            except Exception as e:
-                                print(f"  ⚠️ Date parsing error for topic {topic.get('id')}: {e}")
-                    
-                    all_topics.extend(filtered_topics)
-                    self.update_cookies_from_response(response)
-                    
-                    print(f"✅ Page {page}: Found {len(filtered_topics)} relevant topics")
-                    
-                    if len(topics) < 30:
-                        print("📄 Reached last page")
-                        break
-                    
-                    page += 1
-                    time.sleep(2)  # Rate limiting
-                    
-                elif response.status_code == 403:
-                    print("❌ 403 Forbidden: Cookies expired or invalid")
-                    break
-                else:
-                    print(f"❌ Failed to get topics: {response.status_code}")
-                    break
-                    
-            except Exception as e:
-                print(f"❌ Error fetching page {page}: {e}")
+            if not topics:
+                print(f"📄 No more topics found on page {page}")
+                break
+            
+            print(f"📄 Found {len(topics)} topics on page {page}")
+            
+            filtered_topics = self.filter_topics_by_date(topics)
+            all_topics.extend(filtered_topics)
+            
+            print(f"✅ Page {page}: Found {len(filtered_topics)} relevant topics")
+            
+            if len(topics) < 30:
+                print("📄 Reached last page")
                 break
+            
+            page += 1
+            time.sleep(2)  # Rate limiting
         
         print(f"🎉 Total relevant topics found: {len(all_topics)}")
         return all_topics
     
+    def filter_topics_by_date(self, topics):
+        """Keep topics created inside the configured date range"""
+        filtered_topics = []
+        for topic in topics:
+            created_at = topic.get('created_at', '')
+            if created_at:
+                try:
+                    # Parse the datetime and make it timezone-aware
+                    topic_date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+                    
+                    if self.start_date <= topic_date <= self.end_date:
+                        filtered_topics.append(topic)
+                        print(f"  ✅ Topic {topic.get('id')}: {topic.get('title', 'Unknown')[:50]}...")
+                except Exception as e:
+                    print(f"  ⚠️ Date parsing error for topic {topic.get('id')}: {e}")
+        return filtered_topics
+    
     def scrape_individual_topic(self, topic_id, topic_title):
         """Scrape individual topic as separate JSON (TA REQUIREMENT)"""
         print(f"📖 Scraping topic {topic_id}: {topic_title[:50]}...")
         
         # Check if already exists to avoid re-scraping
-        filename = f"discourse_topic_{topic_id}.json"
-        filepath = os.path.join(settings.RAW_DATA_PATH, filename)
-        
-        if os.path.exists(filepath):
+        stored_topic = self.load_topic(topic_id)
+        if stored_topic is not None:
             print(f"⏭️ Skipping topic {topic_id} (already exists)")
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return stored_topic
         
         url = f"{self.base_url}/t/{topic_id}.json"
         
@@ -169,50 +189,10 @@ class DiscourseScraperFixed:
                 
                 self.update_cookies_from_response(response)
                 
-                # Process posts and clean HTML content
-                posts = topic_data.get('post_stream', {}).get('posts', [])
-                processed_posts = []
+                processed_topic = self.process_topic_data(topic_id, topic_data)
+                self.save_topic(processed_topic)
                 
-                for post in posts:
-                    raw_content = post.get('raw', '')
-                    cooked_content = post.get('cooked', '')
-                    cleaned_text = self.clean_html_content(cooked_content)
-                    
-                    processed_post = {
-                        'post_number': post.get('post_number', 1),
-                        'username': post.get('username', 'unknown'),
-                        'created_at': post.get('created_at', ''),
-                        'updated_at': post.get('updated_at', ''),
-                        'raw_content': raw_content,
-                        'cooked_content': cooked_content,
-                        'cleaned_text': cleaned_text,
-                        'reply_count': post.get('reply_count', 0),
-                        'like_count': post.get('actions_summary', [{}])[0].get('count', 0) if post.get('actions_summary') else 0,
-                        'trust_level': post.get('trust_level', 0)
-                    }
-                    processed_posts.append(processed_post)
-                
-                processed_topic = {
-                    'id': topic_data.get('id'),
-                    'title': topic_data.get('title', ''),
-                    'slug': topic_data.get('slug', ''),
-                    'created_at': topic_data.get('created_at', ''),
-                    'last_posted_at': topic_data.get('last_posted_at', ''),
-                    'posts_count': topic_data.get('posts_count', 0),
-                    'reply_count': topic_data.get('reply_count', 0),
-                    'like_count': topic_data.get('like_count', 0),
-                    'views': topic_data.get('views', 0),
-                    'category_id': topic_data.get('category_id'),
-                    'url': f"{self.base_url}/t/{topic_id}",
-                    'posts': processed_posts,
-                    'scraped_at': datetime.now().isoformat(),
-                    'total_posts_scraped': len(processed_posts)
-                }
-                
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(processed_topic, f, indent=2, ensure_ascii=False)
-                
-                print(f"✅ Saved topic {topic_id} with {len(processed_posts)} posts")
+                print(f"✅ Saved topic {topic_id} with {len(processed_topic['posts'])} posts")
                 return processed_topic
                 
             else:
@@ -223,64 +203,83 @@ class DiscourseScraperFixed:
             print(f"❌ Error scraping topic {topic_id}: {e}")
             return None
     
-    def clean_html_content(self, html_content):
-        """Clean HTML content to extract readable text"""
-        if not html_content:
-            return ""
-        
-        try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            text = soup.get_text()
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            cleaned_text = ' '.join(chunk for chunk in chunks if chunk)
-            
-            return cleaned_text
-        except Exception as e:
-            print(f"⚠️ HTML cleaning error: {e}")
-            return html_content
-    
-    def scrape_all_discourse_data(self):
-        """Complete discourse scraping workflow following TA method"""
-        print("🚀 Starting comprehensive Discourse scraping (TA Method)...")
-        
-        os.makedirs(settings.RAW_DATA_PATH, exist_ok=True)
+    def process_topic_data(self, topic_id, topic_data):
+        """Turn a /t/<id>.json payload into the stored topic format"""
+        # Process posts and clean HTML content
+        posts = topic_data.get('post_stream', {}).get('posts', [])
+        processed_posts = []
+        cleaned_texts = clean_html_batch(post.get('cooked', '') for post in posts)
         
-        # Get all relevant topics
-        topics = self.get_all_topics_with_pagination()
+        for post, cleaned_text in zip(posts, cleaned_texts):
+            raw_content = post.get('raw', '')
+            cooked_content = post.get('cooked', '')
         
-        if not topics:
-            print("❌ No topics found in the specified date range")
-            return
-        
-        print(f"📊 Found {len(topics)} topics to scrape")
-        
-        # Scrape each topic individually
-        scraped_topics = []
-        failed_topics = []
+            processed_post = {
+                'id': post.get('id'),
+                'post_number': post.get('post_number', 1),
+                'username': post.get('username', 'unknown'),
+                'created_at': post.get('created_at', ''),
+                'updated_at': post.get('updated_at', ''),
+                'raw_content': raw_content,
+                'cooked_content': cooked_content,
+                'cleaned_text': cleaned_text,
+                'reply_count': post.get('reply_count', 0),
+                'like_count': post.get('actions_summary', [{}])[0].get('count', 0) if post.get('actions_summary') else 0,
+                'trust_level': post.get('trust_level', 0)
+            }
+            processed_posts.append(processed_post)
         
-        for i, topic in enumerate(topics):
-            topic_id = topic.get('id')
-            topic_title = topic.get('title', 'Unknown')
-            
-            print(f"\n📖 Processing topic {i+1}/{len(topics)}: {topic_id}")
-            
-            topic_data = self.scrape_individual_topic(topic_id, topic_title)
-            if topic_data:
-                scraped_topics.append(topic_data)
-            else:
-                failed_topics.append(topic_id)
-            
-            time.sleep(2)  # Rate limiting
-            
-            if (i + 1) % 10 == 0:
-                print(f"📊 Progress: {i+1}/{len(topics)} topics processed")
+        processed_topic = {
+            'id': topic_data.get('id'),
+            'title': topic_data.get('title', ''),
+            'slug': topic_data.get('slug', ''),
+            'created_at': topic_data.get('created_at', ''),
+            'last_posted_at': topic_data.get('last_posted_at', ''),
+            'posts_count': topic_data.get('posts_count', 0),
+            'reply_count': topic_data.get('reply_count', 0),
+            'like_count': topic_data.get('like_count', 0),
+            'views': topic_data.get('views', 0),
+            'category_id': topic_data.get('category_id'),
+            'url': f"{self.base_url}/t/{topic_id}",
+            'posts': processed_posts,
+            'scraped_at': datetime.now().isoformat(),
+            'total_posts_scraped': len(processed_posts)
+        }
         
-        # Save comprehensive summary
+        return processed_topic
+    
+    @property
+    def store(self):
+        if self.corpus_store is None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self.corpus_store = CorpusStore(corpus_path_for(self.output_dir))
+        return self.corpus_store
+    
+    def save_topic(self, processed_topic):
+        """Save a processed topic to the corpus store (and discourse_topic_<id>.json if SCRAPER_WRITE_JSON)"""
+        self.store.put_topic(processed_topic)
+        if getattr(settings, 'SCRAPER_WRITE_JSON', False):
+            filepath = os.path.join(self.output_dir, f"discourse_topic_{processed_topic['id']}.json")
+            atomic_write_json(filepath, processed_topic, indent=None)
+        return self.store.path
+    
+    def load_topic(self, topic_id):
+        """The saved copy of a topic: the corpus store's, else a legacy JSON file; None if never saved"""
+        return self.store.get_topic(topic_id) or read_topic_file(self.output_dir, topic_id)
+    
+    def close(self):
+        """Release the HTML cleaning pool shared by the topics of a scrape, and the store we opened"""
+        shutdown_pool()
+        if self.owns_corpus_store and self.corpus_store is not None:
+            self.corpus_store.close()
+            self.corpus_store = None
+    
+    def clean_html_content(self, html_content):
+        """Clean HTML content to extract readable text"""
+        return html_to_text(html_content)
+    
+    def save_summary(self, topics, scraped_topics, failed_topics):
+        """Save comprehensive summary of a scrape run"""
         summary = {
             'scraping_metadata': {
                 'total_topics_found': len(topics),
@@ -304,14 +303,56 @@ class DiscourseScraperFixed:
             ]
         }
         
-        summary_path = os.path.join(settings.RAW_DATA_PATH, 'discourse_summary.json')
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, indent=2, ensure_ascii=False)
+        summary_path = os.path.join(self.output_dir, 'discourse_summary.json')
+        atomic_write_json(summary_path, summary)
+        
+        return summary_path
+    
+    def scrape_all_discourse_data(self):
+        """Complete discourse scraping workflow following TA method"""
+        print("🚀 Starting comprehensive Discourse scraping (TA Method)...")
+        
+        os.makedirs(self.output_dir, exist_ok=True)
+        
+        # Get all relevant topics
+        topics = self.get_all_topics_with_pagination()
+        
+        if not topics:
+            print("❌ No topics found in the specified date range")
+            return
+        
+        print(f"📊 Found {len(topics)} topics to scrape")
+        
+        # Scrape each topic individually
+        scraped_topics = []
+        failed_topics = []
+        
+        try:
+            for i, topic in enumerate(topics):
+                topic_id = topic.get('id')
+                topic_title = topic.get('title', 'Unknown')
+                
+                print(f"\n📖 Processing topic {i+1}/{len(topics)}: {topic_id}")
+                
+                topic_data = self.scrape_individual_topic(topic_id, topic_title)
+                if topic_data:
+                    scraped_topics.append(topic_data)
+                else:
+                    failed_topics.append(topic_id)
+                
+                time.sleep(2)  # Rate limiting
+                
+                if (i + 1) % 10 == 0:
+                    print(f"📊 Progress: {i+1}/{len(topics)} topics processed")
+        finally:
+            self.close()
+        
+        self.save_summary(topics, scraped_topics, failed_topics)
         
         print(f"\n🎉 Discourse scraping completed!")
         print(f"📊 Successfully scraped: {len(scraped_topics)} topics")
         print(f"📊 Failed topics: {len(failed_topics)}")
-        print(f"📁 Files saved in: {settings.RAW_DATA_PATH}")
+        print(f"📁 Files saved in: {self.output_dir}")
         
         return scraped_topics
 
@@ -319,7 +360,7 @@ if __name__ == "__main__":
     print("🚀 Starting Final Discourse Scraper...")
     print("✅ Using fresh cookies from browser")
     print("🔧 No compression handling - direct JSON parsing")
-    print("📅 Date range: Jan 1 - Apr 14, 2025")
     
     scraper = DiscourseScraperFixed()
+    print(f"📅 Category {scraper.category_id}, {scraper.start_date.date()} - {scraper.end_date.date()}")
     scraper.scrape_all_discourse_data()
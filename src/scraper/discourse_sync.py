@@ -0,0 +1,198 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import argparse
+import json
+from datetime import datetime
+from config.settings import settings
+from src.scraper.discourse_scraper_final import DiscourseScraperFixed
+from src.utils.fileio import atomic_write_json
+
+# Discourse accepts up to this many post_ids[] per /t/<id>/posts.json request
+POST_ID_BATCH_SIZE = 20
+
+
+class PostFetchError(RuntimeError):
+    """A batch of posts could not be fetched, so the topic must not be saved as up to date"""
+
+
+class IncrementalDiscourseSync:
+    """Refresh only the discourse topics that changed since the last scrape.
+
+    A topic is considered changed when the category listing reports a
+    different `last_posted_at` or `posts_count` than the copy in
+    the corpus store. Changed topics are refetched with
+    If-None-Match / If-Modified-Since, and only posts whose ids are not
+    stored yet are requested through /t/<id>/posts.json. A topic is saved
+    (with its new counters and validators) only when every post came in,
+    otherwise the next sync tries it again.
+    """
+
+    def __init__(self, scraper=None):
+        self.scraper = scraper or DiscourseScraperFixed()
+        self.state_path = os.path.join(self.scraper.output_dir, 'discourse_sync_state.json')
+        self.state = self.load_state()
+        self.pending_validators = {}
+
+    def load_state(self):
+        """Load per-topic ETag / Last-Modified validators"""
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'topics': {}}
+
+    def save_state(self):
+        self.state['synced_at'] = datetime.now().isoformat()
+        atomic_write_json(self.state_path, self.state)
+
+    def load_stored_topic(self, topic_id):
+        return self.scraper.load_topic(topic_id)
+
+    def topic_changed(self, listed_topic, stored_topic):
+        """Compare the listing entry against what we stored last time"""
+        if stored_topic is None:
+            return True
+        if listed_topic.get('last_posted_at') != stored_topic.get('last_posted_at'):
+            return True
+        return int(listed_topic.get('posts_count') or 0) != int(stored_topic.get('posts_count') or 0)
+
+    def fetch_topic_conditionally(self, topic_id):
+        """GET /t/<id>.json with stored validators; returns None on 304 or failure"""
+        validators = self.state['topics'].get(str(topic_id), {})
+        headers = dict(self.scraper.headers)
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+        response = self.scraper.session.get(
+            f"{self.scraper.base_url}/t/{topic_id}.json",
+            cookies=self.scraper.cookies,
+            headers=headers,
+            timeout=30
+        )
+
+        if response.status_code == 304:
+            print(f"⏭️ Topic {topic_id} not modified (304)")
+            return None
+        if response.status_code != 200:
+            print(f"❌ Failed to fetch topic {topic_id}: {response.status_code}")
+            return None
+
+        self.scraper.update_cookies_from_response(response)
+        # Stored by sync_topic once the topic is saved, so a failed sync is not answered with 304 next time
+        self.pending_validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+        return self.scraper.decode_response_content(response)
+
+    def fetch_posts_by_id(self, topic_id, post_ids):
+        """Fetch specific posts of a topic in post-id batches"""
+        posts = []
+        for i in range(0, len(post_ids), POST_ID_BATCH_SIZE):
+            batch = post_ids[i:i + POST_ID_BATCH_SIZE]
+            response = self.scraper.session.get(
+                f"{self.scraper.base_url}/t/{topic_id}/posts.json",
+                cookies=self.scraper.cookies,
+                headers=self.scraper.headers,
+                params={'post_ids[]': batch},
+                timeout=30
+            )
+            data = self.scraper.decode_response_content(response) if response.status_code == 200 else None
+            if data is None:
+                raise PostFetchError(
+                    f"Failed to fetch posts {batch[0]}..{batch[-1]} of topic {topic_id}: {response.status_code}"
+                )
+            posts.extend(data.get('post_stream', {}).get('posts', []))
+        return posts
+
+    def sync_topic(self, topic_id, stored_topic):
+        """Bring one stored topic up to date; returns True if it changed"""
+        topic_data = self.fetch_topic_conditionally(topic_id)
+        if topic_data is None:
+            return False
+
+        post_stream = topic_data.get('post_stream', {})
+        inline_posts = post_stream.get('posts', [])
+        stored_posts = stored_topic.get('posts', []) if stored_topic else []
+
+        # Topics scraped before post ids were recorded are refetched in full once
+        known_ids = {post['id'] for post in stored_posts if post.get('id')}
+        if stored_posts and not known_ids:
+            stored_posts = []
+
+        have_ids = known_ids | {post.get('id') for post in inline_posts}
+        missing_ids = [post_id for post_id in post_stream.get('stream', []) if post_id not in have_ids]
+        new_posts = inline_posts + self.fetch_posts_by_id(topic_id, missing_ids)
+
+        topic_data['post_stream'] = {'posts': new_posts}
+        processed_topic = self.scraper.process_topic_data(topic_id, topic_data)
+
+        # Fresh copies replace stored posts with the same id; old ones are kept
+        merged = {post['id']: post for post in stored_posts if post.get('id')}
+        merged.update({post['id']: post for post in processed_topic['posts']})
+        processed_topic['posts'] = sorted(merged.values(), key=lambda post: int(post.get('post_number') or 0))
+        processed_topic['total_posts_scraped'] = len(processed_topic['posts'])
+
+        self.scraper.save_topic(processed_topic)
+        self.state['topics'][str(topic_id)] = self.pending_validators
+        print(f"✅ Synced topic {topic_id}: {len(missing_ids)} posts fetched by id, "
+              f"{processed_topic['total_posts_scraped']} stored")
+        return True
+
+    def sync(self, topics=None):
+        """Sync every listed topic that changed; returns the changed topic ids"""
+        print("🔄 Starting incremental Discourse sync...")
+        os.makedirs(self.scraper.output_dir, exist_ok=True)
+
+        if topics is None:
+            topics = self.scraper.get_all_topics_with_pagination()
+
+        changed_ids = []
+        try:
+            for topic in topics:
+                topic_id = topic.get('id')
+                stored_topic = self.load_stored_topic(topic_id)
+                if not self.topic_changed(topic, stored_topic):
+                    continue
+                try:
+                    if self.sync_topic(topic_id, stored_topic):
+                        changed_ids.append(topic_id)
+                except Exception as e:
+                    print(f"❌ Error syncing topic {topic_id}: {e}")
+        finally:
+            self.scraper.close()
+
+        self.save_state()
+        print(f"🎉 Incremental sync finished: {len(changed_ids)}/{len(topics)} topics changed")
+        return changed_ids
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental Discourse sync")
+    parser.add_argument('--embed', action='store_true', help="Re-embed the changed topics afterwards")
+    parser.add_argument('--rebuild-index', action='store_true',
+                        help="With --embed, also rebuild a pipeline index in INDEX_DIR from the raw files")
+    args = parser.parse_args()
+
+    sync = IncrementalDiscourseSync()
+    changed = sync.sync()
+
+    if args.embed and changed:
+        from src.models.shared_index import shadows_npz
+        from src.models.vector_store_complete import ComprehensiveVectorStore
+        vector_store = ComprehensiveVectorStore(raw_dir=sync.scraper.output_dir)
+        vector_store.update_topic_embeddings(changed)
+
+        # The update only reaches the npz archive; a pipeline index is served in its place
+        index_dir = str(getattr(settings, 'INDEX_DIR', ''))
+        if shadows_npz(index_dir, vector_store.embeddings_file):
+            if args.rebuild_index:
+                from src.models.ingest_pipeline import IngestPipeline
+                IngestPipeline(index_dir=index_dir, vector_store=vector_store, raw_dir=sync.scraper.output_dir).run()
+            else:
+                print(f"⚠️ {index_dir} holds a pipeline index, which is served instead of the updated archive; "
+                      f"rerun with --rebuild-index or run src/models/ingest_pipeline.py")
@@ -0,0 +1,198 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import glob
+import hashlib
+import json
+import threading
+from datetime import datetime
+from email.utils import format_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from config.settings import settings
+
+
+def load_recorded_topics(raw_dir=None, limit=None):
+    """Load recorded discourse_topic_*.json files, oldest first"""
+    raw_dir = raw_dir or settings.RAW_DATA_PATH
+    topics = []
+    for file_path in glob.glob(os.path.join(raw_dir, 'discourse_topic_*.json')):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            topics.append(json.load(f))
+    topics.sort(key=lambda topic: topic.get('created_at', ''))
+    return topics[:limit] if limit else topics
+
+
+def to_discourse_post(topic, i, post):
+    """Rebuild a Discourse post object from a recorded post"""
+    return {
+        'id': post.get('id') or topic['id'] * 1000 + i + 1,
+        'post_number': int(post.get('post_number', i + 1)),
+        'username': post.get('username', 'unknown'),
+        'created_at': post.get('created_at', ''),
+        'updated_at': post.get('updated_at', ''),
+        'raw': post.get('raw_content', ''),
+        'cooked': post.get('cooked_content', ''),
+        'reply_count': int(post.get('reply_count', 0)),
+        'trust_level': int(post.get('trust_level', 0)),
+        'actions_summary': [{'id': 2, 'count': int(post.get('like_count', 0))}]
+    }
+
+
+def to_discourse_payload(topic, posts_per_page=None):
+    """Rebuild a /t/<id>.json style payload from a recorded topic"""
+    posts = [to_discourse_post(topic, i, post) for i, post in enumerate(topic.get('posts', []))]
+    payload = {key: value for key, value in topic.items() if key not in ('posts', 'url', 'scraped_at', 'total_posts_scraped')}
+    payload['post_stream'] = {
+        'posts': posts[:posts_per_page] if posts_per_page else posts,
+        'stream': [post['id'] for post in posts]
+    }
+    return payload
+
+
+class FakeDiscourseServer:
+    """Local HTTP server answering the Discourse endpoints the scrapers use.
+
+    Serves the category listing (30 topics per page), /t/<id>.json and
+    /t/<id>/posts.json from recorded topics, with ETag / Last-Modified
+    validators. `rate_limit_first` makes the first request for each listed
+    path answer 429 with a Retry-After header, to exercise backoff.
+    `posts_per_page` mimics Discourse only inlining the first posts.
+    """
+
+    def __init__(self, topics, category_id=34, page_size=30, rate_limit_first=(), retry_after='0',
+                 posts_per_page=None):
+        self.topics = {topic['id']: topic for topic in topics}
+        self.listing = sorted(topics, key=lambda topic: topic.get('created_at', ''))
+        self.category_id = category_id
+        self.page_size = page_size
+        self.rate_limit_first = set(rate_limit_first)
+        self.retry_after = retry_after
+        self.posts_per_page = posts_per_page
+        self.request_log = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle(self, path, query, headers):
+        """Return (status, headers, body) for a request"""
+        if path in self.rate_limit_first:
+            self.rate_limit_first.discard(path)
+            return 429, {'Retry-After': self.retry_after}, {'errors': ['rate limited']}
+
+        if path == f"/c/courses/tds-kb/{self.category_id}.json":
+            page = int(query.get('page', ['0'])[0])
+            page_topics = self.listing[page * self.page_size:(page + 1) * self.page_size]
+            summaries = [
+                {key: topic.get(key) for key in ('id', 'title', 'slug', 'created_at', 'last_posted_at', 'posts_count')}
+                for topic in page_topics
+            ]
+            return 200, {}, {'topic_list': {'topics': summaries}}
+
+        if path.startswith('/t/') and path.endswith('/posts.json'):
+            topic = self._topic_from_path(path, '/posts.json')
+            if topic is not None:
+                wanted = {int(post_id) for post_id in query.get('post_ids[]', [])}
+                posts = [
+                    post for post in to_discourse_payload(topic)['post_stream']['posts']
+                    if post['id'] in wanted
+                ]
+                return 200, {}, {'post_stream': {'posts': posts}}
+
+        elif path.startswith('/t/') and path.endswith('.json'):
+            topic = self._topic_from_path(path, '.json')
+            if topic is not None:
+                payload = to_discourse_payload(topic, self.posts_per_page)
+                validators = self.validators(topic)
+                if headers.get('If-None-Match') == validators['ETag'] or \
+                        headers.get('If-Modified-Since') == validators['Last-Modified']:
+                    return 304, validators, None
+                return 200, validators, payload
+
+        return 404, {}, {'errors': ['not found']}
+
+    def _topic_from_path(self, path, suffix):
+        try:
+            return self.topics.get(int(path[len('/t/'):-len(suffix)]))
+        except ValueError:
+            return None
+
+    def validators(self, topic):
+        """ETag and Last-Modified headers for a topic's current state"""
+        body = json.dumps(to_discourse_payload(topic), sort_keys=True).encode('utf-8')
+        last_posted = topic.get('last_posted_at') or topic.get('created_at') or '1970-01-01T00:00:00Z'
+        return {
+            'ETag': '"' + hashlib.sha1(body).hexdigest() + '"',
+            'Last-Modified': format_datetime(datetime.fromisoformat(last_posted.replace('Z', '+00:00')), usegmt=True)
+        }
+
+    def add_post(self, topic_id, post):
+        """Append a reply to a served topic, as if a student just posted"""
+        topic = self.topics[topic_id]
+        topic['posts'].append(post)
+        topic['posts_count'] = len(topic['posts'])
+        topic['last_posted_at'] = post.get('created_at', topic.get('last_posted_at'))
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                with server._lock:
+                    server.request_log.append(parsed.path)
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    status, extra_headers, body = server.handle(parsed.path, parse_qs(parsed.query), self.headers)
+                    data = json.dumps(body).encode('utf-8') if body is not None else b''
+                    self.send_response(status)
+                    if status != 304:
+                        self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    for key, value in extra_headers.items():
+                        self.send_header(key, value)
+                    self.end_headers()
+                    self.wfile.write(data)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    fake = FakeDiscourseServer(load_recorded_topics()).start()
+    print(f"Fake Discourse serving {len(fake.topics)} recorded topics at {fake.url}")
+    try:
+        fake._thread.join()
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,209 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import json
+import time
+from datetime import datetime
+from src.scraper.discourse_scraper_final import DiscourseScraperFixed
+
+
+class ScrapeJournal:
+    """Append-only JSONL log of a scrape job.
+
+    Every record is flushed and fsync'd before the next step starts, so
+    after a crash replay() reconstructs exactly which listing pages and
+    topics were finished. A torn final line is cut off when the journal is
+    opened, so new records never get glued onto it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.repair()
+
+    def repair(self):
+        """Truncate a newline-less (torn) tail back to the last complete record"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if not data or data.endswith(b'\n'):
+                return
+            f.truncate(data.rfind(b'\n') + 1)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, event, **fields):
+        record = {'event': event, 'at': datetime.now().isoformat(), **fields}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def records(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn write from a crash; later records are still valid
+                    print(f"WARNING: Skipping corrupt journal line in {self.path}")
+                    continue
+
+    def replay(self):
+        """Rebuild job state from the log"""
+        state = {
+            'started': False,
+            'next_page': 0,
+            'listing_complete': False,
+            'topics': [],
+            'topic_status': {},
+            'finished': False
+        }
+        for record in self.records():
+            event = record.get('event')
+            if event == 'job_started':
+                state['started'] = True
+            elif event == 'page_done':
+                state['next_page'] = record['page'] + 1
+                state['topics'].extend(record.get('topics', []))
+            elif event == 'listing_done':
+                state['listing_complete'] = True
+            elif event == 'topic_done':
+                state['topic_status'][record['topic_id']] = 'done'
+            elif event == 'topic_failed':
+                state['topic_status'][record['topic_id']] = 'failed'
+            elif event == 'job_finished':
+                state['finished'] = True
+        return state
+
+    def archive(self):
+        """Move a finished journal aside so the next run starts a new job"""
+        if os.path.exists(self.path):
+            stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            os.replace(self.path, self.path.replace('.jsonl', f'.{stamp}.jsonl'))
+
+
+class JournaledDiscourseScrape:
+    """Resumable version of scrape_all_discourse_data.
+
+    Page cursors and per-topic results go to discourse_scrape_journal.jsonl
+    as they happen; rerunning after a crash or a 403 continues from the
+    last finished page and skips topics already done. run() drives a
+    DiscourseScraperFixed one request at a time; AsyncDiscourseScraper
+    drives the same start / record_page / record_topic / finish steps
+    concurrently, so either can resume the other's job.
+    """
+
+    def __init__(self, scraper=None, journal_path=None, retry_failed=True, delay=2):
+        self.scraper = scraper or DiscourseScraperFixed()
+        self.journal = ScrapeJournal(
+            journal_path or os.path.join(self.scraper.output_dir, 'discourse_scrape_journal.jsonl')
+        )
+        self.retry_failed = retry_failed
+        self.delay = delay
+
+    def start(self):
+        """Replayed state to continue from; a finished job is archived and a new one started"""
+        os.makedirs(self.scraper.output_dir, exist_ok=True)
+
+        state = self.journal.replay()
+        if state['finished']:
+            self.journal.archive()
+            state = self.journal.replay()
+
+        if state['started']:
+            done = sum(1 for status in state['topic_status'].values() if status == 'done')
+            print(f"🔁 Resuming scrape job: page cursor {state['next_page']}, {done} topics done")
+        else:
+            self.journal.append('job_started', category_id=self.scraper.category_id)
+        return state
+
+    def record_page(self, state, page, topics):
+        """Journal one listing page; returns True once the listing is complete"""
+        filtered = [
+            {'id': topic.get('id'), 'title': topic.get('title', 'Unknown')}
+            for topic in self.scraper.filter_topics_by_date(topics)
+        ]
+        self.journal.append('page_done', page=page, topics=filtered)
+        state['next_page'] = page + 1
+        state['topics'].extend(filtered)
+
+        if len(topics) < 30:
+            self.journal.append('listing_done')
+            state['listing_complete'] = True
+        return state['listing_complete']
+
+    def list_topics(self, state):
+        """Continue the category listing from the journaled page cursor"""
+        while not state['listing_complete']:
+            page = state['next_page']
+            topics = self.scraper.fetch_topic_page(page)
+            if topics is None:
+                print(f"❌ Listing stopped at page {page}; rerun to resume from here")
+                return False
+            if not self.record_page(state, page, topics):
+                time.sleep(self.delay)  # Rate limiting
+        return True
+
+    def pending_topics(self, state):
+        """Listed topics this run still has to scrape"""
+        return [
+            topic for topic in state['topics']
+            if state['topic_status'].get(topic['id']) != 'done'
+            and (self.retry_failed or state['topic_status'].get(topic['id']) != 'failed')
+        ]
+
+    def record_topic(self, state, topic_id, topic_data):
+        if topic_data:
+            self.journal.append('topic_done', topic_id=topic_id)
+            state['topic_status'][topic_id] = 'done'
+        else:
+            self.journal.append('topic_failed', topic_id=topic_id)
+            state['topic_status'][topic_id] = 'failed'
+
+    def finish(self, state):
+        """Write the summary of every topic the job finished, not just this run's; returns those topics"""
+        scraped_topics = []
+        failed_topics = []
+        try:
+            for topic in state['topics']:
+                saved = self.scraper.load_topic(topic['id']) \
+                    if state['topic_status'].get(topic['id']) == 'done' else None
+                if saved is not None:
+                    scraped_topics.append(saved)
+                else:
+                    failed_topics.append(topic['id'])
+        finally:
+            self.scraper.close()
+
+        self.scraper.save_summary(state['topics'], scraped_topics, failed_topics)
+        self.journal.append('job_finished', scraped=len(scraped_topics), failed=len(failed_topics))
+        state['finished'] = True
+
+        print(f"\n🎉 Journaled scrape finished: {len(scraped_topics)} scraped, {len(failed_topics)} failed")
+        return scraped_topics
+
+    def run(self):
+        """Run or resume the scrape job; returns the replayed final state"""
+        state = self.start()
+        if not self.list_topics(state):
+            return state
+
+        try:
+            for topic in self.pending_topics(state):
+                topic_data = self.scraper.scrape_individual_topic(topic['id'], topic['title'])
+                self.record_topic(state, topic['id'], topic_data)
+                time.sleep(self.delay)  # Rate limiting
+        finally:
+            self.scraper.close()
+
+        self.finish(state)
+        return state
+
+
+if __name__ == "__main__":
+    JournaledDiscourseScrape().run()
@@ -0,0 +1,224 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import re
+from config.settings import settings
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+FENCE_RE = re.compile(r'^\s*(`{3,}|~{3,})')
+TOKEN_RE = re.compile(r'\S+')
+
+
+def iter_lines(text):
+    """Yield (line, start_offset) pairs without splitting the whole text up front"""
+    if isinstance(text, str):
+        start = 0
+        length = len(text)
+        while start < length:
+            end = text.find('\n', start)
+            if end == -1:
+                yield text[start:], start
+                return
+            yield text[start:end + 1], start
+            start = end + 1
+    else:
+        # File-like object or any iterable of lines
+        offset = 0
+        for line in text:
+            yield line, offset
+            offset += len(line)
+
+
+def count_tokens(text):
+    """Approximate token count (whitespace separated words)"""
+    return sum(1 for _ in TOKEN_RE.finditer(text))
+
+
+class StructureAwareChunker:
+    """Split markdown / discourse text on headings and code fences.
+
+    Chunks are yielded one at a time as dicts with the chunk text, its
+    character offsets in the source document and the heading path it
+    belongs to. When a section is split for size, the next chunk repeats
+    the last `overlap_tokens` words of the previous one (never code, and
+    never past max_tokens), like the old fixed-size 50-word overlap. A
+    heading is kept with the first chunk of its section.
+    """
+
+    def __init__(self, target_tokens=None, max_tokens=None, min_chars=50, overlap_tokens=None):
+        self.target_tokens = target_tokens or settings.CHUNK_TARGET_TOKENS
+        self.max_tokens = max_tokens or settings.CHUNK_MAX_TOKENS
+        self.min_chars = min_chars
+        self.overlap_tokens = settings.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+
+    def iter_blocks(self, text):
+        """Yield structural blocks: headings, code fences and paragraphs"""
+        headings = []
+        block = []
+        block_start = 0
+        block_kind = 'text'
+        fence = None
+
+        def flush(kind):
+            if block:
+                return {
+                    'kind': kind,
+                    'text': ''.join(block),
+                    'start': block_start,
+                    'heading_path': list(headings)
+                }
+            return None
+
+        for line, offset in iter_lines(text):
+            stripped = line.strip()
+
+            if fence:
+                block.append(line)
+                if stripped.startswith(fence) and stripped.strip(fence[0]) == '':
+                    yield flush('code')
+                    block, fence, block_kind = [], None, 'text'
+                continue
+
+            fence_match = FENCE_RE.match(line)
+            if fence_match:
+                pending = flush(block_kind)
+                if pending:
+                    yield pending
+                block, block_start, block_kind = [line], offset, 'code'
+                fence = fence_match.group(1)
+                continue
+
+            heading_match = HEADING_RE.match(line)
+            if heading_match:
+                pending = flush(block_kind)
+                if pending:
+                    yield pending
+                level = len(heading_match.group(1))
+                headings[:] = headings[:level - 1] + [heading_match.group(2)]
+                block, block_start, block_kind = [line], offset, 'heading'
+                yield flush('heading')
+                block = []
+                continue
+
+            if not stripped:
+                pending = flush(block_kind)
+                if pending:
+                    yield pending
+                block, block_kind = [], 'text'
+                continue
+
+            if not block:
+                block_start = offset
+            block.append(line)
+
+        # Unterminated code fences are emitted as-is
+        pending = flush(block_kind)
+        if pending:
+            yield pending
+
+    def split_oversized(self, block):
+        """Split a block larger than max_tokens on word (or line, for code) boundaries.
+
+        Text is cut at target_tokens, leaving room for the overlap the next
+        piece carries; code gets no overlap and is cut at max_tokens.
+        """
+        text = block['text']
+        if block['kind'] == 'code':
+            pieces = iter_lines(text)
+            limit = self.max_tokens
+        else:
+            pieces = ((m.group(0), m.start()) for m in re.finditer(r'\S+\s*', text))
+            limit = max(1, min(self.target_tokens, self.max_tokens - self.overlap_tokens))
+
+        part = []
+        part_start = 0
+        part_tokens = 0
+        for piece, offset in pieces:
+            piece_tokens = count_tokens(piece)
+            if part and part_tokens + piece_tokens > limit:
+                yield dict(block, text=''.join(part), start=block['start'] + part_start)
+                part, part_tokens = [], 0
+            if not part:
+                part_start = offset
+            part.append(piece)
+            part_tokens += piece_tokens
+        if part:
+            yield dict(block, text=''.join(part), start=block['start'] + part_start)
+
+    def overlap_tail(self, part):
+        """Last overlap_tokens words of a text part as a part of their own, or None"""
+        if self.overlap_tokens <= 0 or part['kind'] != 'text':
+            return None
+        words = list(re.finditer(r'\S+\s*', part['text']))
+        if len(words) <= 1:
+            return None
+        first = words[max(1, len(words) - self.overlap_tokens)]
+        return dict(part, text=part['text'][first.start():], start=part['start'] + first.start())
+
+    def iter_chunks(self, text):
+        """Yield chunks of roughly target_tokens that never straddle a section"""
+        current = []
+        current_tokens = 0
+        current_path = None
+        overlap = None
+
+        def emit():
+            chunk_text = '\n\n'.join(b['text'].strip('\n') for b in current)
+            start = current[0]['start']
+            end = current[-1]['start'] + len(current[-1]['text'])
+            content = chunk_text.strip()
+            if len(content) > self.min_chars:
+                return {
+                    'content': content,
+                    'char_start': start,
+                    'char_end': end,
+                    'heading_path': current[0]['heading_path'],
+                    'tokens': current_tokens
+                }
+            return None
+
+        for block in self.iter_blocks(text):
+            block_tokens = count_tokens(block['text'])
+            parts = [block]
+            heading_only = current and all(b['kind'] == 'heading' for b in current)
+            if block_tokens > self.max_tokens or (heading_only and block['kind'] != 'heading'
+                                                  and current_tokens + block_tokens > self.max_tokens):
+                parts = self.split_oversized(block)
+
+            for part in parts:
+                part_tokens = count_tokens(part['text']) if part is not block else block_tokens
+                new_section = part['kind'] == 'heading' or part['heading_path'] != current_path
+                too_big = current_tokens + part_tokens > self.target_tokens
+                # A lone heading stays with the first part of its section
+                if too_big and all(b['kind'] == 'heading' for b in current):
+                    too_big = current_tokens + part_tokens > self.max_tokens
+                if current and (new_section or too_big):
+                    chunk = emit()
+                    if chunk:
+                        yield chunk
+                    # A size split inside a section carries some context over
+                    overlap = None if new_section else self.overlap_tail(current[-1])
+                    current, current_tokens = [], 0
+
+                if not current:
+                    current_path = part['heading_path']
+                    if overlap is not None:
+                        overlap_tokens = count_tokens(overlap['text'])
+                        if overlap_tokens + part_tokens <= self.max_tokens:
+                            current.append(overlap)
+                            current_tokens += overlap_tokens
+                        overlap = None
+                current.append(part)
+                current_tokens += part_tokens
+
+        if current:
+            chunk = emit()
+            if chunk:
+                yield chunk
+
+
+def chunk_text(text, target_tokens=None, max_tokens=None):
+    """Convenience wrapper returning a generator of structure-aware chunks"""
+    return StructureAwareChunker(target_tokens, max_tokens).iter_chunks(text)
@@ -0,0 +1,313 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import argparse
+import glob
+import hashlib
+import json
+import sqlite3
+import zlib
+from config.settings import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS texts (
+    id INTEGER PRIMARY KEY,
+    sha1 BLOB NOT NULL UNIQUE,
+    body BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS topics (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    last_posted_at TEXT,
+    posts_count INTEGER,
+    meta TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS posts (
+    topic_id INTEGER NOT NULL REFERENCES topics(id) ON DELETE CASCADE,
+    post_number INTEGER NOT NULL,
+    meta TEXT NOT NULL,
+    raw_text_id INTEGER REFERENCES texts(id),
+    cooked_text_id INTEGER REFERENCES texts(id),
+    cleaned_text_id INTEGER REFERENCES texts(id),
+    PRIMARY KEY (topic_id, post_number)
+);
+"""
+
+TEXT_FIELDS = ('raw_content', 'cooked_content', 'cleaned_text')
+
+
+def corpus_path_for(raw_dir=None):
+    """Store that belongs with a scraper output directory (CORPUS_DB_PATH for the default one)"""
+    if raw_dir is None or os.path.abspath(raw_dir) == os.path.abspath(settings.RAW_DATA_PATH):
+        return str(settings.CORPUS_DB_PATH)
+    return os.path.join(str(raw_dir), 'discourse_corpus.sqlite3')
+
+
+def read_topic_file(raw_dir, topic_id):
+    """A legacy discourse_topic_<id>.json, or None if there is none"""
+    file_path = os.path.join(str(raw_dir), f"discourse_topic_{topic_id}.json")
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class CorpusStore:
+    """SQLite store for the scraped discourse corpus.
+
+    Topics keep their metadata as compact JSON; the three text variants of
+    every post (raw, cooked, cleaned) live once each in a zlib-compressed,
+    content-addressed `texts` table, so identical bodies are stored once.
+    get_topic() and iter_topics() return the same dicts as the
+    discourse_topic_<id>.json files.
+    """
+
+    def __init__(self, path=None):
+        self.path = str(path or settings.CORPUS_DB_PATH)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _put_text(self, text):
+        if not text:
+            return None
+        digest = hashlib.sha1(text.encode('utf-8')).digest()
+        row = self.conn.execute('SELECT id FROM texts WHERE sha1 = ?', (digest,)).fetchone()
+        if row:
+            return row[0]
+        cursor = self.conn.execute(
+            'INSERT INTO texts (sha1, body) VALUES (?, ?)',
+            (digest, zlib.compress(text.encode('utf-8'), 6))
+        )
+        return cursor.lastrowid
+
+    def _drop_orphans(self, text_ids):
+        """Delete the given texts unless some post still references them"""
+        text_ids = [text_id for text_id in set(text_ids) if text_id is not None]
+        for i in range(0, len(text_ids), 500):
+            batch = text_ids[i:i + 500]
+            placeholders = ','.join('?' * len(batch))
+            self.conn.execute(
+                f'DELETE FROM texts WHERE id IN ({placeholders}) AND NOT EXISTS ('
+                'SELECT 1 FROM posts WHERE raw_text_id = texts.id OR cooked_text_id = texts.id '
+                'OR cleaned_text_id = texts.id)', batch
+            )
+
+    def put_topic(self, topic):
+        """Insert or replace one topic in the stored JSON shape.
+
+        Texts only the replaced posts used are deleted in the same
+        transaction, so re-saving topics does not grow the store.
+        """
+        meta = {key: value for key, value in topic.items() if key != 'posts'}
+        with self.conn:
+            previous = self.conn.execute(
+                'SELECT raw_text_id, cooked_text_id, cleaned_text_id FROM posts WHERE topic_id = ?', (topic['id'],)
+            ).fetchall()
+            self.conn.execute('DELETE FROM posts WHERE topic_id = ?', (topic['id'],))
+            self.conn.execute(
+                'INSERT OR REPLACE INTO topics (id, title, last_posted_at, posts_count, meta) VALUES (?, ?, ?, ?, ?)',
+                (topic['id'], topic.get('title', ''), topic.get('last_posted_at', ''),
+                 int(topic.get('posts_count') or 0), json.dumps(meta, ensure_ascii=False))
+            )
+            for i, post in enumerate(topic.get('posts', [])):
+                post_meta = {key: value for key, value in post.items() if key not in TEXT_FIELDS}
+                text_ids = [self._put_text(post.get(field, '')) for field in TEXT_FIELDS]
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO posts (topic_id, post_number, meta, raw_text_id, cooked_text_id, cleaned_text_id) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (topic['id'], int(post.get('post_number') or i + 1), json.dumps(post_meta, ensure_ascii=False), *text_ids)
+                )
+            self._drop_orphans(text_id for row in previous for text_id in row)
+
+    def gc(self):
+        """Delete every text no post references (stores written before put_topic cleaned up)"""
+        with self.conn:
+            cursor = self.conn.execute(
+                'DELETE FROM texts WHERE id NOT IN (SELECT raw_text_id FROM posts WHERE raw_text_id IS NOT NULL '
+                'UNION SELECT cooked_text_id FROM posts WHERE cooked_text_id IS NOT NULL '
+                'UNION SELECT cleaned_text_id FROM posts WHERE cleaned_text_id IS NOT NULL)'
+            )
+        return cursor.rowcount
+
+    def _load_texts(self, ids):
+        ids = [text_id for text_id in set(ids) if text_id is not None]
+        texts = {}
+        # SQLite caps bound parameters, so look texts up in slices
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            placeholders = ','.join('?' * len(batch))
+            for text_id, body in self.conn.execute(f'SELECT id, body FROM texts WHERE id IN ({placeholders})', batch):
+                texts[text_id] = zlib.decompress(body).decode('utf-8')
+        return texts
+
+    def _build_topic(self, meta_json, post_rows):
+        topic = json.loads(meta_json)
+        texts = self._load_texts(text_id for row in post_rows for text_id in row[1:])
+        posts = []
+        for post_meta, *text_ids in post_rows:
+            post = json.loads(post_meta)
+            for field, text_id in zip(TEXT_FIELDS, text_ids):
+                post[field] = texts.get(text_id, '')
+            posts.append(post)
+        topic['posts'] = posts
+        return topic
+
+    def get_topic(self, topic_id):
+        """Random access by topic id; returns None if unknown"""
+        row = self.conn.execute('SELECT meta FROM topics WHERE id = ?', (topic_id,)).fetchone()
+        if row is None:
+            return None
+        post_rows = self.conn.execute(
+            'SELECT meta, raw_text_id, cooked_text_id, cleaned_text_id FROM posts '
+            'WHERE topic_id = ? ORDER BY post_number', (topic_id,)
+        ).fetchall()
+        return self._build_topic(row[0], post_rows)
+
+    def iter_topics(self, fields=TEXT_FIELDS):
+        """Sequential scan of every topic in id order, one topic in memory at a time.
+
+        `fields` limits which text variants are decompressed, e.g.
+        ('raw_content', 'cleaned_text') for embedding.
+        """
+        columns = {'raw_content': 'raw_text_id', 'cooked_content': 'cooked_text_id', 'cleaned_text': 'cleaned_text_id'}
+        joins = ' '.join(
+            f'LEFT JOIN texts t{i} ON t{i}.id = p.{columns[field]}' for i, field in enumerate(fields)
+        )
+        bodies = ''.join(f', t{i}.body' for i in range(len(fields)))
+        cursor = self.conn.execute(
+            f'SELECT topics.id, topics.meta, p.meta{bodies} FROM topics '
+            f'LEFT JOIN posts p ON p.topic_id = topics.id {joins} '
+            'ORDER BY topics.id, p.post_number'
+        )
+
+        topic = None
+        for topic_id, topic_meta, post_meta, *texts in cursor:
+            if topic is None or topic['id'] != topic_id:
+                if topic is not None:
+                    yield topic
+                topic = json.loads(topic_meta)
+                topic['posts'] = []
+            if post_meta is None:
+                continue
+            post = json.loads(post_meta)
+            for field, body in zip(fields, texts):
+                post[field] = zlib.decompress(body).decode('utf-8') if body else ''
+            topic['posts'].append(post)
+        if topic is not None:
+            yield topic
+
+    def topic_ids(self):
+        return [row[0] for row in self.conn.execute('SELECT id FROM topics ORDER BY id')]
+
+    def scraped_at(self):
+        """{topic id: scraped_at of the stored copy}, to tell which JSON files are newer"""
+        return {topic_id: json.loads(meta).get('scraped_at', '')
+                for topic_id, meta in self.conn.execute('SELECT id, meta FROM topics')}
+
+    def stats(self):
+        topics, = self.conn.execute('SELECT COUNT(*) FROM topics').fetchone()
+        posts, = self.conn.execute('SELECT COUNT(*) FROM posts').fetchone()
+        texts, text_bytes = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM texts').fetchone()
+        return {'topics': topics, 'posts': posts, 'unique_texts': texts, 'compressed_text_bytes': text_bytes}
+
+    def import_json_files(self, raw_dir=None):
+        """One-time import of existing discourse_topic_*.json files"""
+        raw_dir = raw_dir or settings.RAW_DATA_PATH
+        files = sorted(glob.glob(os.path.join(raw_dir, 'discourse_topic_*.json')))
+        imported = 0
+        failed = []
+        for file_path in files:
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    self.put_topic(json.load(f))
+                imported += 1
+            except Exception as e:
+                print(f"WARNING: Error importing {file_path}: {e}")
+                failed.append(file_path)
+        if failed:
+            print(f"WARNING: Imported {imported} of {len(files)} topic files into {self.path}, {len(failed)} failed")
+        else:
+            print(f"SUCCESS: Imported {imported} topic files into {self.path}")
+        return dict(self.stats(), imported=imported, failed=len(failed))
+
+
+def newer_topic_files(raw_dir, stored, store_mtime):
+    """{topic id: path} of the discourse_topic_*.json files to read besides the store.
+
+    A file counts when the store lacks its topic, or when it was written
+    after the store and holds a later scrape (scraped_at) than the stored
+    copy; files older than the store are skipped without being read.
+    """
+    files = {}
+    for file_path in glob.iglob(os.path.join(str(raw_dir), 'discourse_topic_*.json')):
+        topic_id = os.path.basename(file_path)[len('discourse_topic_'):-len('.json')]
+        if not topic_id.isdigit():
+            continue
+        topic_id = int(topic_id)
+        if topic_id in stored:
+            if os.path.getmtime(file_path) <= store_mtime:
+                continue
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    scraped_at = json.load(f).get('scraped_at') or ''
+            except Exception as e:
+                print(f"WARNING: Error reading {file_path}: {e}")
+                continue
+            if scraped_at <= (stored[topic_id] or ''):
+                continue
+        files[topic_id] = file_path
+    return files
+
+
+def iter_scraped_topics(raw_dir=None, corpus_db=None, fields=TEXT_FIELDS):
+    """Every scraped topic, one at a time: the corpus store's, plus legacy JSON files it lacks or that are newer"""
+    raw_dir = raw_dir or settings.RAW_DATA_PATH
+    corpus_db = str(corpus_db or corpus_path_for(raw_dir))
+    stored = {}
+    from_json = None
+    if os.path.exists(corpus_db):
+        store_mtime = max(os.path.getmtime(path) for path in (corpus_db, f"{corpus_db}-wal") if os.path.exists(path))
+        with CorpusStore(corpus_db) as store:
+            stored = store.scraped_at()
+            from_json = newer_topic_files(raw_dir, stored, store_mtime)
+            for topic in store.iter_topics(fields=fields):
+                if topic['id'] not in from_json:
+                    yield topic
+    if from_json is None:
+        from_json = newer_topic_files(raw_dir, stored, 0)
+
+    for topic_id, file_path in sorted(from_json.items()):
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                yield json.load(f)
+        except Exception as e:
+            print(f"WARNING: Error reading {file_path}: {e}")
+    if stored and from_json:
+        print(f"WARNING: Merged {len(from_json)} discourse_topic_*.json files missing from or newer than {corpus_db}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consolidated raw-corpus store")
+    parser.add_argument('--import-json', action='store_true', help="Import data/raw/discourse_topic_*.json")
+    parser.add_argument('--gc', action='store_true', help="Delete texts no post references")
+    args = parser.parse_args()
+
+    with CorpusStore() as store:
+        if args.import_json:
+            store.import_json_files()
+        if args.gc:
+            print(f"Deleted {store.gc()} unreferenced texts")
+        print(store.stats())
@@ -0,0 +1,123 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from bs4 import BeautifulSoup
+from config.settings import settings
+
+# Below this many documents a process pool costs more than it saves
+PARALLEL_THRESHOLD = 64
+
+_parser = None
+# One worker pool per process, created on the first large batch and reused
+# by every topic of a scrape until shutdown_pool()
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_parser():
+    """Pick the fastest available parser backend ("lxml" or "html.parser")"""
+    global _parser
+    if _parser is None:
+        preferred = getattr(settings, 'HTML_PARSER', 'auto')
+        if preferred == 'auto':
+            try:
+                import lxml  # noqa: F401
+                _parser = 'lxml'
+            except ImportError:
+                _parser = 'html.parser'
+        else:
+            _parser = preferred
+    return _parser
+
+
+def normalize_whitespace(text):
+    """Collapse the text the same way every scraper always has"""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+
+def _lxml_to_text(html_content):
+    """Walk the lxml tree directly, skipping the BeautifulSoup object model"""
+    import lxml.html
+    from lxml import etree
+
+    # Parse as a document so <head>/<title> text survives, as it does with html.parser,
+    # and drop <template> content, which BeautifulSoup leaves out of get_text()
+    root = lxml.html.document_fromstring(html_content)
+    etree.strip_elements(root, 'script', 'style', 'template', with_tail=False)
+    return ''.join(root.itertext())
+
+
+def html_to_text(html_content, parser=None):
+    """Clean HTML content to extract readable text"""
+    if not html_content:
+        return ""
+
+    parser = parser or get_parser()
+    # lxml reads CDATA sections and NUL bytes differently from html.parser,
+    # so those inputs stay on the BeautifulSoup path to keep output identical
+    if parser == 'lxml' and '<![CDATA[' not in html_content and '\x00' not in html_content:
+        try:
+            return normalize_whitespace(_lxml_to_text(html_content))
+        except Exception:
+            pass
+
+    try:
+        soup = BeautifulSoup(html_content, 'html.parser')
+
+        for script in soup(["script", "style"]):
+            script.decompose()
+
+        return normalize_whitespace(soup.get_text())
+    except Exception as e:
+        print(f"WARNING: HTML cleaning error: {e}")
+        return html_content
+
+
+def _html_to_text_worker(args):
+    html_content, parser = args
+    return html_to_text(html_content, parser)
+
+
+def get_pool(workers):
+    """The shared cleaning pool, (re)created only when the worker count changes"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the shared cleaning pool; the next large batch starts a new one"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool, _pool_workers = None, 0
+
+
+def clean_html_batch(html_contents, workers=None, parser=None):
+    """Clean many HTML documents, using a process pool for large batches"""
+    html_contents = list(html_contents)
+    parser = parser or get_parser()
+    workers = workers or getattr(settings, 'HTML_CLEAN_WORKERS', 0) or os.cpu_count() or 1
+
+    if workers <= 1 or len(html_contents) < PARALLEL_THRESHOLD:
+        return [html_to_text(html, parser) for html in html_contents]
+
+    chunksize = max(1, len(html_contents) // (workers * 4))
+    return list(get_pool(workers).map(
+        _html_to_text_worker,
+        ((html, parser) for html in html_contents),
+        chunksize=chunksize
+    ))
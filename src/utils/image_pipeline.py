@@ -0,0 +1,155 @@
+import base64
+import binascii
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+from config.settings import settings
+
+
+class ImageValidationError(ValueError):
+    """The uploaded image is not something we are willing to process"""
+
+
+class PreparedImage:
+    """A decoded, size-bounded RGB image plus the digest of its pixels"""
+
+    def __init__(self, image, digest, original_size):
+        self.image = image
+        self.digest = digest
+        self.original_size = original_size
+
+    def perceptual_hash(self, hash_size=None):
+        """Difference hash for the opt-in near-duplicate lookup (hash_size**2 bits)"""
+        return dhash(self.image, hash_size or settings.IMAGE_NEAR_DUPLICATE_HASH_SIZE)
+
+    def encoded(self, quality=85):
+        """JPEG bytes of the downscaled image, for providers that want raw bytes"""
+        buffer = io.BytesIO()
+        self.image.save(buffer, format='JPEG', quality=quality)
+        return buffer.getvalue()
+
+
+def pixel_digest(image):
+    """sha256 of the normalized pixels: equal only for pixel-identical images"""
+    digest = hashlib.sha256(f"{image.mode}:{image.width}x{image.height}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def decode_base64_image(image_data, max_bytes=None):
+    """Decode plain or data-URL base64, refusing payloads over max_bytes"""
+    max_bytes = max_bytes or settings.IMAGE_MAX_BYTES
+    if image_data.startswith('data:'):
+        image_data = image_data.split(',', 1)[-1]
+    # base64 expands 3 bytes to 4 characters; check before decoding anything
+    if len(image_data) * 3 // 4 > max_bytes:
+        raise ImageValidationError(f"Image is larger than {max_bytes // (1024 * 1024)} MB")
+    try:
+        return base64.b64decode(image_data, validate=True)
+    except (binascii.Error, ValueError):
+        raise ImageValidationError("Image is not valid base64")
+
+
+def dhash(image, hash_size=8):
+    """Difference hash of hash_size**2 bits: survives rescaling and recompression of screenshots.
+
+    Screenshots with the same layout and different text often hash alike,
+    so it is never the primary cache key.
+    """
+    from PIL import Image
+
+    gray = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = gray.tobytes()  # one byte per pixel, row by row
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def prepare_image(image_data, max_dimension=None, max_pixels=None):
+    """Validate, decode and downscale an uploaded image (CPU-bound; run off the event loop)"""
+    from PIL import Image, UnidentifiedImageError
+
+    max_dimension = max_dimension or settings.IMAGE_MAX_DIMENSION
+    max_pixels = max_pixels or settings.IMAGE_MAX_PIXELS
+    image_bytes = decode_base64_image(image_data)
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+    except UnidentifiedImageError:
+        raise ImageValidationError("Unsupported image format")
+    except (OSError, Image.DecompressionBombError) as e:
+        # Oversized or truncated headers fail inside open() already
+        raise ImageValidationError(f"Could not decode image: {e}")
+
+    # Header-only check before the full decode, against decompression bombs
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageValidationError(f"Image has {width}x{height} pixels, limit is {max_pixels}")
+
+    try:
+        image.draft('RGB', (max_dimension, max_dimension))  # cheap JPEG downscale while decoding
+        image = image.convert('RGB')
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ImageValidationError(f"Could not decode image: {e}")
+
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    return PreparedImage(image, pixel_digest(image), (width, height))
+
+
+class DescriptionCache:
+    """Bounded LRU of vision descriptions keyed by the pixel digest of the prepared image.
+
+    Only a pixel-identical upload (after decoding and downscaling) reuses a
+    description. With `near_duplicates` a second lookup by an exact
+    perceptual hash of `hash_size`**2 bits also reuses
+    descriptions of recompressed copies; it can conflate screenshots that
+    differ only in a few characters, hence opt-in.
+    """
+
+    def __init__(self, max_entries=None, near_duplicates=None, hash_size=None):
+        self.max_entries = max_entries or settings.IMAGE_CACHE_SIZE
+        self.near_duplicates = settings.IMAGE_NEAR_DUPLICATE_CACHE if near_duplicates is None else near_duplicates
+        self.hash_size = hash_size or settings.IMAGE_NEAR_DUPLICATE_HASH_SIZE
+        # digest -> (perceptual hash or None, description)
+        self._entries = OrderedDict()
+        # perceptual hash -> digest, only with near_duplicates
+        self._by_hash = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _perceptual_hash(self, prepared):
+        return prepared.perceptual_hash(self.hash_size) if self.near_duplicates else None
+
+    def get(self, prepared):
+        image_hash = self._perceptual_hash(prepared)
+        with self._lock:
+            key = prepared.digest if prepared.digest in self._entries else self._by_hash.get(image_hash)
+            if key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][1]
+
+    def put(self, prepared, description):
+        image_hash = self._perceptual_hash(prepared)
+        with self._lock:
+            self._entries[prepared.digest] = (image_hash, description)
+            self._entries.move_to_end(prepared.digest)
+            if image_hash is not None:
+                self._by_hash[image_hash] = prepared.digest
+            while len(self._entries) > self.max_entries:
+                _, (evicted_hash, _) = self._entries.popitem(last=False)
+                if evicted_hash is not None and evicted_hash in self._by_hash \
+                        and self._by_hash[evicted_hash] not in self._entries:
+                    del self._by_hash[evicted_hash]
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                'near_duplicates': self.near_duplicates}
@@ -0,0 +1,74 @@
+from config.settings import settings
+
+_available = None
+
+
+def ocr_available():
+    """True if pytesseract and the tesseract binary are both installed (checked once)"""
+    global _available
+    if _available is None:
+        try:
+            import pytesseract
+            pytesseract.get_tesseract_version()
+            _available = True
+        except Exception:
+            _available = False
+    return _available
+
+
+def ocr_enabled():
+    mode = str(getattr(settings, 'OCR_ENABLED', 'auto')).lower()
+    if mode in ('0', 'false', 'no', 'off'):
+        return False
+    return ocr_available()
+
+
+class OcrResult:
+    def __init__(self, text, confidence, words):
+        self.text = text
+        self.confidence = confidence
+        self.words = words
+
+    def is_confident(self, min_confidence=None, min_chars=None):
+        min_confidence = settings.OCR_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        min_chars = settings.OCR_MIN_CHARS if min_chars is None else min_chars
+        return self.confidence >= min_confidence and len(self.text) >= min_chars
+
+
+def preprocess_for_ocr(image):
+    """Grayscale, dark-on-light and large enough glyphs: what tesseract reads best"""
+    from PIL import ImageOps, ImageStat
+
+    gray = ImageOps.autocontrast(image.convert('L'))
+    # Terminal screenshots are light text on a dark background
+    if ImageStat.Stat(gray).mean[0] < 128:
+        gray = ImageOps.invert(gray)
+    if gray.width < 1000:
+        gray = gray.resize((gray.width * 2, gray.height * 2))
+    return gray
+
+
+def extract_text(image):
+    """Run tesseract locally; confidence is the character-weighted mean word confidence"""
+    import pytesseract
+
+    data = pytesseract.image_to_data(
+        preprocess_for_ocr(image), config='--psm 6', output_type=pytesseract.Output.DICT
+    )
+
+    lines = {}
+    weighted = 0.0
+    characters = 0
+    for i, word in enumerate(data['text']):
+        word = word.strip()
+        confidence = float(data['conf'][i])
+        if not word or confidence < 0:
+            continue
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        lines.setdefault(key, []).append(word)
+        weighted += confidence * len(word)
+        characters += len(word)
+
+    text = '\n'.join(' '.join(words) for _, words in sorted(lines.items()))
+    confidence = weighted / characters if characters else 0.0
+    return OcrResult(text, confidence, sum(len(words) for words in lines.values()))
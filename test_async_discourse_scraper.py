@@ -0,0 +1,104 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import glob
+import json
+import tempfile
+import threading
+from src.scraper.async_discourse_scraper import AsyncDiscourseScraper, parse_retry_after
+from src.scraper.fake_discourse_server import FakeDiscourseServer, load_recorded_topics
+from src.scraper.discourse_scraper_final import DiscourseScraperFixed
+from src.scraper.scrape_journal import JournaledDiscourseScrape
+from src.utils.corpus_store import CorpusStore, corpus_path_for
+
+
+def test_async_scraper_against_fake_discourse():
+    """Scrape recorded topics from a local fake Discourse with bounded parallelism"""
+    topics = load_recorded_topics(limit=35)
+    rate_limited_topic = f"/t/{topics[3]['id']}.json"
+
+    with FakeDiscourseServer(topics, rate_limit_first=[rate_limited_topic]) as server, \
+            tempfile.TemporaryDirectory() as output_dir:
+        scraper = AsyncDiscourseScraper(
+            base_url=server.url,
+            output_dir=output_dir,
+            concurrency=3,
+            requests_per_second=200
+        )
+        # Store reads and writes stay off the event loop, on the one writer thread
+        store_threads = set()
+        for name in ('load_topic', 'save_topic'):
+            def recording(*args, _method=getattr(scraper, name)):
+                store_threads.add(threading.current_thread().name)
+                return _method(*args)
+            setattr(scraper, name, recording)
+        scraped = scraper.scrape_all_discourse_data()
+        assert len(store_threads) == 1 and store_threads.pop().startswith('scrape-writer')
+
+        expected_ids = {topic['id'] for topic in scraper.filter_topics_by_date(topics)}
+        assert {topic['id'] for topic in scraped} == expected_ids
+        assert server.max_in_flight <= 3
+        # The 429'd topic was retried after Retry-After
+        assert server.request_log.count(rate_limited_topic) == 2
+
+        recorded = {topic['id']: topic for topic in topics}
+        with CorpusStore(corpus_path_for(output_dir)) as store:
+            assert set(store.topic_ids()) == expected_ids
+            saved_topics = {topic_id: store.get_topic(topic_id) for topic_id in expected_ids}
+        assert not glob.glob(os.path.join(output_dir, 'discourse_topic_*.json'))
+        for topic_id, saved in saved_topics.items():
+            assert [post['cleaned_text'] for post in saved['posts']] == \
+                [post['cleaned_text'] for post in recorded[topic_id]['posts']]
+
+        with open(os.path.join(output_dir, 'discourse_summary.json'), encoding='utf-8') as f:
+            summary = json.load(f)
+        assert summary['scraping_metadata']['total_topics_scraped'] == len(expected_ids)
+
+
+def test_async_scraper_resumes_a_journaled_job():
+    """A job the sync scraper crashed in is finished by the async one without refetching"""
+    topics = load_recorded_topics(limit=35)
+
+    with FakeDiscourseServer(topics) as server, tempfile.TemporaryDirectory() as output_dir:
+        job = JournaledDiscourseScrape(DiscourseScraperFixed(base_url=server.url, output_dir=output_dir), delay=0)
+        original = job.scraper.scrape_individual_topic
+        calls = []
+
+        def crashing(topic_id, topic_title):
+            if len(calls) == 3:
+                raise KeyboardInterrupt("simulated crash")
+            calls.append(topic_id)
+            return original(topic_id, topic_title)
+
+        job.scraper.scrape_individual_topic = crashing
+        try:
+            job.run()
+            assert False, "expected simulated crash"
+        except KeyboardInterrupt:
+            pass
+
+        server.request_log.clear()
+        scraper = AsyncDiscourseScraper(base_url=server.url, output_dir=output_dir, concurrency=3,
+                                        requests_per_second=200)
+        scraped = scraper.scrape_all_discourse_data()
+
+        assert not [path for path in server.request_log if path.startswith('/c/')]
+        assert not {f"/t/{topic_id}.json" for topic_id in calls} & set(server.request_log)
+        assert len(scraped) == len(scraper.filter_topics_by_date(topics))
+        state = job.journal.replay()
+        assert state['finished'] and set(state['topic_status'].values()) == {'done'}
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after(None, default=1.5) == 1.5
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+
+
+if __name__ == "__main__":
+    test_parse_retry_after()
+    test_async_scraper_against_fake_discourse()
+    test_async_scraper_resumes_a_journaled_job()
+    print("SUCCESS: async scraper tests passed")
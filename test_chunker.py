@@ -0,0 +1,116 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import io
+import itertools
+from src.utils.chunker import StructureAwareChunker, count_tokens
+
+
+def paragraphs(count, words=40, prefix='word'):
+    return '\n\n'.join(' '.join(f'{prefix}{p}_{w}' for w in range(words)) for p in range(count))
+
+
+DOCUMENT = f"""# Docker
+
+{paragraphs(2, prefix='intro')}
+
+## Install
+
+{paragraphs(12, prefix='install')}
+
+```bash
+docker build -t app .
+docker run -p 8000:8000 app
+```
+
+## Push
+
+{paragraphs(1, prefix='push')}
+"""
+
+
+def chunker(**kwargs):
+    return StructureAwareChunker(**dict(dict(target_tokens=100, max_tokens=150, min_chars=10), **kwargs))
+
+
+def test_chunks_stay_within_max_tokens():
+    chunks = list(chunker().iter_chunks(DOCUMENT))
+    assert len(chunks) > 3
+    assert all(count_tokens(chunk['content']) <= 150 for chunk in chunks)
+    # One long paragraph is split on word boundaries
+    long_text = ' '.join(f'w{i}' for i in range(1000))
+    assert all(chunk['tokens'] <= 150 for chunk in chunker().iter_chunks(long_text))
+
+
+def test_offsets_point_back_into_the_source():
+    for chunk in chunker().iter_chunks(DOCUMENT):
+        source = DOCUMENT[chunk['char_start']:chunk['char_end']]
+        first_word, last_word = chunk['content'].split()[0], chunk['content'].split()[-1]
+        assert source.lstrip().startswith(first_word)
+        assert source.rstrip().endswith(last_word)
+
+
+def test_heading_paths_follow_nesting():
+    paths = {tuple(chunk['heading_path']) for chunk in chunker().iter_chunks(DOCUMENT)}
+    assert paths == {('Docker',), ('Docker', 'Install'), ('Docker', 'Push')}
+
+
+def test_code_fences_are_never_split():
+    fenced = [chunk for chunk in chunker().iter_chunks(DOCUMENT) if 'docker build' in chunk['content']]
+    assert len(fenced) == 1
+    content = fenced[0]['content']
+    assert content.count('```') == 2 and 'docker run' in content
+    # Overlap never starts a chunk in the middle of code
+    assert not any(chunk['content'].startswith('docker run') for chunk in chunker().iter_chunks(DOCUMENT))
+
+
+def test_size_splits_overlap_but_sections_do_not():
+    chunks = [chunk for chunk in chunker(overlap_tokens=10).iter_chunks(DOCUMENT)
+              if chunk['heading_path'] == ['Docker', 'Install'] and '```' not in chunk['content']]
+    assert len(chunks) > 2
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk['content'].split()[:10] == previous['content'].split()[-10:]
+    push = [chunk for chunk in chunker(overlap_tokens=10).iter_chunks(DOCUMENT) if chunk['heading_path'][-1] == 'Push']
+    assert push[0]['content'].startswith('## Push')
+
+
+def test_oversized_paragraphs_overlap_and_keep_their_heading():
+    """A post with no blank lines is cut at target_tokens, with the default overlap"""
+    default = chunker()
+    assert default.overlap_tokens > 0
+    post = '## Grading\n\n' + '\n'.join(' '.join(f'l{line}w{word}' for word in range(25)) for line in range(40))
+    chunks = list(default.iter_chunks(post))
+    assert len(chunks) > 5
+    assert chunks[0]['content'].startswith('## Grading\n\nl0w0')
+    assert all(chunk['tokens'] == count_tokens(chunk['content']) <= 150 for chunk in chunks)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        overlap = default.overlap_tokens
+        assert chunk['content'].split()[:overlap] == previous['content'].split()[-overlap:]
+    # Every word of the post is indexed
+    words = {word for chunk in chunks for word in chunk['content'].split()}
+    assert words >= set(post.split())
+
+
+def test_streams_lines_from_files_and_generators():
+    assert list(chunker().iter_chunks(io.StringIO(DOCUMENT))) == list(chunker().iter_chunks(DOCUMENT))
+
+    def endless():
+        for n in itertools.count():
+            yield f'line {n} ' + 'text ' * 20 + '\n'
+            yield '\n'
+
+    first = list(itertools.islice(chunker().iter_chunks(endless()), 2))
+    assert first[0]['content'].startswith('line 0') and first[1]['char_start'] > 0
+
+
+if __name__ == "__main__":
+    test_chunks_stay_within_max_tokens()
+    test_offsets_point_back_into_the_source()
+    test_heading_paths_follow_nesting()
+    test_code_fences_are_never_split()
+    test_size_splits_overlap_but_sections_do_not()
+    test_oversized_paragraphs_overlap_and_keep_their_heading()
+    test_streams_lines_from_files_and_generators()
+    print("SUCCESS: chunker tests passed")
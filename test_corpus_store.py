@@ -0,0 +1,120 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import glob
+import json
+import tempfile
+from config.settings import settings
+from src.utils.corpus_store import CorpusStore, iter_scraped_topics
+
+
+def test_import_round_trips_topic_files():
+    """Topics read back from the store equal the original JSON files"""
+    files = sorted(glob.glob(os.path.join(settings.RAW_DATA_PATH, 'discourse_topic_*.json')))[:10]
+
+    with tempfile.TemporaryDirectory() as raw_dir:
+        for file_path in files:
+            with open(file_path, 'rb') as src, open(os.path.join(raw_dir, os.path.basename(file_path)), 'wb') as dst:
+                dst.write(src.read())
+
+        with CorpusStore(os.path.join(raw_dir, 'corpus.sqlite3')) as store:
+            stats = store.import_json_files(raw_dir)
+            assert stats['topics'] == len(files)
+
+            originals = {}
+            for file_path in files:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    topic = json.load(f)
+                originals[topic['id']] = topic
+                assert store.get_topic(topic['id']) == topic
+
+            scanned = list(store.iter_topics())
+            assert [topic['id'] for topic in scanned] == sorted(originals)
+            assert all(topic == originals[topic['id']] for topic in scanned)
+            assert store.get_topic(-1) is None
+
+
+def test_identical_texts_are_stored_once():
+    """A body shared by several posts and variants is stored once"""
+    body = 'Please check the deadline on the course page before submitting.'
+    topic = {
+        'id': 1,
+        'title': 'Deadline',
+        'posts': [
+            {'post_number': '1', 'raw_content': body, 'cooked_content': f'<p>{body}</p>', 'cleaned_text': body},
+            {'post_number': '2', 'raw_content': body, 'cooked_content': f'<p>{body}</p>', 'cleaned_text': body},
+        ]
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with CorpusStore(os.path.join(tmp_dir, 'corpus.sqlite3')) as store:
+            store.put_topic(topic)
+            assert store.stats()['unique_texts'] == 2
+
+            # Re-saving a topic replaces its posts instead of duplicating them
+            store.put_topic(dict(topic, posts=topic['posts'][:1]))
+            assert store.stats()['posts'] == 1
+            assert store.get_topic(1)['posts'] == topic['posts'][:1]
+
+
+def test_replaced_texts_are_deleted():
+    """Re-saving a topic with edited posts does not leave the old bodies behind"""
+    topic = {'id': 1, 'title': 'Deadline', 'posts': [
+        {'post_number': 1, 'raw_content': 'First draft', 'cleaned_text': 'First draft'},
+        {'post_number': 2, 'raw_content': 'Shared answer', 'cleaned_text': 'Shared answer'},
+    ]}
+    other = {'id': 2, 'title': 'Other', 'posts': [{'post_number': 1, 'raw_content': 'First draft'}]}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with CorpusStore(os.path.join(tmp_dir, 'corpus.sqlite3')) as store:
+            store.put_topic(topic)
+            store.put_topic(other)
+            edited = [dict(topic['posts'][0], raw_content='Edited', cleaned_text='Edited'), topic['posts'][1]]
+            store.put_topic(dict(topic, posts=edited))
+
+            # 'First draft' is still used by topic 2; nothing else is left over
+            assert store.stats()['unique_texts'] == 3
+            assert store.gc() == 0
+            store.put_topic(dict(other, posts=[]))
+            assert store.stats()['unique_texts'] == 2
+
+
+def test_import_counts_failed_files():
+    with tempfile.TemporaryDirectory() as raw_dir:
+        with open(os.path.join(raw_dir, 'discourse_topic_1.json'), 'w', encoding='utf-8') as f:
+            json.dump({'id': 1, 'title': 'Ok', 'posts': []}, f)
+        with open(os.path.join(raw_dir, 'discourse_topic_2.json'), 'w', encoding='utf-8') as f:
+            f.write('{"id": 2, "posts": [')
+
+        with CorpusStore(os.path.join(raw_dir, 'corpus.sqlite3')) as store:
+            stats = store.import_json_files(raw_dir)
+        assert (stats['imported'], stats['failed'], stats['topics']) == (1, 1, 1)
+
+
+def test_scraped_topics_merge_json_files_the_store_lacks_or_predates():
+    with tempfile.TemporaryDirectory() as raw_dir:
+        corpus_db = os.path.join(raw_dir, 'corpus.sqlite3')
+        with CorpusStore(corpus_db) as store:
+            store.put_topic({'id': 1, 'title': 'Stored', 'scraped_at': '2025-04-01T10:00:00', 'posts': []})
+            store.put_topic({'id': 2, 'title': 'Stored', 'scraped_at': '2025-04-01T10:00:00', 'posts': []})
+        topics = {
+            2: {'id': 2, 'title': 'Rescraped', 'scraped_at': '2025-05-01T10:00:00', 'posts': []},
+            3: {'id': 3, 'title': 'Only in JSON', 'scraped_at': '2025-03-01T10:00:00', 'posts': []},
+        }
+        for topic_id, topic in topics.items():
+            with open(os.path.join(raw_dir, f'discourse_topic_{topic_id}.json'), 'w', encoding='utf-8') as f:
+                json.dump(topic, f)
+
+        titles = {topic['id']: topic['title'] for topic in iter_scraped_topics(raw_dir, corpus_db)}
+        assert titles == {1: 'Stored', 2: 'Rescraped', 3: 'Only in JSON'}
+
+
+if __name__ == "__main__":
+    test_import_round_trips_topic_files()
+    test_identical_texts_are_stored_once()
+    test_replaced_texts_are_deleted()
+    test_import_counts_failed_files()
+    test_scraped_topics_merge_json_files_the_store_lacks_or_predates()
+    print("SUCCESS: corpus store tests passed")
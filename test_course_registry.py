@@ -0,0 +1,188 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import asyncio
+import json
+import tempfile
+import threading
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from src.api import main
+from src.api.course_registry import CourseRegistry, load_courses, snapshot_bytes
+from src.scraper.discourse_scraper_final import DiscourseScraperFixed
+
+
+def write_course(tmp_dir, course_id, rows=4, dim=384, url='https://course.example/setup.md'):
+    path = os.path.join(tmp_dir, f'{course_id}.npz')
+    rng = np.random.default_rng(rows)
+    metadata = [{'type': 'course_content', 'url': url, 'section': 'setup'}] * rows
+    np.savez(path, embeddings=rng.standard_normal((rows, dim)).astype(np.float32),
+             content=np.array([f'{course_id} chunk {row}' for row in range(rows)], dtype=object),
+             metadata=np.array(metadata, dtype=object))
+    return {'id': course_id, 'embeddings_path': path}
+
+
+def make_registry(tmp_dir, course_ids, memory_budget=None):
+    courses_file = os.path.join(tmp_dir, 'courses.json')
+    with open(courses_file, 'w', encoding='utf-8') as f:
+        json.dump([write_course(tmp_dir, course_id) for course_id in course_ids], f)
+    courses = load_courses(courses_file)
+    return CourseRegistry(courses, default_course=course_ids[0], memory_budget=memory_budget)
+
+
+def test_courses_load_lazily_and_least_recently_used_is_evicted():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        registry = make_registry(tmp_dir, ['base', 'ds-2024', 'ml-2025'])
+        registry.get('base')
+        one_index = snapshot_bytes(registry.default_manager.current)
+        # Room for the pinned default course plus one more
+        registry.memory_budget = 2 * one_index
+
+        assert registry.loaded('ds-2024') is None
+        ds = registry.get('ds-2024')
+        assert ds.current.chunks[0] == 'ds-2024 chunk 0'
+        assert registry.get('ds-2024') is ds
+
+        registry.get('ml-2025')
+        assert registry.loaded('ds-2024') is None and registry.loaded('base') is not None
+        assert registry.evictions == 1
+        assert set(registry.describe()['loaded']) == {'base', 'ml-2025'}
+
+        with pytest.raises(KeyError):
+            registry.get('unknown')
+
+
+def test_concurrent_first_requests_load_a_course_once():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        registry = make_registry(tmp_dir, ['base', 'ds-2024'])
+        loads = []
+        registry.on_load.append(loads.append)
+
+        managers = []
+        threads = [threading.Thread(target=lambda: managers.append(registry.get('ds-2024'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(loads) == 1 and len({id(manager) for manager in managers}) == 1
+
+
+def test_every_loaded_course_is_watched_until_evicted():
+    """A lazily loaded course picks up a rebuilt index; evicting it stops its watcher"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        registry = make_registry(tmp_dir, ['base', 'ds-2024', 'ml-2025'])
+        registry.memory_budget = 2 * snapshot_bytes(registry.default_manager.current)
+
+        async def scenario():
+            registry.start_watching(0.01)
+            ds = await asyncio.to_thread(registry.get, 'ds-2024')
+            await asyncio.sleep(0.05)
+            assert sorted(registry._watchers) == ['base', 'ds-2024']
+
+            path = registry.courses['ds-2024']['embeddings_path']
+            rows = 6
+            np.savez(path, embeddings=np.ones((rows, 384), dtype=np.float32),
+                     content=np.array([f'rebuilt {row}' for row in range(rows)], dtype=object),
+                     metadata=np.array([{}] * rows, dtype=object))
+            os.utime(path, (os.stat(path).st_mtime + 5,) * 2)
+            for _ in range(100):
+                if ds.current.chunks[0] == 'rebuilt 0':
+                    break
+                await asyncio.sleep(0.02)
+            assert ds.current.chunks[0] == 'rebuilt 0'
+
+            task = registry._watchers['ds-2024'][1]
+            await asyncio.to_thread(registry.get, 'ml-2025')
+            await asyncio.sleep(0.05)
+            assert registry.loaded('ds-2024') is None
+            assert sorted(registry._watchers) == ['base', 'ml-2025'] and task.cancelled()
+            for _, watcher in registry._watchers.values():
+                watcher.cancel()
+
+        asyncio.run(scenario())
+
+
+def test_a_watch_queued_before_an_eviction_does_not_start():
+    """The loop may run a course's watch after its eviction; that watch is dropped"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        registry = make_registry(tmp_dir, ['base', 'ds-2024'])
+
+        async def scenario():
+            registry.start_watching(0.01)
+            evicted = registry.make_manager(registry.courses['ds-2024'])
+            await asyncio.to_thread(registry.watch, 'ds-2024', evicted)
+            await asyncio.sleep(0.02)
+            assert sorted(registry._watchers) == ['base']
+            for _, watcher in registry._watchers.values():
+                watcher.cancel()
+
+        asyncio.run(scenario())
+
+
+def test_default_course_entry_cannot_move_its_index():
+    """The default course is served from the settings paths; an entry may rename it but not repoint it"""
+    default_id = main.settings.DEFAULT_COURSE
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        courses_file = os.path.join(tmp_dir, 'courses.json')
+        with open(courses_file, 'w', encoding='utf-8') as f:
+            json.dump([{'id': default_id, 'name': 'TDS Jan 2025'}], f)
+        assert load_courses(courses_file)[default_id]['name'] == 'TDS Jan 2025'
+
+        with open(courses_file, 'w', encoding='utf-8') as f:
+            json.dump([{'id': default_id, 'embeddings_path': os.path.join(tmp_dir, 'other.npz')}], f)
+        with pytest.raises(ValueError, match='embeddings_path'):
+            load_courses(courses_file)
+
+
+def test_other_courses_do_not_fall_back_to_the_default_index():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        courses_file = os.path.join(tmp_dir, 'courses.json')
+        with open(courses_file, 'w', encoding='utf-8') as f:
+            json.dump([{'id': 'empty', 'embeddings_path': os.path.join(tmp_dir, 'missing.npz')}], f)
+        registry = CourseRegistry(load_courses(courses_file))
+
+        with pytest.raises(ValueError):
+            registry.get('empty')
+        assert registry.loaded('empty') is None
+
+
+def test_ask_routes_by_course(monkeypatch):
+    monkeypatch.setattr(main, 'precomputed_answers', None)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        courses_file = os.path.join(tmp_dir, 'courses.json')
+        entry = dict(write_course(tmp_dir, 'ds-2024'), name='DS', course_url='https://course.example')
+        with open(courses_file, 'w', encoding='utf-8') as f:
+            json.dump([entry], f)
+        monkeypatch.setattr(main, 'course_registry',
+                            CourseRegistry.from_settings(courses_file, default_manager=main.index_manager))
+
+        response = asyncio.run(main.ask_question(main.QuestionRequest(question='setup help', course='ds-2024')))
+        assert response.links == [{'url': 'https://course.example/#/setup', 'text': 'DS course: setup'}]
+        assert 'ds-2024' in main.course_registry.describe()['loaded']
+
+        with pytest.raises(HTTPException) as unknown:
+            asyncio.run(main.ask_question(main.QuestionRequest(question='setup help', course='nope')))
+        assert unknown.value.status_code == 404
+
+
+def test_scraper_category_and_term_are_parameters():
+    scraper = DiscourseScraperFixed(category_id=99, category_slug='courses/ds-kb',
+                                    start_date='2024-09-01', end_date='2024-12-31')
+    topics = [{'id': 1, 'created_at': '2024-10-02T10:00:00.000Z'}, {'id': 2, 'created_at': '2025-02-01T10:00:00.000Z'}]
+    assert [topic['id'] for topic in scraper.filter_topics_by_date(topics)] == [1]
+    assert scraper.category_id == 99 and scraper.category_slug == 'courses/ds-kb'
+
+
+if __name__ == "__main__":
+    test_courses_load_lazily_and_least_recently_used_is_evicted()
+    test_concurrent_first_requests_load_a_course_once()
+    test_every_loaded_course_is_watched_until_evicted()
+    test_a_watch_queued_before_an_eviction_does_not_start()
+    test_default_course_entry_cannot_move_its_index()
+    test_other_courses_do_not_fall_back_to_the_default_index()
+    test_scraper_category_and_term_are_parameters()
+    print("SUCCESS: course registry tests passed")
@@ -0,0 +1,115 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import json
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from src.scraper.course_scraper import TDSCourseScraper
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    # Paths answered with a 500 or a 404 instead of the file
+    failing = set()
+    missing = set()
+
+    def do_GET(self):
+        if self.path in self.failing:
+            self.send_error(500)
+        elif self.path in self.missing:
+            self.send_error(404)
+        else:
+            super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_page(site_dir, name, content, mtime):
+    path = os.path.join(site_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.utime(path, (mtime, mtime))
+
+
+def test_concurrent_scrape_discovers_pages_and_uses_conditional_gets():
+    with tempfile.TemporaryDirectory() as site_dir, tempfile.TemporaryDirectory() as output_dir:
+        past = time.time() - 3600
+        write_page(site_dir, 'README.md', "# TDS\n\n1. [Docker](docker.md)\n2. [Git](#/git)\n", past)
+        write_page(site_dir, 'docker.md', "## Docker\n\nSee also [deployment](deployment-tools.md).\n", past)
+        write_page(site_dir, 'git.md', "## Git\n\nVersion control.\n", past)
+        write_page(site_dir, 'deployment-tools.md', "## Deployment\n\nShip it.\n", past)
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=site_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        try:
+            scraper = TDSCourseScraper(base_url=base_url, output_dir=output_dir)
+            data = scraper.scrape_all_content_concurrent(max_workers=4)
+            # deployment-tools.md is only reachable through docker.md
+            assert set(data) == {'README', 'docker', 'git', 'deployment-tools'}
+            assert scraper.last_run_stats['fetched'] == 4
+            assert os.path.exists(os.path.join(output_dir, 'tds_course_cache.json'))
+
+            # Second run: every page answers 304 and the content is kept
+            scraper = TDSCourseScraper(base_url=base_url, output_dir=output_dir)
+            data = scraper.scrape_all_content_concurrent(max_workers=4)
+            assert scraper.last_run_stats['fetched'] == 0
+            assert scraper.last_run_stats['not_modified'] == 4
+            assert 'Ship it.' in data['deployment-tools']['content']
+
+            # Only the edited page is downloaded again
+            write_page(site_dir, 'git.md', "## Git\n\nBranches and merges.\n", time.time() + 5)
+            scraper = TDSCourseScraper(base_url=base_url, output_dir=output_dir)
+            data = scraper.scrape_all_content_concurrent(max_workers=4)
+            assert scraper.last_run_stats['fetched'] == 1
+            assert scraper.last_run_stats['not_modified'] == 3
+            with open(os.path.join(output_dir, 'tds_course_all.json'), encoding='utf-8') as f:
+                assert 'Branches and merges.' in json.load(f)['git']['content']
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def test_failed_fetch_keeps_the_previous_page():
+    with tempfile.TemporaryDirectory() as site_dir, tempfile.TemporaryDirectory() as output_dir:
+        past = time.time() - 3600
+        write_page(site_dir, 'README.md', "# TDS\n\n1. [Docker](docker.md)\n2. [Git](git.md)\n", past)
+        write_page(site_dir, 'docker.md', "## Docker\n\nSee also [deployment](deployment-tools.md).\n", past)
+        write_page(site_dir, 'git.md', "## Git\n\nVersion control.\n", past)
+        write_page(site_dir, 'deployment-tools.md', "## Deployment\n\nShip it.\n", past)
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=site_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        try:
+            TDSCourseScraper(base_url=base_url, output_dir=output_dir).scrape_all_content_concurrent(max_workers=4)
+
+            QuietHandler.failing = {'/docker.md'}
+            QuietHandler.missing = {'/git.md'}
+            scraper = TDSCourseScraper(base_url=base_url, output_dir=output_dir)
+            scraper.scrape_all_content_concurrent(max_workers=4)
+            assert scraper.last_run_stats['kept'] == 1
+
+            with open(os.path.join(output_dir, 'tds_course_all.json'), encoding='utf-8') as f:
+                saved = json.load(f)
+            # The 500 keeps the old copy (and the page it links to); the 404 removes the page
+            assert 'See also' in saved['docker']['content']
+            assert 'deployment-tools' in saved and 'git' not in saved
+        finally:
+            QuietHandler.failing, QuietHandler.missing = set(), set()
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    test_concurrent_scrape_discovers_pages_and_uses_conditional_gets()
+    test_failed_fetch_keeps_the_previous_page()
+    print("SUCCESS: course scraper cache test passed")
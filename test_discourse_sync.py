@@ -0,0 +1,145 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import copy
+import tempfile
+import numpy as np
+from src.models.vector_store_complete import ComprehensiveVectorStore
+from src.scraper.discourse_scraper_final import DiscourseScraperFixed
+from src.scraper.discourse_sync import IncrementalDiscourseSync
+from src.scraper.fake_discourse_server import FakeDiscourseServer, load_recorded_topics
+from src.utils.corpus_store import CorpusStore, corpus_path_for
+
+
+def saved_topic(output_dir, topic_id):
+    with CorpusStore(corpus_path_for(output_dir)) as store:
+        return store.get_topic(topic_id)
+
+
+def test_incremental_sync_fetches_only_changed_topics_and_new_posts():
+    """Only changed topics are refetched, and only their new posts by id"""
+    topics = copy.deepcopy(load_recorded_topics(limit=5))
+
+    with FakeDiscourseServer(topics, posts_per_page=3) as server, tempfile.TemporaryDirectory() as output_dir:
+        def listing():
+            scraper = DiscourseScraperFixed(base_url=server.url, output_dir=output_dir)
+            return IncrementalDiscourseSync(scraper), scraper.get_all_topics_with_pagination()
+
+        # First run stores everything, including posts beyond the first page
+        sync, listed = listing()
+        assert sorted(sync.sync(listed)) == sorted(topic['id'] for topic in topics)
+        for topic in topics:
+            assert len(saved_topic(output_dir, topic['id'])['posts']) == len(topic['posts'])
+
+        # Nothing changed: no topic is requested at all
+        server.request_log.clear()
+        sync, listed = listing()
+        assert sync.sync(listed) == []
+        assert not [path for path in server.request_log if path.startswith('/t/')]
+
+        # A new reply only refetches that topic and that post
+        changed_topic = topics[1]
+        server.add_post(changed_topic['id'], {
+            'id': 99999999,
+            'post_number': len(changed_topic['posts']) + 1,
+            'username': 'staff',
+            'created_at': '2025-06-20T10:00:00.000Z',
+            'cooked_content': '<p>Use <code>docker compose up</code> and resubmit the URL.</p>',
+            'trust_level': 4
+        })
+        server.request_log.clear()
+        sync, listed = listing()
+        assert sync.sync(listed) == [changed_topic['id']]
+        assert server.request_log.count(f"/t/{changed_topic['id']}.json") == 1
+
+        saved = saved_topic(output_dir, changed_topic['id'])
+        assert saved['posts'][-1]['cleaned_text'] == 'Use docker compose up and resubmit the URL.'
+        assert saved['posts_count'] == len(changed_topic['posts'])
+
+
+def test_unmodified_topic_answers_304():
+    """Stored validators turn a refetch of an unchanged topic into a 304"""
+    topics = copy.deepcopy(load_recorded_topics(limit=2))
+
+    with FakeDiscourseServer(topics) as server, tempfile.TemporaryDirectory() as output_dir:
+        scraper = DiscourseScraperFixed(base_url=server.url, output_dir=output_dir)
+        IncrementalDiscourseSync(scraper).sync(topics)
+
+        # Pretend the listing reports a different count so the topic looks changed
+        listed = [dict(topics[0], posts_count=topics[0]['posts_count'] + 1)]
+        assert IncrementalDiscourseSync(scraper).sync(listed) == []
+
+
+class FailingPostsServer(FakeDiscourseServer):
+    """Answers 500 on /t/<id>/posts.json while `fail_posts` is set"""
+
+    fail_posts = False
+
+    def handle(self, path, query, headers):
+        if self.fail_posts and path.endswith('/posts.json'):
+            return 500, {}, {'errors': ['server error']}
+        return super().handle(path, query, headers)
+
+
+def test_failed_post_batch_leaves_the_topic_to_retry():
+    """A topic whose new posts could not all be fetched is not saved as synced"""
+    topics = copy.deepcopy(load_recorded_topics(limit=3))
+
+    with FailingPostsServer(topics, posts_per_page=1) as server, tempfile.TemporaryDirectory() as output_dir:
+        def sync(listed=None):
+            scraper = DiscourseScraperFixed(base_url=server.url, output_dir=output_dir)
+            return IncrementalDiscourseSync(scraper).sync(listed or scraper.get_all_topics_with_pagination())
+
+        sync()
+        topic = topics[0]
+        server.add_post(topic['id'], {
+            'id': 99999998, 'post_number': len(topic['posts']) + 1, 'username': 'staff',
+            'created_at': '2025-06-21T10:00:00.000Z', 'cooked_content': '<p>Second page reply</p>'
+        })
+
+        server.fail_posts = True
+        assert sync() == []
+        assert saved_topic(output_dir, topic['id'])['posts_count'] == len(topic['posts']) - 1
+
+        # The next sync sees the topic as changed and gets the post (no 304 from stale validators)
+        server.fail_posts = False
+        assert sync() == [topic['id']]
+        saved = saved_topic(output_dir, topic['id'])
+        assert saved['posts_count'] == len(topic['posts']) and saved['posts'][-1]['id'] == 99999998
+
+
+def test_changed_topics_are_re_embedded_from_the_scraper_output():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        embeddings_file = os.path.join(tmp_dir, 'index.npz')
+        metadata = [{'type': 'course_content', 'section': 'docker'}, {'type': 'discourse_post', 'topic_id': 7},
+                    {'type': 'discourse_post', 'topic_id': 8}]
+        np.savez_compressed(embeddings_file, embeddings=np.zeros((3, 384)),
+                            content=np.array(['course', 'old 7', 'old 8'], dtype=object),
+                            metadata=np.array(metadata, dtype=object))
+        topic = {'id': 7, 'title': 'GA3', 'url': 'https://discourse.example/t/7', 'posts': [
+            {'post_number': 1, 'cleaned_text': 'How do I push the image to Docker Hub after building it locally?'},
+            {'post_number': 2, 'cleaned_text': 'Run docker login first, then docker push with your username prefix.'}
+        ]}
+        with CorpusStore(corpus_path_for(tmp_dir)) as corpus_store:
+            corpus_store.put_topic(topic)
+
+        store = ComprehensiveVectorStore(embeddings_file=embeddings_file, raw_dir=tmp_dir)
+        result = store.update_topic_embeddings([7])
+        assert (result['chunks_removed'], result['chunks_added'], result['total_chunks']) == (1, 2, 4)
+
+        data = np.load(embeddings_file, allow_pickle=True)
+        assert data['embeddings'].shape == (4, 384)
+        assert list(data['content'][:2]) == ['course', 'old 8']
+        assert [meta.get('post_number') for meta in data['metadata'][2:]] == [1, 2]
+        # Written next to the archive and renamed over it
+        assert sorted(os.listdir(tmp_dir)) == sorted([os.path.basename(corpus_path_for(tmp_dir)), 'index.npz'])
+
+
+if __name__ == "__main__":
+    test_incremental_sync_fetches_only_changed_topics_and_new_posts()
+    test_unmodified_topic_answers_304()
+    test_failed_post_batch_leaves_the_topic_to_retry()
+    test_changed_topics_are_re_embedded_from_the_scraper_output()
+    print("SUCCESS: incremental sync tests passed")
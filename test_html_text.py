@@ -0,0 +1,60 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import pytest
+from src.utils import html_text
+from src.utils.html_text import clean_html_batch, html_to_text
+
+pytest.importorskip('lxml')
+
+# Shapes of cooked Discourse posts, plus whole documents and the two tags
+# where lxml and html.parser used to disagree
+SAMPLES = [
+    '<p>Try <code>docker login</code> first, then <strong>push</strong>.</p>',
+    '<p>Line one<br>\nLine two</p><ul><li>first</li><li>second <em>item</em></li></ul>',
+    '<pre><code class="lang-python">def f(x):\n    return x  # double  space\n</code></pre>',
+    '<aside class="quote" data-post="2"><div class="title">alice:</div><blockquote><p>quoted</p></blockquote></aside><p>reply</p>',
+    '<p><a href="https://tds.s-anand.net/#/docker" class="inline-onebox">Docker - TDS</a></p>',
+    '<div class="lightbox-wrapper"><a class="lightbox" href="/img.png"><img src="/img.png" alt="screenshot"></a></div><p>see image</p>',
+    '<details><summary>Spoiler</summary><p>answer is 42</p></details>',
+    '<table><tr><th>Q</th><th>Marks</th></tr><tr><td>1</td><td>2.5</td></tr></table>',
+    '<p>&amp; &lt;tag&gt; &nbsp;entities &eacute;</p><script>alert(1)</script><style>p{}</style>',
+    '<p>unclosed <b>bold <i>italic</p> trailing text',
+    '  leading text <p>para</p> tail text',
+    'plain text without tags',
+    '<html><head><title>GA3 discussion</title></head><body><p>body text</p></body></html>',
+    '<title>Standalone title</title><p>after</p>',
+    '<template><p>not rendered</p></template><p>rendered</p>',
+]
+
+
+@pytest.mark.parametrize('html', SAMPLES)
+def test_lxml_matches_html_parser(html):
+    assert html_to_text(html, 'lxml') == html_to_text(html, 'html.parser')
+
+
+def test_title_kept_and_template_dropped():
+    assert 'GA3 discussion' in html_to_text(SAMPLES[-3], 'lxml')
+    assert html_to_text(SAMPLES[-1], 'lxml') == 'rendered'
+
+
+def test_large_batches_reuse_one_pool():
+    try:
+        batch = SAMPLES * 5
+        assert clean_html_batch(batch, workers=2) == [html_to_text(html) for html in batch]
+        pool = html_text._pool
+        clean_html_batch(batch, workers=2)
+        assert pool is not None and html_text._pool is pool
+    finally:
+        html_text.shutdown_pool()
+    assert html_text._pool is None
+
+
+if __name__ == "__main__":
+    for sample in SAMPLES:
+        test_lxml_matches_html_parser(sample)
+    test_title_kept_and_template_dropped()
+    test_large_batches_reuse_one_pool()
+    print("SUCCESS: HTML cleaning tests passed")
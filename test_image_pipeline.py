@@ -0,0 +1,132 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import asyncio
+import base64
+import io
+import pytest
+from fastapi import HTTPException
+from PIL import Image, ImageDraw
+from config.settings import settings
+from src.api import main
+from src.utils.image_pipeline import DescriptionCache, ImageValidationError, prepare_image
+
+
+def screenshot(width=2400, height=1400, text="Error: port 8000 already in use", fmt='PNG'):
+    """A terminal-like screenshot as base64"""
+    image = Image.new('RGB', (width, height), (30, 30, 30))
+    draw = ImageDraw.Draw(image)
+    for row in range(12):
+        draw.text((40, 40 + row * 100), f"{row:02d} {text}", fill=(220, 220, 220))
+    draw.rectangle((width // 2, height // 3, width - 80, height - 80), fill=(0, 120, 200))
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def resend(image_data, scale=0.5, fmt='JPEG'):
+    """The same screenshot, resized and recompressed the way chat apps do"""
+    image = Image.open(io.BytesIO(base64.b64decode(image_data)))
+    image = image.resize((int(image.width * scale), int(image.height * scale)))
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, quality=70)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def test_large_images_are_downscaled_and_keyed_by_pixels():
+    """Only pixel-identical uploads share a digest, whatever their encoding"""
+    original = prepare_image(screenshot(), max_dimension=800)
+    assert max(original.image.size) == 800 and original.original_size == (2400, 1400)
+
+    assert prepare_image(resend(screenshot(), scale=1, fmt='PNG'), max_dimension=800).digest == original.digest
+    assert prepare_image(resend(screenshot()), max_dimension=800).digest != original.digest
+    assert prepare_image(screenshot(text="Error: port 9000 already in use"), max_dimension=800).digest != original.digest
+    assert len(original.encoded()) > 0
+
+
+def test_near_duplicate_reuse_is_opt_in():
+    original = prepare_image(screenshot())
+    resent = prepare_image(resend(screenshot()))
+
+    exact = DescriptionCache(max_entries=4)
+    exact.put(original, 'port in use')
+    assert exact.get(original) == 'port in use' and exact.get(resent) is None
+
+    near = DescriptionCache(max_entries=4, near_duplicates=True, hash_size=10)
+    near.put(original, 'port in use')
+    assert near.get(resent) == 'port in use'
+    assert near.get(prepare_image(screenshot(width=1400, height=2400))) is None
+
+
+def test_invalid_uploads_are_rejected():
+    with pytest.raises(ImageValidationError):
+        prepare_image('not base64 at all!!')
+    with pytest.raises(ImageValidationError):
+        prepare_image(base64.b64encode(b'plain text, not an image').decode())
+    with pytest.raises(ImageValidationError):
+        prepare_image(screenshot(width=400, height=300), max_pixels=1000)
+    # Truncated headers and PIL's own bomb check fail inside Image.open()
+    truncated = base64.b64decode(screenshot(width=400, height=300))[:20]
+    with pytest.raises(ImageValidationError):
+        prepare_image(base64.b64encode(truncated).decode())
+    image_data = screenshot(width=400, height=300)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)
+        with pytest.raises(ImageValidationError):
+            prepare_image(image_data, max_pixels=10 ** 6)
+
+
+def test_cache_is_bounded_lru():
+    def solid(color):
+        buffer = io.BytesIO()
+        Image.new('RGB', (8, 8), color).save(buffer, format='PNG')
+        return prepare_image(base64.b64encode(buffer.getvalue()).decode())
+
+    red, green, blue = solid((255, 0, 0)), solid((0, 255, 0)), solid((0, 0, 255))
+    cache = DescriptionCache(max_entries=2)
+    cache.put(red, 'a')
+    cache.put(green, 'b')
+    assert cache.get(red) == 'a'
+    cache.put(blue, 'c')  # evicts green, the least recently used
+    assert cache.get(green) is None and cache.get(red) == 'a'
+
+
+def test_repeated_screenshot_skips_the_vision_call(monkeypatch):
+    calls = []
+    monkeypatch.setattr(settings, 'GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(settings, 'OCR_ENABLED', 'false')
+    monkeypatch.setattr(main, 'image_description_cache', DescriptionCache())
+    monkeypatch.setattr(main, 'describe_image_with_gemini', lambda image: calls.append(image.size) or 'described')
+
+    assert main.get_image_description(screenshot()) == 'described'
+    # Re-sent as a data URL: same pixels, so the cached description is reused
+    assert main.get_image_description(f"data:image/png;base64,{screenshot()}") == 'described'
+    assert len(calls) == 1 and max(calls[0]) <= settings.IMAGE_MAX_DIMENSION
+
+    request = main.QuestionRequest(question='what is this?', image='bm90IGFuIGltYWdl')
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.ask_question(request))
+    assert error.value.status_code == 400
+
+
+def test_same_layout_screenshots_with_different_text_are_described_separately(monkeypatch):
+    """Two terminal screenshots that differ only in their text never share a description"""
+    calls = []
+    monkeypatch.setattr(settings, 'GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(settings, 'OCR_ENABLED', 'false')
+    monkeypatch.setattr(main, 'image_description_cache', DescriptionCache())
+    monkeypatch.setattr(main, 'describe_image_with_gemini', lambda image: calls.append(1) or f'description {len(calls)}')
+
+    first = main.get_image_description(screenshot(text="Error: port 8000 already in use"))
+    second = main.get_image_description(screenshot(text="Error: port 9000 already in use"))
+    assert (first, second) == ('description 1', 'description 2')
+
+
+if __name__ == "__main__":
+    test_large_images_are_downscaled_and_keyed_by_pixels()
+    test_near_duplicate_reuse_is_opt_in()
+    test_invalid_uploads_are_rejected()
+    test_cache_is_bounded_lru()
+    print("SUCCESS: image pipeline tests passed")
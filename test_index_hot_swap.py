@@ -0,0 +1,96 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import asyncio
+import tempfile
+import numpy as np
+import pytest
+from fastapi import HTTPException, Request
+from config.settings import settings
+from src.api import main
+from src.api.index_manager import IndexManager, load_snapshot
+from src.models.ingest_pipeline import IndexWriter
+
+
+def write_index(index_dir, texts, dim=8, version=None):
+    rng = np.random.default_rng(len(texts))
+    with IndexWriter(index_dir) as writer:
+        writer.append(texts, [{'chunk_id': i} for i in range(len(texts))], rng.standard_normal((len(texts), dim)))
+        writer.finish({'version': version} if version else None)
+
+
+def test_reload_swaps_versions_without_disturbing_old_readers():
+    """A rebuild is swapped in atomically; a held snapshot keeps working"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_dir = os.path.join(tmp_dir, 'index')
+        write_index(index_dir, ['old chunk a', 'old chunk b'], version='v1')
+
+        manager = IndexManager(loader=lambda: load_snapshot(index_dir=index_dir))
+        old = manager.load_initial()
+        assert (old.version, old.generation) == ('v1', 1)
+
+        # Nothing changed on disk: no swap
+        swapped, info = manager.reload()
+        assert not swapped and info['unchanged']
+
+        write_index(index_dir, ['new chunk a', 'new chunk b', 'new chunk c'], version='v2')
+        swapped, info = manager.reload()
+        assert swapped and info['version'] == 'v2'
+        assert manager.current.generation == 2
+        assert list(manager.current.chunks) == ['new chunk a', 'new chunk b', 'new chunk c']
+
+        # The replaced files are still mapped by the old snapshot
+        assert list(old.chunks) == ['old chunk a', 'old chunk b']
+        assert np.asarray(old.embeddings).shape == (2, 8)
+
+
+def test_invalid_index_is_rejected():
+    """A rebuild with a different embedding dimension never goes live"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_dir = os.path.join(tmp_dir, 'index')
+        write_index(index_dir, ['chunk'], version='v1')
+        manager = IndexManager(loader=lambda: load_snapshot(index_dir=index_dir))
+        manager.load_initial()
+
+        write_index(index_dir, ['chunk', 'other'], dim=4, version='v2')
+        swapped, info = manager.reload()
+        assert not swapped and 'dimension' in info['error']
+        assert manager.current.version == 'v1'
+        assert manager.last_error
+
+
+def admin_request(token=None):
+    headers = [(b'x-admin-token', token.encode())] if token else []
+    return Request({'type': 'http', 'method': 'POST', 'path': '/admin/reload', 'headers': headers})
+
+
+def test_admin_reload_endpoint_and_health_version(monkeypatch):
+    """/admin/reload needs the token; /health reports the served version"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_dir = os.path.join(tmp_dir, 'index')
+        write_index(index_dir, ['chunk one', 'chunk two'], version='v1')
+        monkeypatch.setattr(settings, 'INDEX_DIR', index_dir, raising=False)
+        monkeypatch.setattr(settings, 'ADMIN_TOKEN', 'secret', raising=False)
+        monkeypatch.setattr(main, 'index_manager', IndexManager(loader=lambda: load_snapshot(index_dir=index_dir)))
+
+        asyncio.run(main.load_knowledge_base())
+        assert asyncio.run(main.health_check())['index_version'] == 'v1'
+
+        write_index(index_dir, ['chunk one', 'chunk two', 'chunk three'], version='v2')
+        with pytest.raises(HTTPException) as denied:
+            asyncio.run(main.reload_index(admin_request('wrong')))
+        assert denied.value.status_code == 403
+
+        response = asyncio.run(main.reload_index(admin_request('secret')))
+        assert response['swapped']
+
+        health = asyncio.run(main.health_check())
+        assert (health['index_version'], health['total_chunks']) == ('v2', 3)
+
+
+if __name__ == "__main__":
+    test_reload_swaps_versions_without_disturbing_old_readers()
+    test_invalid_index_is_rejected()
+    print("SUCCESS: index hot swap tests passed")
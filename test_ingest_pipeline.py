@@ -0,0 +1,81 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import json
+import tempfile
+import numpy as np
+import pytest
+from config.settings import settings
+from src.models.ingest_pipeline import IngestPipeline
+from src.models.shared_index import attach_index
+from src.models.vector_store_complete import ComprehensiveVectorStore
+from src.utils.corpus_store import CorpusStore, corpus_path_for
+
+LONG_SECTION = '\n\n'.join(
+    f"## Step {step}\n\n" + ' '.join(f"Configure docker volume {step}.{word} before running the grader." for word in range(40))
+    for step in range(6)
+)
+
+
+def write_fixture(raw_dir):
+    """Two course sections, one topic in the corpus store and one only as a legacy JSON file"""
+    knowledge_base = {
+        'docker': {'content': LONG_SECTION, 'url': 'https://course.example/docker', 'scraped_at': '2025-04-01'},
+        'readme': {'content': '# README\n\nThe course has seven graded assignments and one project.'}
+    }
+    with open(os.path.join(raw_dir, 'tds_course_all.json'), 'w', encoding='utf-8') as f:
+        json.dump(knowledge_base, f)
+
+    stored = {'id': 7, 'title': 'GA3 docker push', 'url': 'https://discourse.example/t/7', 'posts': [
+        {'post_number': 1, 'raw_content': 'How do I push the image to Docker Hub after building it locally?'},
+        {'post_number': 2, 'raw_content': 'Thanks!'},
+    ]}
+    with CorpusStore(corpus_path_for(raw_dir)) as store:
+        store.put_topic(stored)
+    legacy = {'id': 8, 'title': 'Pandas merge', 'url': 'https://discourse.example/t/8', 'posts': [
+        {'post_number': 1, 'cleaned_text': 'Use pd.merge with how="left" to keep every row of the left frame.'},
+    ]}
+    with open(os.path.join(raw_dir, 'discourse_topic_8.json'), 'w', encoding='utf-8') as f:
+        json.dump(legacy, f)
+    return [knowledge_base['docker']['content'], knowledge_base['readme']['content'],
+            stored['posts'][0]['raw_content'], legacy['posts'][0]['cleaned_text']]
+
+
+def test_pipeline_writes_every_chunk_once():
+    """Raw files -> index: chunk count, matrix shape, manifest and per-stage counters"""
+    vector_store = ComprehensiveVectorStore()
+
+    # The deterministic hash embedder, whatever key the environment has
+    with pytest.MonkeyPatch.context() as monkeypatch, tempfile.TemporaryDirectory() as tmp_dir:
+        monkeypatch.setattr(settings, 'GEMINI_API_KEY', 'your_gemini_api_key_here')
+        raw_dir = os.path.join(tmp_dir, 'raw')
+        index_dir = os.path.join(tmp_dir, 'index')
+        os.makedirs(raw_dir)
+        texts = write_fixture(raw_dir)
+        expected = [chunk['content'] for text in texts for chunk in vector_store.chunker.iter_chunks(text)]
+        assert len(expected) > len(texts)
+
+        manifest = IngestPipeline(index_dir=index_dir, batch_size=4, vector_store=vector_store,
+                                  raw_dir=raw_dir).run()
+
+        assert (manifest['count'], manifest['dim'], manifest['dtype']) == (len(expected), 384, 'float32')
+        stages = {stage['stage']: stage['items'] for stage in manifest['stages']}
+        # 2 sections + 2 topics read; the 7-character reply is dropped by the cleaner
+        assert stages == {'read': 4, 'clean': 4, 'chunk': len(expected), 'embed': len(expected),
+                          'write': len(expected)}
+        with open(os.path.join(index_dir, 'manifest.json'), encoding='utf-8') as f:
+            assert json.load(f) == manifest
+
+        index = attach_index(index_dir)
+        assert index['embeddings'].shape == (len(expected), 384)
+        assert list(index['content']) == expected
+        np.testing.assert_allclose(index['embeddings'][-1], vector_store.create_embedding(expected[-1]), rtol=1e-6)
+        assert [index['metadata'][row].get('topic_id') for row in (len(expected) - 2, len(expected) - 1)] == [7, 8]
+        assert index['metadata'][0]['section'] == 'docker' and index['metadata'][0]['chunk_id'] == 0
+
+
+if __name__ == "__main__":
+    test_pipeline_writes_every_chunk_once()
+    print("SUCCESS: ingest pipeline tests passed")
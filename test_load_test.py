@@ -0,0 +1,65 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import asyncio
+import time
+from http.server import ThreadingHTTPServer
+import numpy as np
+from config.settings import settings
+from src.api import main
+from src.api.index_manager import IndexSnapshot
+from src.api.metrics import Histogram, Registry, monitor_event_loop_lag
+from benchmarks.load_test import StubGeminiServer, embed_text, histogram_delta, histogram_quantile
+
+
+def test_ask_runs_end_to_end_against_the_stub(monkeypatch):
+    stub = StubGeminiServer(embed_latency_ms=0, generate_latency_ms=0, jitter=0).start()
+    try:
+        # The deeper listen backlog is the stub's own, not every ThreadingHTTPServer's
+        assert stub.server.request_queue_size == 256
+        assert ThreadingHTTPServer.request_queue_size != 256
+        monkeypatch.setattr(settings, 'GEMINI_API_KEY', 'load-test-key', raising=False)
+        monkeypatch.setattr(settings, 'GEMINI_API_ENDPOINT', stub.url, raising=False)
+        question = 'How do I install docker?'
+        embeddings = np.array([embed_text(question), embed_text('something else')])
+        snapshot = IndexSnapshot({}, ['Install docker with apt', 'Unrelated'], embeddings, version='test')
+        monkeypatch.setattr(main.index_manager, 'current', snapshot)
+        monkeypatch.setattr(main, 'precomputed_answers', None)
+
+        response = asyncio.run(main.ask_question(main.QuestionRequest(question=question)))
+        assert response.answer.startswith('Stub answer')
+        assert stub.calls['embed'] == 1 and stub.calls['generate'] == 1
+
+        # Injected upstream errors degrade to the template answer instead of failing the request
+        stub.error_rate = 1.0
+        response = asyncio.run(main.ask_question(main.QuestionRequest(question=question)))
+        assert response.answer.startswith('I understand your question')
+        assert stub.calls['errors'] == 2
+    finally:
+        stub.stop()
+
+
+def test_event_loop_lag_is_observed():
+    registry = Registry()
+    lag = Histogram('lag_seconds', 'Lag', registry=registry, buckets=(0.01, 0.1, 1.0))
+
+    async def blocked_loop():
+        monitor = asyncio.create_task(monitor_event_loop_lag(lag, interval=0.01))
+        await asyncio.sleep(0.05)
+        before = registry.render()
+        time.sleep(0.2)  # a synchronous upstream call on the loop
+        await asyncio.sleep(0.05)
+        monitor.cancel()
+        return before, registry.render()
+
+    before, after = asyncio.run(blocked_loop())
+    buckets, total, count = histogram_delta(before, after, 'lag_seconds')
+    assert count >= 1 and total >= 0.15
+    assert histogram_quantile(buckets, count, 1.0) == 1.0
+
+
+if __name__ == "__main__":
+    test_event_loop_lag_is_observed()
+    print("SUCCESS: load test harness tests passed")
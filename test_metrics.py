@@ -0,0 +1,68 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import asyncio
+import time
+import numpy as np
+from src.api import main
+from src.api.index_manager import IndexSnapshot
+from src.api.metrics import Counter, Gauge, Histogram, Registry, ASK_STAGE_SECONDS, FALLBACKS
+
+
+def test_text_exposition_format():
+    registry = Registry()
+    requests = Counter('demo_requests_total', 'Requests', ['outcome'], registry=registry)
+    latency = Histogram('demo_seconds', 'Latency', ['stage'], registry=registry, buckets=(0.1, 1.0))
+    Gauge('demo_size', 'Size', registry=registry, fn=lambda: 42)
+
+    requests.inc(outcome='ok')
+    requests.inc(2, outcome='ok')
+    latency.observe(0.05, stage='search')
+    latency.observe(0.5, stage='search')
+    latency.observe(5.0, stage='search')
+
+    text = registry.render()
+    assert '# TYPE demo_requests_total counter' in text
+    assert 'demo_requests_total{outcome="ok"} 3' in text
+    assert 'demo_seconds_bucket{stage="search",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="search",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{stage="search",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{stage="search"} 3' in text
+    assert 'demo_size 42' in text
+
+
+def test_observe_overhead_is_negligible():
+    registry = Registry()
+    latency = Histogram('overhead_seconds', 'Overhead', ['stage'], registry=registry)
+    start = time.perf_counter()
+    for _ in range(20000):
+        latency.observe(0.01, stage='search')
+    per_call = (time.perf_counter() - start) / 20000
+    assert per_call < 50e-6
+
+
+def test_ask_records_stages_and_fallbacks(monkeypatch):
+    rng = np.random.default_rng(0)
+    snapshot = IndexSnapshot({}, ['chunk about docker'] * 4, rng.standard_normal((4, 384)), version='test')
+    monkeypatch.setattr(main.index_manager, 'current', snapshot)
+    monkeypatch.setattr(main, 'precomputed_answers', None)
+
+    before_search = ASK_STAGE_SECONDS.count(stage='vector_search')
+    before_template = FALLBACKS.value(kind='template_answer')
+    asyncio.run(main.ask_question(main.QuestionRequest(question='How do I install docker?')))
+
+    assert ASK_STAGE_SECONDS.count(stage='vector_search') == before_search + 1
+    assert FALLBACKS.value(kind='template_answer') == before_template + 1
+
+    body = asyncio.run(main.metrics()).body.decode()
+    assert 'tds_ask_stage_seconds_count{stage="total"}' in body
+    assert 'tds_index_chunks 4' in body
+    assert 'process_resident_memory_bytes' in body
+
+
+if __name__ == "__main__":
+    test_text_exposition_format()
+    test_observe_overhead_is_negligible()
+    print("SUCCESS: metrics tests passed")
@@ -0,0 +1,143 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import asyncio
+import base64
+import io
+import pytest
+from PIL import Image, ImageDraw
+from config.settings import settings
+from src.api import main
+from src.api.metrics import UPSTREAM_ERRORS
+from src.utils.image_pipeline import DescriptionCache
+from src.utils.ocr import OcrResult, ocr_available, extract_text, preprocess_for_ocr
+
+
+def terminal_screenshot(lines):
+    image = Image.new('RGB', (900, 60 + 30 * len(lines)), (12, 12, 12))
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((20, 30 + 30 * i), line, fill=(235, 235, 235))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return image, base64.b64encode(buffer.getvalue()).decode()
+
+
+@pytest.fixture
+def image_path(monkeypatch):
+    """get_image_description with OCR and the vision model both replaced by recorders"""
+    calls = {'ocr': 0, 'vision': 0}
+    result = {'value': None}
+
+    def fake_ocr(image):
+        calls['ocr'] += 1
+        if isinstance(result['value'], Exception):
+            raise result['value']
+        return result['value']
+
+    def fake_vision(image):
+        calls['vision'] += 1
+        return 'vision description'
+
+    monkeypatch.setattr(settings, 'GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(main, 'ocr_enabled', lambda: True)
+    monkeypatch.setattr(main, 'extract_text', fake_ocr)
+    monkeypatch.setattr(main, 'describe_image_with_gemini', fake_vision)
+    monkeypatch.setattr(main, 'image_description_cache', DescriptionCache())
+    return calls, result
+
+
+def test_confident_ocr_skips_the_vision_model(image_path):
+    calls, result = image_path
+    result['value'] = OcrResult("ModuleNotFoundError: No module named 'numpy'", 91.0, 5)
+    _, image_data = terminal_screenshot(['$ python app.py'])
+
+    description = main.get_image_description(image_data)
+    assert "No module named 'numpy'" in description
+    assert calls == {'ocr': 1, 'vision': 0}
+
+
+def test_low_confidence_ocr_escalates(image_path):
+    calls, result = image_path
+    result['value'] = OcrResult('~~ |l1 ~~', 35.0, 3)
+    _, image_data = terminal_screenshot(['a diagram, not text'])
+
+    assert main.get_image_description(image_data) == 'vision description'
+    assert calls == {'ocr': 1, 'vision': 1}
+
+
+def test_ocr_without_vision_model_returns_best_effort_text(image_path, monkeypatch):
+    calls, result = image_path
+    monkeypatch.setattr(settings, 'GEMINI_API_KEY', 'your_gemini_api_key_here')
+    result['value'] = OcrResult('docker: permission denied', 55.0, 3)
+    _, image_data = terminal_screenshot(['docker run'])
+
+    assert 'permission denied' in main.get_image_description(image_data)
+    assert calls['vision'] == 0
+
+
+def test_ocr_text_is_cached_per_exact_image(image_path):
+    """Screenshots differing only in their text are each read; a re-upload is not"""
+    calls, result = image_path
+    result['value'] = OcrResult("ModuleNotFoundError: No module named 'numpy'", 91.0, 5)
+    _, numpy_error = terminal_screenshot(["ModuleNotFoundError: No module named 'numpy'"])
+    _, pandas_error = terminal_screenshot(["ModuleNotFoundError: No module named 'pandas'"])
+
+    main.get_image_description(numpy_error)
+    main.get_image_description(pandas_error)
+    main.get_image_description(numpy_error)
+    assert calls == {'ocr': 2, 'vision': 0}
+
+
+def test_tesseract_failure_is_counted_apart_from_the_vision_model(image_path):
+    calls, result = image_path
+    result['value'] = OSError('tesseract is not installed or it is not in your PATH')
+    _, image_data = terminal_screenshot(['$ uv run app.py'])
+    tesseract_before = UPSTREAM_ERRORS.value(upstream='tesseract')
+    vision_before = UPSTREAM_ERRORS.value(upstream='gemini_vision')
+
+    assert main.get_image_description(image_data) == 'vision description'
+    assert calls == {'ocr': 1, 'vision': 1}
+    assert UPSTREAM_ERRORS.value(upstream='tesseract') == tesseract_before + 1
+    assert UPSTREAM_ERRORS.value(upstream='gemini_vision') == vision_before
+
+
+def test_image_without_a_description_searches_the_question_alone(image_path, monkeypatch):
+    """No OCR text and no vision model: the question is embedded unchanged"""
+    calls, result = image_path
+    monkeypatch.setattr(settings, 'GEMINI_API_KEY', 'your_gemini_api_key_here')
+    result['value'] = OcrResult('', 0.0, 0)
+    _, image_data = terminal_screenshot([''])
+    embedded = []
+    hash_embedding = main.embed_text
+
+    def embed_text(text):
+        embedded.append(text)
+        return hash_embedding(text)
+
+    monkeypatch.setattr(main, 'embed_text', embed_text)
+    monkeypatch.setattr(main, 'precomputed_answers', None)
+
+    asyncio.run(main.ask_question(main.QuestionRequest(question='What does this show?', image=image_data)))
+    assert embedded == ['What does this show?']
+
+
+def test_dark_terminal_is_inverted_for_tesseract():
+    image, _ = terminal_screenshot(['error'])
+    prepared = preprocess_for_ocr(image)
+    assert prepared.mode == 'L' and prepared.getpixel((0, 0)) > 200
+    assert prepared.width == image.width * 2
+
+
+@pytest.mark.skipif(not ocr_available(), reason="pytesseract / tesseract not installed")
+def test_tesseract_reads_terminal_error():
+    image, _ = terminal_screenshot(['Traceback (most recent call last):', 'KeyError: embeddings'])
+    result = extract_text(image.resize((image.width * 2, image.height * 2)))
+    assert 'KeyError' in result.text
+
+
+if __name__ == "__main__":
+    test_dark_terminal_is_inverted_for_tesseract()
+    print("SUCCESS: OCR tests passed")
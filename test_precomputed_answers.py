@@ -0,0 +1,152 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import asyncio
+import tempfile
+import threading
+import time
+import numpy as np
+import pytest
+from config.settings import settings
+from src.api import main
+from src.api.index_manager import IndexSnapshot
+from src.models.precomputed_answers import PrecomputedAnswers, build_precomputed_answers, refresh_precomputed_answers
+
+VOCABULARY = ['ga3', 'deadline', 'docker', 'install', 'project', 'submit', 'error', 'extended']
+
+
+def embed(text):
+    """Bag-of-words stand-in for the embedding model"""
+    words = text.lower().replace('?', '').split()
+    return np.array([float(word in words) for word in VOCABULARY]) + 0.01
+
+
+def test_clusters_answer_once_and_match_by_centroid():
+    """Near-duplicate questions share one answer; unrelated ones don't match"""
+    questions = [
+        {'question': 'GA3 deadline extended?', 'url': 'https://example.org/t/1', 'weight': 40},
+        {'question': 'Is the GA3 deadline extended', 'url': 'https://example.org/t/2', 'weight': 10},
+        {'question': 'Docker install error', 'url': 'https://example.org/t/3', 'weight': 20},
+    ]
+    answered = []
+
+    def answer(question):
+        answered.append(question)
+        return f"Answer to {question}", [{'url': 'https://example.org/course', 'text': 'Course'}]
+
+    table = build_precomputed_answers(questions, embed, answer, index_version='v1', merge_threshold=0.9)
+    assert answered == ['GA3 deadline extended?', 'Docker install error']
+    assert table.entries[0]['members'] == ['GA3 deadline extended?', 'Is the GA3 deadline extended']
+    assert [link['url'] for link in table.entries[0]['links']] == [
+        'https://example.org/t/1', 'https://example.org/t/2', 'https://example.org/course'
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'answers.npz')
+        table.save(path)
+        loaded = PrecomputedAnswers.load(path)
+
+    assert loaded.index_version == 'v1' and len(loaded) == 2
+    entry, similarity = loaded.match(embed('ga3 deadline extended'), 0.9)
+    assert entry['answer'] == 'Answer to GA3 deadline extended?' and similarity > 0.9
+    assert loaded.match(embed('project submit'), 0.9) is None
+    assert loaded.match(np.ones(3), 0.0) is None
+
+
+def test_answers_for_another_index_version_are_not_served(monkeypatch):
+    """A table built for an older index is ignored until it is refreshed"""
+    table = PrecomputedAnswers(
+        np.stack([embed('docker install error')]),
+        [{'question': 'Docker install error', 'answer': 'cached', 'links': [], 'members': []}],
+        index_version='v1'
+    )
+    monkeypatch.setattr(main, 'precomputed_answers', table)
+    query = embed('docker install error')
+
+    assert main.match_precomputed(query, IndexSnapshot({}, [], [], version='v1'))[0]['answer'] == 'cached'
+    assert main.match_precomputed(query, IndexSnapshot({}, [], [], version='v2')) is None
+
+
+def test_failed_and_fallback_embeddings_are_not_clustered():
+    """A failed embed is retried, then skipped; a fallback-only build writes nothing"""
+    questions = [
+        {'question': 'GA3 deadline extended?', 'url': '', 'weight': 3},
+        {'question': 'Docker install error', 'url': '', 'weight': 2},
+        {'question': 'Project submit', 'url': '', 'weight': 1},
+    ]
+    calls = []
+
+    def flaky(text):
+        calls.append(text)
+        if text == 'Docker install error' and calls.count(text) == 1:
+            return None
+        if text == 'Project submit':
+            return np.ones(3)
+        return embed(text)
+
+    table = build_precomputed_answers(questions, flaky, lambda q: (q, []), index_version='v1')
+    assert [entry['question'] for entry in table.entries] == ['GA3 deadline extended?', 'Docker install error']
+    assert calls.count('Docker install error') == 2
+
+    with pytest.MonkeyPatch.context() as monkeypatch, tempfile.TemporaryDirectory() as tmp_dir:
+        monkeypatch.setattr(settings, 'RAW_DATA_PATH', tmp_dir)
+        questions_path = os.path.join(tmp_dir, 'questions.txt')
+        with open(questions_path, 'w', encoding='utf-8') as f:
+            f.write('GA3 deadline extended?\n')
+        path = os.path.join(tmp_dir, 'answers.npz')
+        index = IndexSnapshot({}, [], [], version='v2')
+        assert refresh_precomputed_answers(index, lambda text: None, lambda q: (q, []), path=path,
+                                           questions_path=questions_path) is None
+        assert not os.path.exists(path)
+
+
+def test_fallback_query_embeddings_skip_the_table(monkeypatch):
+    """Without a model embedding for the question, /ask never serves a canned answer"""
+    table = PrecomputedAnswers(
+        np.ones((1, 384)), [{'question': 'Anything', 'answer': 'cached', 'links': [], 'members': []}],
+        index_version=main.index_manager.current.version
+    )
+    monkeypatch.setattr(main, 'precomputed_answers', table)
+    monkeypatch.setattr(settings, 'PRECOMPUTED_MIN_SIMILARITY', 0.0)
+    monkeypatch.setattr(settings, 'GEMINI_API_KEY', 'your_gemini_api_key_here')
+    response = asyncio.run(main.ask_question(main.QuestionRequest(question='How do I install docker?')))
+    assert response.answer != 'cached'
+
+
+def test_concurrent_refreshes_build_once():
+    """Workers refreshing after the same swap: one builds, the others load its file"""
+    answered = []
+
+    def answer(question):
+        answered.append(question)
+        time.sleep(0.2)
+        return f"Answer to {question}", []
+
+    with pytest.MonkeyPatch.context() as monkeypatch, tempfile.TemporaryDirectory() as tmp_dir:
+        monkeypatch.setattr(settings, 'RAW_DATA_PATH', tmp_dir)
+        questions_path = os.path.join(tmp_dir, 'questions.txt')
+        with open(questions_path, 'w', encoding='utf-8') as f:
+            f.write('GA3 deadline extended?\n')
+        path = os.path.join(tmp_dir, 'answers.npz')
+        index = IndexSnapshot({}, [], [], version='v2')
+
+        tables = []
+        workers = [threading.Thread(target=lambda: tables.append(
+            refresh_precomputed_answers(index, embed, answer, path=path, questions_path=questions_path)
+        )) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert answered == ['GA3 deadline extended?']
+        assert len(tables) == 3 and all(table.index_version == 'v2' and len(table) == 1 for table in tables)
+
+
+if __name__ == "__main__":
+    test_clusters_answer_once_and_match_by_centroid()
+    test_failed_and_fallback_embeddings_are_not_clustered()
+    test_concurrent_refreshes_build_once()
+    print("SUCCESS: precomputed answer tests passed")
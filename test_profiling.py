@@ -0,0 +1,83 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import asyncio
+import threading
+import time
+import pytest
+from fastapi import HTTPException, Request
+from config.settings import settings
+from src.api import main
+from src.api.profiling import ProfileSession, SamplingProfiler
+
+
+def admin_request(token):
+    headers = [(b'x-admin-token', token.encode())] if token else []
+    return Request({'type': 'http', 'method': 'POST', 'path': '/admin/profile/cpu', 'headers': headers})
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def retain_buffers(store):
+    for _ in range(200):
+        store.append(bytearray(10_000))
+
+
+def test_sampler_produces_collapsed_stacks():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name='busy-worker')
+    worker.start()
+    profiler = SamplingProfiler(interval=0.002).start()
+    time.sleep(0.3)
+    profiler.stop()
+    stop.set()
+    worker.join()
+
+    assert profiler.samples > 10
+    lines = profiler.collapsed().splitlines()
+    stack, count = lines[0].rsplit(' ', 1)
+    assert int(count) > 0
+    busy = [line for line in lines if line.startswith('busy-worker;')]
+    assert busy and all('busy_loop (test_profiling.py:' in line for line in busy)
+
+
+def test_allocation_diff_points_at_the_allocating_line():
+    store = []
+    session = ProfileSession(cpu=False, memory=True, frames=10).start()
+    retain_buffers(store)
+    result = session.stop()
+
+    top = result['memory']['top'][0]
+    assert top['size_bytes'] >= 200 * 10_000
+    assert top['traceback'][0].startswith('test_profiling.py:')
+    assert 'test_profiling.py:' in result['memory']['collapsed']
+
+
+def test_profile_endpoints_are_hidden_unless_enabled(monkeypatch):
+    monkeypatch.setattr(settings, 'ADMIN_TOKEN', 'secret', raising=False)
+    monkeypatch.setattr(settings, 'PROFILING_ENABLED', False, raising=False)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.profile_cpu(admin_request('secret'), seconds=0.1))
+    assert error.value.status_code == 404
+
+    monkeypatch.setattr(settings, 'PROFILING_ENABLED', True, raising=False)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.profile_cpu(admin_request('wrong'), seconds=0.1))
+    assert error.value.status_code == 403
+
+    response = asyncio.run(main.profile_cpu(admin_request('secret'), seconds=0.2, format='json'))
+    assert response['cpu']['samples'] > 0
+
+    response = asyncio.run(main.profile_memory(admin_request('secret'), seconds=0.1))
+    assert response.media_type.startswith('text/plain')
+
+
+if __name__ == "__main__":
+    test_sampler_produces_collapsed_stacks()
+    test_allocation_diff_points_at_the_allocating_line()
+    print("SUCCESS: profiling tests passed")
@@ -0,0 +1,86 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import asyncio
+import numpy as np
+from config.settings import settings
+from src.api import main
+from src.api.index_manager import IndexSnapshot
+from src.api.metrics import ASK_STAGE_SECONDS
+from src.models.reranker import LexicalReranker, tokenize
+
+
+def make_index(chunks, metadata=None):
+    return IndexSnapshot({}, chunks, np.eye(len(chunks)), metadata or [{} for _ in chunks], version='test')
+
+
+def candidates(similarities):
+    return [{'content': None, 'similarity': similarity, 'index': i} for i, similarity in enumerate(similarities)]
+
+
+def test_tokenize_strips_plurals():
+    assert tokenize('Docker containers, classes, status') == ['docker', 'container', 'class', 'status']
+
+
+def test_lexical_match_beats_slightly_higher_cosine():
+    chunks = ['Office hours are on Friday evening', 'Install docker desktop then run docker compose up',
+              'Submit the project before the deadline']
+    index = make_index(chunks)
+    results = [dict(c, content=chunks[c['index']]) for c in candidates([0.82, 0.80, 0.79])]
+
+    ranked, info = LexicalReranker().rerank('how do I run docker compose', results, index, top_k=2)
+    assert [r['index'] for r in ranked] == [1, 0]
+    assert info['scored'] == 3 and not info['budget_exhausted']
+
+
+def test_topic_title_counts_as_a_field():
+    chunks = ['It fails with exit code 1 every time', 'It fails with exit code 1 every time']
+    metadata = [{'topic_title': 'GA2 submission portal'}, {'topic_title': 'Docker build error on Windows'}]
+    index = make_index(chunks, metadata)
+    results = [dict(c, content=chunks[c['index']]) for c in candidates([0.5, 0.5])]
+
+    ranked, _ = LexicalReranker().rerank('docker build fails on windows', results, index)
+    assert ranked[0]['index'] == 1
+
+
+def test_budget_keeps_unscored_candidates_in_first_stage_order():
+    chunks = [f'chunk {i} about docker' for i in range(50)]
+    index = make_index(chunks)
+    results = [dict(c, content=chunks[c['index']]) for c in candidates(np.linspace(0.9, 0.1, 50))]
+    reranker = LexicalReranker(batch_size=1)
+    reranker.prepare(index)
+
+    ranked, info = reranker.rerank('docker', results, index, budget_ms=1e-6)
+    assert info['budget_exhausted'] and info['scored'] == 1
+    assert [r['index'] for r in ranked] == list(range(50))
+
+
+def test_ask_sends_reranked_top_k_to_the_llm(monkeypatch):
+    chunks = [f'unrelated chunk number {i}' for i in range(10)] + ['reset your uv virtual environment']
+    rng = np.random.default_rng(0)
+    snapshot = IndexSnapshot({}, chunks, rng.standard_normal((len(chunks), 384)), version='test')
+    monkeypatch.setattr(main.index_manager, 'current', snapshot)
+    monkeypatch.setattr(main, 'precomputed_answers', None)
+    monkeypatch.setattr(settings, 'RERANK_ENABLED', True, raising=False)
+    monkeypatch.setattr(settings, 'RERANK_CANDIDATES', 11, raising=False)
+    monkeypatch.setattr(settings, 'RERANK_TOP_K', 2, raising=False)
+    sent = []
+    monkeypatch.setattr(main, 'generate_response',
+                        lambda question, context_results, image_description=None: sent.append(context_results) or 'ok')
+
+    before = ASK_STAGE_SECONDS.count(stage='rerank')
+    asyncio.run(main.ask_question(main.QuestionRequest(question='How do I reset the uv virtual environment?')))
+
+    assert ASK_STAGE_SECONDS.count(stage='rerank') == before + 1
+    assert len(sent[0]) == 2
+    assert sent[0][0]['content'] == 'reset your uv virtual environment'
+
+
+if __name__ == "__main__":
+    test_tokenize_strips_plurals()
+    test_lexical_match_beats_slightly_higher_cosine()
+    test_topic_title_counts_as_a_field()
+    test_budget_keeps_unscored_candidates_in_first_stage_order()
+    print("SUCCESS: reranker tests passed")
@@ -0,0 +1,83 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import json
+import math
+import tempfile
+import numpy as np
+from src.api.index_manager import IndexSnapshot
+from benchmarks.retrieval_eval import (
+    Bm25Retriever, DenseRetriever, EvalCache, auto_questions, evaluate_config, score_ranking
+)
+
+
+def make_snapshot(version='v1'):
+    chunks = ['install docker on ubuntu with apt', 'docker compose networking',
+              'pandas merge versus join', 'course README overview']
+    metadata = [{'topic_id': 1}, {'topic_id': 1}, {'topic_id': 2}, {'section': 'README'}]
+    embeddings = np.eye(4)
+    return IndexSnapshot({}, chunks, embeddings, metadata, version=version, source='test.npz')
+
+
+def test_score_ranking():
+    scores = score_ranking(['topic:9', 'topic:1', 'section:README'], {'topic:1': 1, 'section:README': 2}, ks=(1, 3))
+    assert scores['recall@1'] == 0.0 and scores['recall@3'] == 1.0
+    assert scores['mrr'] == 0.5 and scores['first_relevant_rank'] == 2
+    dcg = 1 / math.log2(3) + 3 / math.log2(4)
+    ideal = 3 / math.log2(2) + 1 / math.log2(3)
+    assert math.isclose(scores['ndcg@3'], dcg / ideal)
+
+
+def test_runs_are_cached_until_the_index_changes():
+    questions = [
+        {'id': 'a', 'kind': 'title', 'query': 'docker install', 'relevant': {'topic:1': 1}},
+        {'id': 'b', 'kind': 'title', 'query': 'pandas join', 'relevant': {'topic:2': 1}},
+    ]
+    cache = EvalCache(':memory:')
+    result = evaluate_config('bm25', Bm25Retriever(make_snapshot()), questions, cache, ks=(1,))
+    assert result['overall']['recall@1'] == 1.0
+    assert cache.stats['run_misses'] == 2
+
+    evaluate_config('bm25', Bm25Retriever(make_snapshot()), questions, cache, ks=(1,))
+    assert cache.stats['run_hits'] == 2 and cache.stats['run_misses'] == 2
+
+    # A rebuilt index has a new version, so only its runs are recomputed
+    evaluate_config('bm25', Bm25Retriever(make_snapshot('v2')), questions, cache, ks=(1,))
+    assert cache.stats['run_misses'] == 4
+
+
+def test_dense_runs_share_cached_query_embeddings():
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        return [1.0, 0.0, 0.0, 0.0] if 'docker' in text else [0.0, 0.0, 1.0, 0.0]
+
+    questions = [{'id': 'a', 'kind': 'manual', 'query': 'docker?', 'relevant': {'topic:1': 1}}]
+    cache = EvalCache(':memory:')
+    for version in ('v1', 'v2'):
+        retriever = DenseRetriever(make_snapshot(version), cache, embedder='fake', embed=embed)
+        result = evaluate_config('dense', retriever, questions, cache, ks=(1,))
+        assert result['overall']['mrr'] == 1.0
+    assert calls == ['docker?']
+
+
+def test_auto_questions_from_topic_files():
+    with tempfile.TemporaryDirectory() as raw_dir:
+        topic = {'id': 42, 'title': 'Docker fails to start on Windows',
+                 'posts': [{'post_number': 1, 'cleaned_text': 'When I run docker compose up it exits with code 1.'}]}
+        with open(os.path.join(raw_dir, 'discourse_topic_42.json'), 'w', encoding='utf-8') as f:
+            json.dump(topic, f)
+        questions = auto_questions(raw_dir)
+    assert [q['kind'] for q in questions] == ['title', 'first_post']
+    assert all(q['relevant'] == {'topic:42': 1} for q in questions)
+
+
+if __name__ == "__main__":
+    test_score_ranking()
+    test_runs_are_cached_until_the_index_changes()
+    test_dense_runs_share_cached_query_embeddings()
+    test_auto_questions_from_topic_files()
+    print("SUCCESS: retrieval evaluation tests passed")
@@ -0,0 +1,114 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import json
+import tempfile
+from src.scraper.discourse_scraper_final import DiscourseScraperFixed
+from src.scraper.fake_discourse_server import FakeDiscourseServer, load_recorded_topics
+from src.scraper.scrape_journal import JournaledDiscourseScrape, ScrapeJournal
+
+
+class FlakyDiscourseServer(FakeDiscourseServer):
+    """Answers 403 for listing page 1 until `forbid_page_one` is switched off"""
+
+    forbid_page_one = True
+
+    def handle(self, path, query, headers):
+        if self.forbid_page_one and query.get('page') == ['1']:
+            return 403, {}, {'errors': ['expired cookies']}
+        return super().handle(path, query, headers)
+
+
+def test_journaled_scrape_resumes_where_it_stopped():
+    topics = load_recorded_topics(limit=35)
+
+    with FlakyDiscourseServer(topics) as server, tempfile.TemporaryDirectory() as output_dir:
+        def job():
+            scraper = DiscourseScraperFixed(base_url=server.url, output_dir=output_dir)
+            return JournaledDiscourseScrape(scraper, delay=0)
+
+        # Run 1: cookies "expire" on page 1, page 0 stays journaled
+        state = job().run()
+        assert state['next_page'] == 1 and not state['listing_complete']
+        assert not state['topic_status']
+
+        # Run 2: listing resumes at page 1; crash after three topics
+        server.forbid_page_one = False
+        server.request_log.clear()
+        scrape = job()
+        original = scrape.scraper.scrape_individual_topic
+        calls = []
+
+        def crashing(topic_id, topic_title):
+            if len(calls) == 3:
+                raise KeyboardInterrupt("simulated crash")
+            calls.append(topic_id)
+            return original(topic_id, topic_title)
+
+        scrape.scraper.scrape_individual_topic = crashing
+        try:
+            scrape.run()
+            assert False, "expected simulated crash"
+        except KeyboardInterrupt:
+            pass
+        listing_path = f"/c/courses/tds-kb/34.json"
+        assert server.request_log.count(listing_path) == 1
+
+        # Run 3: no listing requests, finished topics are not fetched again
+        server.request_log.clear()
+        state = job().run()
+        assert state['finished']
+        assert listing_path not in server.request_log
+        assert not {f"/t/{topic_id}.json" for topic_id in calls} & set(server.request_log)
+
+        with open(os.path.join(output_dir, 'discourse_summary.json'), encoding='utf-8') as f:
+            summary = json.load(f)
+        expected = len(DiscourseScraperFixed().filter_topics_by_date(topics))
+        assert summary['scraping_metadata']['total_topics_scraped'] == expected
+
+
+def test_journal_ignores_torn_last_line():
+    with tempfile.TemporaryDirectory() as output_dir:
+        journal = ScrapeJournal(os.path.join(output_dir, 'journal.jsonl'))
+        journal.append('job_started')
+        journal.append('page_done', page=0, topics=[{'id': 1, 'title': 'a'}])
+        with open(journal.path, 'a', encoding='utf-8') as f:
+            f.write('{"event": "topic_do')
+        state = journal.replay()
+        assert state['next_page'] == 1
+        assert state['topics'] == [{'id': 1, 'title': 'a'}]
+
+
+def test_appends_after_a_torn_line_are_replayed():
+    with tempfile.TemporaryDirectory() as output_dir:
+        path = os.path.join(output_dir, 'journal.jsonl')
+        journal = ScrapeJournal(path)
+        journal.append('job_started')
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"event": "page_do')
+
+        # The resumed job reopens the journal and keeps appending
+        journal = ScrapeJournal(path)
+        journal.append('page_done', page=0, topics=[{'id': 1, 'title': 'a'}])
+        journal.append('listing_done')
+        journal.append('topic_done', topic_id=1)
+        journal.append('job_finished', scraped=1, failed=0)
+
+        state = journal.replay()
+        assert (state['next_page'], state['listing_complete'], state['finished']) == (1, True, True)
+        assert state['topic_status'] == {1: 'done'}
+
+        # A corrupt line in the middle is skipped, not the end of the log
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('not json\n')
+        journal.append('topic_failed', topic_id=2)
+        assert journal.replay()['topic_status'] == {1: 'done', 2: 'failed'}
+
+
+if __name__ == "__main__":
+    test_journal_ignores_torn_last_line()
+    test_appends_after_a_torn_line_are_replayed()
+    test_journaled_scrape_resumes_where_it_stopped()
+    print("SUCCESS: scrape journal tests passed")
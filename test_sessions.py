@@ -0,0 +1,101 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import asyncio
+import numpy as np
+from src.api import main
+from src.api.index_manager import IndexSnapshot
+from src.api.metrics import CACHE_LOOKUPS
+from src.api.sessions import SessionStore, summarize
+
+
+def test_store_is_bounded_by_count_and_idle_time():
+    store = SessionStore(max_sessions=2, ttl=60)
+    first = store.get('a')
+    store.get('b')
+    store.get('a')
+    third = store.get('c')
+    # "b" was the least recently used
+    assert store.get('a') is first and len(store) == 2 and store.evicted == 1
+
+    third.last_seen -= 120
+    store.get('a')
+    assert len(store) == 1 and store.expired == 1
+
+
+def test_record_keeps_summaries_and_recent_chunks():
+    store = SessionStore(max_turns=2, max_chunks=3, summary_chars=40)
+    session = store.get('s')
+    session.bind('tds', 'v1')
+    for turn in range(3):
+        results = [{'index': 10 * turn, 'similarity': 0.8}, {'index': 10 * turn + 1, 'expanded_from': 10 * turn}]
+        store.record(session, f'question {turn}', 'First sentence. ' + 'More detail. ' * 20, [1.0, 0.0], results)
+
+    assert [question for question, _ in session.turns] == ['question 1', 'question 2']
+    assert session.turns[-1][1] == 'First sentence. More detail.'
+    assert session.hits == [(20, 0.8)]
+    assert session.chunk_rows == [20, 21, 10]
+
+    session.bind('tds', 'v2')
+    assert session.chunk_rows == [] and session.hits == [] and len(session.turns) == 2
+
+
+def test_open_returns_a_copy_later_turns_do_not_change():
+    store = SessionStore(max_turns=2, max_chunks=3)
+    session, state = store.open('s', 'tds', 'v1')
+    store.record(session, 'question', 'answer', [1.0, 0.0], [{'index': 4, 'similarity': 0.7}])
+    assert len(state.turns) == 0 and state.hits == [] and state.last_embedding is None
+
+    session, state = store.open('s', 'tds', 'v1')
+    store.record(session, 'next', 'answer', [0.0, 1.0], [{'index': 5, 'similarity': 0.6}])
+    assert state.hits == [(4, 0.7)] and state.chunk_rows == [4] and len(state.turns) == 1
+    assert state.similarity([1.0, 0.0]) > 0.99 and session.hits == [(5, 0.6)]
+
+
+def test_summaries_never_exceed_the_limit():
+    assert summarize('x' * 100, 20) == 'x' * 17 + '...'
+    assert summarize('Short.', 20) == 'Short.'
+
+
+def test_follow_ups_reuse_retrieval_and_carry_history(monkeypatch):
+    rng = np.random.default_rng(1)
+    snapshot = IndexSnapshot({}, [f'chunk {row}' for row in range(6)], rng.standard_normal((6, 384)),
+                             [{}] * 6, version='test')
+    monkeypatch.setattr(main.index_manager, 'current', snapshot)
+    monkeypatch.setattr(main, 'precomputed_answers', None)
+    monkeypatch.setattr(main, 'session_store', SessionStore(max_sessions=10, ttl=60))
+
+    searches = []
+    search = main.search_knowledge_base
+    monkeypatch.setattr(main, 'search_knowledge_base', lambda *args, **kwargs: searches.append(args) or search(*args, **kwargs))
+    histories = []
+    monkeypatch.setattr(main, 'generate_response',
+                        lambda question, context, image=None, history=None: histories.append(history) or f'Answer to {question}.')
+
+    def ask(question):
+        request = main.QuestionRequest(question=question, session_id='student-1')
+        return asyncio.run(main.ask_question(request))
+
+    reused = CACHE_LOOKUPS.value(cache='session_retrieval', result='hit')
+    assert ask('How do I install docker?').session_id == 'student-1'
+    ask('How do I install docker?')
+    assert len(searches) == 1
+    assert CACHE_LOOKUPS.value(cache='session_retrieval', result='hit') == reused + 1
+
+    ask('and on Windows?')
+    assert len(searches) == 2
+    assert histories[0] is None
+    assert 'Student: How do I install docker?' in histories[-1]
+
+    stateless = asyncio.run(main.ask_question(main.QuestionRequest(question='How do I install docker?')))
+    assert stateless.session_id is None and len(main.session_store) == 1
+
+
+if __name__ == "__main__":
+    test_store_is_bounded_by_count_and_idle_time()
+    test_record_keeps_summaries_and_recent_chunks()
+    test_open_returns_a_copy_later_turns_do_not_change()
+    test_summaries_never_exceed_the_limit()
+    print("SUCCESS: session tests passed")
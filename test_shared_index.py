@@ -0,0 +1,105 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import multiprocessing
+import tempfile
+import numpy as np
+from src.api.index_manager import IndexManager, load_snapshot
+from src.models.shared_index import ensure_index, attach_index, shadows_npz
+
+
+def make_npz(path, rows=40, dim=16):
+    rng = np.random.default_rng(1)
+    np.savez(
+        path,
+        embeddings=rng.standard_normal((rows, dim)),
+        content=np.array([f"chunk {i}\nwith a newline and ünïcode" for i in range(rows)], dtype=object),
+        metadata=np.array([{'chunk_id': i, 'source': 'test'} for i in range(rows)], dtype=object)
+    )
+
+
+def build_in_worker(index_dir, npz_path, results):
+    results.put(ensure_index(index_dir, npz_path))
+
+
+def test_only_one_worker_builds_the_index():
+    """Concurrent workers coordinate on the lock; exactly one converts the archive"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        npz_path = os.path.join(tmp_dir, 'embeddings.npz')
+        index_dir = os.path.join(tmp_dir, 'index')
+        make_npz(npz_path)
+
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=build_in_worker, args=(index_dir, npz_path, results))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        built = [results.get() for _ in workers]
+        assert built.count(True) == 1
+
+
+def test_attached_index_matches_archive():
+    """Mapped chunks and embeddings read back exactly what the npz held"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        npz_path = os.path.join(tmp_dir, 'embeddings.npz')
+        index_dir = os.path.join(tmp_dir, 'index')
+        make_npz(npz_path)
+        ensure_index(index_dir, npz_path)
+
+        source = np.load(npz_path, allow_pickle=True)
+        data = attach_index(index_dir)
+        assert isinstance(data['embeddings'], np.memmap)
+        np.testing.assert_allclose(data['embeddings'], source['embeddings'].astype(np.float32))
+        assert list(data['content']) == source['content'].tolist()
+        assert data['metadata'][3] == {'chunk_id': 3, 'source': 'test'}
+        assert data['content'][-2:] == source['content'].tolist()[-2:]
+
+
+def test_rewritten_archive_rebuilds_the_index():
+    """A new npz is converted on the next reload instead of serving the old manifest forever"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        npz_path = os.path.join(tmp_dir, 'embeddings.npz')
+        index_dir = os.path.join(tmp_dir, 'index')
+        make_npz(npz_path)
+        assert ensure_index(index_dir, npz_path)
+        assert not ensure_index(index_dir, npz_path)
+
+        manifest_path = os.path.join(index_dir, 'manifest.json')
+        manager = IndexManager(loader=lambda: load_snapshot(data_path='', embeddings_path=npz_path,
+                                                             index_dir=index_dir),
+                               watch_paths=[manifest_path, npz_path])
+        old = manager.load_initial()
+        assert len(old.chunks) == 40 and not manager.changed_on_disk()
+
+        make_npz(npz_path, rows=50)
+        os.utime(npz_path, (os.stat(manifest_path).st_mtime + 5,) * 2)
+        assert manager.changed_on_disk()
+        swapped, info = manager.reload()
+        assert swapped and info['version'] != old.version
+        assert len(manager.current.chunks) == 50 and manager.current.source == index_dir
+
+
+def test_pipeline_index_shadows_the_archive():
+    """Only an index converted from the archive follows its updates"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        npz_path = os.path.join(tmp_dir, 'embeddings.npz')
+        index_dir = os.path.join(tmp_dir, 'index')
+        make_npz(npz_path)
+        assert not shadows_npz(index_dir, npz_path)
+        ensure_index(index_dir, npz_path)
+        assert not shadows_npz(index_dir, npz_path)
+        assert shadows_npz(index_dir, os.path.join(tmp_dir, 'other.npz'))
+
+
+if __name__ == "__main__":
+    test_only_one_worker_builds_the_index()
+    test_attached_index_matches_archive()
+    test_rewritten_archive_rebuilds_the_index()
+    test_pipeline_index_shadows_the_archive()
+    print("SUCCESS: shared index tests passed")
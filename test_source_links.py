@@ -0,0 +1,78 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import asyncio
+import tempfile
+import numpy as np
+from src.api import main
+from src.api.index_manager import IndexSnapshot, load_snapshot
+from src.models.metadata_columns import MetadataColumns
+
+RECORDS = [
+    {'type': 'course_content', 'url': 'https://tds.s-anand.net/docker.md', 'section': 'docker',
+     'heading_path': ['Docker', 'Install']},
+    {'type': 'course_content', 'url': 'https://tds.s-anand.net/docker.md', 'section': 'docker'},
+    {'type': 'discourse_post', 'url': 'https://discourse.onlinedegree.iitm.ac.in/t/7', 'topic_id': 7,
+     'topic_title': 'GA3 docker push fails', 'post_number': 1},
+    {'type': 'discourse_post', 'url': 'https://discourse.onlinedegree.iitm.ac.in/t/7', 'topic_id': 7,
+     'topic_title': 'GA3 docker push fails', 'post_number': 3},
+    {'type': 'course_content', 'url': 'https://tds.s-anand.net/README.md', 'section': 'README'},
+]
+
+
+def test_columns_round_trip_and_share_repeated_values():
+    columns = MetadataColumns.from_records(RECORDS)
+    assert len(columns) == 5
+    assert list(columns) == RECORDS
+    assert columns[-1] == RECORDS[-1] and columns[1:3] == RECORDS[1:3]
+    assert columns.get(2, 'topic_title') == 'GA3 docker push fails'
+    assert columns.get(0, 'topic_id') is None
+
+    codes, values = columns.codes('url')
+    assert len(values) == 3 and list(codes) == [0, 0, 1, 1, 2]
+
+
+def test_npz_metadata_loads_as_columns():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'index.npz')
+        np.savez(path, embeddings=np.eye(5), content=np.array(['chunk'] * 5, dtype=object),
+                 metadata=np.array(RECORDS, dtype=object))
+        snapshot = load_snapshot(data_path=os.path.join(tmp_dir, 'missing.json'), embeddings_path=path, index_dir='')
+    assert isinstance(snapshot.metadata, MetadataColumns)
+    assert snapshot.metadata[3]['post_number'] == 3
+
+
+def test_links_are_deduplicated_per_source():
+    index = IndexSnapshot({}, ['chunk'] * 5, np.eye(5), MetadataColumns.from_records(RECORDS), version='test')
+    results = [{'index': row} for row in (2, 0, 3, 1, 4)]
+
+    assert main.source_links(results, index) == [
+        {'url': 'https://discourse.onlinedegree.iitm.ac.in/t/7', 'text': 'GA3 docker push fails'},
+        {'url': 'https://tds.s-anand.net/#/docker', 'text': 'TDS course: Docker'},
+        {'url': 'https://tds.s-anand.net/#/', 'text': 'TDS course: README'},
+    ]
+    assert len(main.source_links(results, index, limit=1)) == 1
+    assert main.source_links([], index) == main.DEFAULT_LINKS
+
+
+def test_ask_returns_links_of_the_retrieved_chunks(monkeypatch):
+    rng = np.random.default_rng(0)
+    snapshot = IndexSnapshot({}, ['docker chunk'] * 5, rng.standard_normal((5, 384)),
+                             MetadataColumns.from_records(RECORDS), version='test')
+    monkeypatch.setattr(main.index_manager, 'current', snapshot)
+    monkeypatch.setattr(main, 'precomputed_answers', None)
+
+    response = asyncio.run(main.ask_question(main.QuestionRequest(question='Why does docker push fail?')))
+    urls = [link['url'] for link in response.links]
+    assert urls and len(urls) == len(set(urls))
+    assert set(urls) <= {'https://discourse.onlinedegree.iitm.ac.in/t/7', 'https://tds.s-anand.net/#/docker',
+                         'https://tds.s-anand.net/#/'}
+
+
+if __name__ == "__main__":
+    test_columns_round_trip_and_share_repeated_values()
+    test_npz_metadata_loads_as_columns()
+    test_links_are_deduplicated_per_source()
+    print("SUCCESS: source link tests passed")
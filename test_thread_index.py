@@ -0,0 +1,78 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import json
+import tempfile
+import numpy as np
+from src.api.index_manager import IndexSnapshot
+from src.models.thread_index import ThreadExpander, ThreadIndex, load_post_stats
+
+
+def post_meta(topic_id, post_number, like_count=None, trust_level=None):
+    meta = {'topic_id': topic_id, 'post_number': post_number, 'type': 'discourse_post'}
+    if like_count is not None:
+        meta.update(like_count=like_count, trust_level=trust_level)
+    return meta
+
+
+def make_index():
+    chunks = ['How do I fix the GA3 docker error?', 'Same problem here', 'Run docker login first, then push.',
+              'Part two of the staff answer', 'Thanks, that worked', 'Course README']
+    metadata = [post_meta(7, 1, 0, 1), post_meta(7, 2, 0, 1), post_meta(7, 3, 4, 4), post_meta(7, 3, 4, 4),
+                post_meta(7, 4, 1, 1), {'section': 'README'}]
+    return IndexSnapshot({}, chunks, np.eye(len(chunks)), metadata, version='test')
+
+
+def test_question_hit_expands_to_the_staff_answer_first():
+    index = make_index()
+    hit = {'content': index.chunks[0], 'similarity': 0.9, 'index': 0}
+    expanded = ThreadExpander().expand([hit], index, posts_per_hit=2)
+
+    assert expanded[0] is hit
+    answer = expanded[1]
+    assert answer['post_number'] == 3 and answer['trust_level'] == 4 and answer['expanded_from'] == 0
+    # Both chunks of the answer post come back together
+    assert answer['content'] == 'Run docker login first, then push.\nPart two of the staff answer'
+    assert expanded[2]['post_number'] == 4
+    assert len(expanded) == 3
+
+
+def test_expansion_never_repeats_rows():
+    index = make_index()
+    hits = [{'content': index.chunks[0], 'similarity': 0.9, 'index': 0},
+            {'content': index.chunks[2], 'similarity': 0.8, 'index': 2},
+            {'content': index.chunks[5], 'similarity': 0.7, 'index': 5}]
+    expanded = ThreadExpander().expand(hits, index, posts_per_hit=3)
+
+    rows = [result['index'] for result in expanded]
+    assert len(rows) == len(set(rows))
+    # Course sections have no thread to expand into
+    assert expanded[-1]['index'] == 5
+
+
+def test_window_limits_how_far_a_hit_reaches():
+    thread_index = ThreadIndex([post_meta(1, n, 0, 0) for n in range(1, 11)])
+    assert [post[0] for post in thread_index.neighbours(4, before=1, after=2)] == [6, 4, 7]
+    assert thread_index.neighbours(99) == []
+
+
+def test_stats_come_from_topic_files_for_older_indexes():
+    with tempfile.TemporaryDirectory() as raw_dir:
+        topic = {'id': 7, 'posts': [{'post_number': 1, 'like_count': 0, 'trust_level': 1},
+                                    {'post_number': 2, 'like_count': 5, 'trust_level': 4}]}
+        with open(os.path.join(raw_dir, 'discourse_topic_7.json'), 'w', encoding='utf-8') as f:
+            json.dump(topic, f)
+        stats = load_post_stats({7}, raw_dir=raw_dir, corpus_db=os.path.join(raw_dir, 'missing.sqlite3'))
+
+    thread_index = ThreadIndex([post_meta(7, 1), post_meta(7, 2)], post_stats=stats)
+    assert thread_index.threads[7] == [(1, (0,), 0, 1), (2, (1,), 5, 4)]
+
+
+if __name__ == "__main__":
+    test_question_hit_expands_to_the_staff_answer_first()
+    test_expansion_never_repeats_rows()
+    test_window_limits_how_far_a_hit_reaches()
+    test_stats_come_from_topic_files_for_older_indexes()
+    print("SUCCESS: thread index tests passed")
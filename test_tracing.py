@@ -0,0 +1,115 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from src.api.tracing import TracingMiddleware, span, to_otlp
+
+
+def run_asgi(app, path='/ask', headers=()):
+    """Drive one HTTP request through an ASGI app; returns (status, headers dict, body)"""
+    scope = {'type': 'http', 'method': 'POST', 'path': path, 'headers': list(headers)}
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    body = b''.join(message.get('body', b'') for message in sent[1:])
+    return start['status'], {k.decode(): v.decode() for k, v in start['headers']}, body
+
+
+async def staged_app(scope, receive, send):
+    """Stands in for /ask: one stage on the loop, one in a worker thread"""
+    with span('query_embedding'):
+        time.sleep(0.01)
+
+    def blocking():
+        with span('gemini.generate_content', model='gemini-2.0-flash'):
+            time.sleep(0.02)
+    await asyncio.to_thread(blocking)
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': b'ok'})
+
+
+def test_request_id_server_timing_and_slow_log():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_path = os.path.join(tmp_dir, 'slow.jsonl')
+        middleware = TracingMiddleware(staged_app, slow_ms=15, log_path=log_path, otlp_endpoint='')
+
+        status, headers, body = run_asgi(middleware, headers=[(b'x-request-id', b'abc123')])
+        assert status == 200 and body == b'ok'
+        assert headers['x-request-id'] == 'abc123'
+        timing = headers['server-timing']
+        assert 'query_embedding;dur=' in timing and 'gemini_generate_content;dur=' in timing
+        assert 'total;dur=' in timing
+
+        with open(log_path, encoding='utf-8') as f:
+            record = json.loads(f.readline())
+        assert record['request_id'] == 'abc123'
+        assert [s['name'] for s in record['spans']] == ['query_embedding', 'gemini.generate_content']
+        assert record['spans'][1]['attributes'] == {'model': 'gemini-2.0-flash'}
+
+        # Fast requests are not logged; a request id is generated when none is sent
+        fast = TracingMiddleware(staged_app, slow_ms=10_000, log_path=log_path, otlp_endpoint='')
+        _, headers, _ = run_asgi(fast)
+        assert len(headers['x-request-id']) == 16
+        with open(log_path, encoding='utf-8') as f:
+            assert len(f.readlines()) == 1
+
+
+def test_span_outside_a_request_is_a_no_op():
+    with span('anything'):
+        pass
+
+
+def test_otlp_export_reaches_a_collector():
+    received = []
+
+    class Collector(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append((self.path, json.loads(self.rfile.read(int(self.headers['Content-Length'])))))
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Collector)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        middleware = TracingMiddleware(staged_app, slow_ms=10_000, log_path=os.devnull,
+                                       otlp_endpoint=f"http://127.0.0.1:{server.server_port}")
+        middleware.exporter.flush_interval = 0.05
+        run_asgi(middleware)
+        deadline = time.time() + 5
+        while not received and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        server.shutdown()
+
+    path, payload = received[0]
+    assert path == '/v1/traces'
+    spans = payload['resourceSpans'][0]['scopeSpans'][0]['spans']
+    root = spans[0]
+    assert root['name'] == 'POST /ask' and len(root['traceId']) == 32
+    assert {s['parentSpanId'] for s in spans[1:]} == {root['spanId']}
+    assert to_otlp([])['resourceSpans'][0]['scopeSpans'][0]['spans'] == []
+
+
+if __name__ == "__main__":
+    test_request_id_server_timing_and_slow_log()
+    test_span_outside_a_request_is_a_no_op()
+    test_otlp_export_reaches_a_collector()
+    print("SUCCESS: tracing tests passed")
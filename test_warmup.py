@@ -0,0 +1,36 @@
+import sys
+import os
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+import subprocess
+from src.api.warmup import resolve_groups, prefetch_modules, warmup_timings
+
+
+def test_serving_core_skips_heavy_imports():
+    """Importing the API does not load the scraping or SDK stacks"""
+    check = (
+        "import sys, src.api.main\n"
+        "heavy = [m for m in ('bs4', 'requests', 'google.generativeai', 'PIL.Image') if m in sys.modules]\n"
+        "print(','.join(heavy))"
+    )
+    result = subprocess.run([sys.executable, '-c', check], cwd=project_root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ''
+
+
+def test_prefetch_groups():
+    """Named groups expand to modules, "none" disables and unknown names pass through"""
+    assert resolve_groups('none') == []
+    assert resolve_groups('image') == ['PIL.Image']
+    assert resolve_groups('gemini, json') == ['google.generativeai', 'json']
+
+    prefetch_modules(['json', 'no_such_module_for_warmup'])
+    assert warmup_timings['json'] is not None
+    assert warmup_timings['no_such_module_for_warmup'] is None
+
+
+if __name__ == "__main__":
+    test_serving_core_skips_heavy_imports()
+    test_prefetch_groups()
+    print("SUCCESS: warm-up tests passed")